@@ -0,0 +1,173 @@
+"""
+Join Admission Control
+Token-bucket rate limits per IP and per stream with a bounded join queue
+"""
+
+import ipaddress
+import math
+import os
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+JOIN_RATE_PER_IP = float(os.getenv("JOIN_RATE_PER_IP", "0.5"))  # joins/s
+JOIN_BURST_PER_IP = float(os.getenv("JOIN_BURST_PER_IP", "3"))
+JOIN_RATE_PER_STREAM = float(os.getenv("JOIN_RATE_PER_STREAM", "50"))  # joins/s
+JOIN_BURST_PER_STREAM = float(os.getenv("JOIN_BURST_PER_STREAM", "100"))
+JOIN_QUEUE_LIMIT = int(os.getenv("JOIN_QUEUE_LIMIT", "1000"))  # waiting joins per stream
+
+# Prune idle IP buckets once the table grows past this size
+MAX_TRACKED_IPS = 50000
+
+# Peers whose X-Forwarded-For / X-Real-IP is believed (the ingress and reverse proxies)
+TRUSTED_PROXIES = [
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in os.getenv("TRUSTED_PROXIES", "127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16").split(",")
+    if network.strip()
+]
+
+
+def _is_trusted_proxy(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+
+def client_address(peer: Optional[str], headers: Mapping[str, str]) -> str:
+    """
+    Address of the actual client behind any trusted proxies
+
+    X-Forwarded-For is walked from the right and the first hop that is not a
+    trusted proxy wins; entries further left are client-supplied and ignored.
+    """
+    if not peer:
+        return "unknown"
+    if not _is_trusted_proxy(peer):
+        return peer
+
+    forwarded = [hop.strip() for hop in headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(forwarded):
+        if not _is_trusted_proxy(hop):
+            return hop
+    if forwarded:
+        # Every hop is a proxy - the leftmost one is closest to the client
+        return forwarded[0]
+    return headers.get("x-real-ip", "").strip() or peer
+
+
+class TokenBucket:
+    """Token bucket that may go into debt so callers can be queued"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self) -> bool:
+        """Take one token if available right now"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def reserve(self) -> float:
+        """Take one token, returns seconds until it is actually available"""
+        self._refill(time.monotonic())
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def backlog(self) -> int:
+        """Reservations still waiting for their token"""
+        self._refill(time.monotonic())
+        return math.ceil(-self.tokens) if self.tokens < 0 else 0
+
+    def is_idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.burst
+
+
+class AdmissionController:
+    """Decides cheaply - before accept() - whether a viewer socket may join"""
+
+    def __init__(self, rate_per_ip: float = JOIN_RATE_PER_IP, burst_per_ip: float = JOIN_BURST_PER_IP,
+                 rate_per_stream: float = JOIN_RATE_PER_STREAM, burst_per_stream: float = JOIN_BURST_PER_STREAM,
+                 queue_limit: int = JOIN_QUEUE_LIMIT):
+        self.rate_per_ip = rate_per_ip
+        self.burst_per_ip = burst_per_ip
+        self.rate_per_stream = rate_per_stream
+        self.burst_per_stream = burst_per_stream
+        self.queue_limit = queue_limit
+        self.ip_buckets: Dict[str, TokenBucket] = {}
+        self.stream_buckets: Dict[str, TokenBucket] = {}
+        self.admitted = 0
+        self.queued = 0
+        self.shed: Dict[str, int] = {"stream_full": 0, "ip_rate": 0, "queue_full": 0, "not_found": 0}
+
+    def record_shed(self, reason: str):
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+
+    def admit(self, ip: str, stream_id: str) -> Tuple[Optional[float], Optional[str]]:
+        """
+        Returns:
+            (wait_seconds, None) if the join may proceed after waiting,
+            (None, reason) if it must be shed
+        """
+        bucket = self.ip_buckets.get(ip)
+        if bucket is None:
+            if len(self.ip_buckets) >= MAX_TRACKED_IPS:
+                self._prune_ip_buckets()
+            bucket = self.ip_buckets[ip] = TokenBucket(self.rate_per_ip, self.burst_per_ip)
+
+        if not bucket.try_acquire():
+            self.record_shed("ip_rate")
+            return None, "ip_rate"
+
+        stream_bucket = self.stream_buckets.get(stream_id)
+        if stream_bucket is None:
+            stream_bucket = self.stream_buckets[stream_id] = TokenBucket(self.rate_per_stream, self.burst_per_stream)
+
+        if stream_bucket.backlog() >= self.queue_limit:
+            self.record_shed("queue_full")
+            return None, "queue_full"
+
+        wait = stream_bucket.reserve()
+        if wait > 0:
+            self.queued += 1
+        self.admitted += 1
+        return wait, None
+
+    def queue_position(self, stream_id: str) -> int:
+        bucket = self.stream_buckets.get(stream_id)
+        return bucket.backlog() if bucket else 0
+
+    def forget_stream(self, stream_id: str):
+        self.stream_buckets.pop(stream_id, None)
+
+    def _prune_ip_buckets(self):
+        for ip in [ip for ip, bucket in self.ip_buckets.items() if bucket.is_idle()]:
+            del self.ip_buckets[ip]
+
+    def metrics(self) -> Dict[str, Any]:
+        shed_total = sum(self.shed.values())
+        return {
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": dict(self.shed),
+            "shed_total": shed_total,
+            "shed_ratio": round(shed_total / (shed_total + self.admitted), 4) if shed_total + self.admitted else 0.0,
+            "queues": {stream_id: bucket.backlog() for stream_id, bucket in self.stream_buckets.items()},
+            "tracked_ips": len(self.ip_buckets),
+            "limits": {
+                "per_ip": {"rate": self.rate_per_ip, "burst": self.burst_per_ip},
+                "per_stream": {"rate": self.rate_per_stream, "burst": self.burst_per_stream},
+                "queue_limit": self.queue_limit,
+                "trusted_proxies": [str(network) for network in TRUSTED_PROXIES]
+            }
+        }
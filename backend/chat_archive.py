@@ -0,0 +1,125 @@
+"""
+Chat Archive
+Keeps chat_messages small: messages older than CHAT_HOT_HOURS are moved to
+a chat_archive collection keyed by show date, where admins search them
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+
+# Messages stay in the hot collection this long before they are archived
+CHAT_HOT_HOURS = float(os.getenv("CHAT_HOT_HOURS", "24"))
+CHAT_ARCHIVE_INTERVAL = float(os.getenv("CHAT_ARCHIVE_INTERVAL", "3600"))  # seconds
+CHAT_ARCHIVE_BATCH_SIZE = 1000
+# TTL on the hot collection - only a safety net if the archiver stops, so well above CHAT_HOT_HOURS
+CHAT_HOT_TTL_DAYS = int(os.getenv("CHAT_HOT_TTL_DAYS", "30"))
+
+
+class ChatArchiver:
+    """
+    Moves old messages from the hot collection into the archive in batches
+
+    Each batch is upserted into the archive before it is deleted from the hot
+    collection, so an interrupted run only repeats work on the next one.
+    """
+
+    def __init__(self, hot, archive, show_date_for: Callable[[datetime], str]):
+        self._hot = hot
+        self._archive = archive
+        self._show_date_for = show_date_for
+        self.archived = 0
+        self.runs = 0
+        self.last_run: Optional[datetime] = None
+
+    async def create_indexes(self):
+        # GET /chat and the snapshot tail read the newest messages of one room
+        await self._hot.create_index([("room", ASCENDING), ("timestamp", DESCENDING)], name="room_timestamp")
+        await self._hot.create_index("timestamp", name="timestamp_ttl",
+                                     expireAfterSeconds=CHAT_HOT_TTL_DAYS * 86400)
+        await self._archive.create_index([("show_date", ASCENDING), ("timestamp", ASCENDING)], name="show_date_timestamp")
+        await self._archive.create_index([("message", "text"), ("username", "text")], name="message_text",
+                                         default_language="none")
+
+    async def run_once(self, now: Optional[datetime] = None) -> int:
+        """Archive everything older than the hot window, returns the number of messages moved"""
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(hours=CHAT_HOT_HOURS)
+        moved = 0
+        while True:
+            # _id kept for the delete - the hot collection has no index on id
+            batch = await self._hot.find({"timestamp": {"$lt": cutoff}}) \
+                .sort("timestamp", ASCENDING).limit(CHAT_ARCHIVE_BATCH_SIZE).to_list(CHAT_ARCHIVE_BATCH_SIZE)
+            if not batch:
+                break
+
+            await self._archive.bulk_write([
+                UpdateOne({"_id": message["id"]}, {"$setOnInsert": self._archived(message)}, upsert=True)
+                for message in batch
+            ], ordered=False)
+            await self._hot.delete_many({"_id": {"$in": [message["_id"] for message in batch]}})
+            moved += len(batch)
+
+            if len(batch) < CHAT_ARCHIVE_BATCH_SIZE:
+                break
+
+        self.archived += moved
+        self.runs += 1
+        self.last_run = now or datetime.now(timezone.utc)
+        if moved:
+            logging.info(f"🗄️ Archived {moved} chat messages older than {cutoff.isoformat()}")
+        return moved
+
+    def _archived(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        # Mongo hands back naive UTC datetimes
+        timestamp = message["timestamp"].replace(tzinfo=timezone.utc)
+        archived = {key: value for key, value in message.items() if key != "_id"}
+        archived["show_date"] = self._show_date_for(timestamp)
+        return archived
+
+    async def run(self):
+        """Archiver loop, started on app startup"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logging.error(f"Chat archiver error: {str(e)}")
+            await asyncio.sleep(CHAT_ARCHIVE_INTERVAL)
+
+    async def search(self, query: Optional[str] = None, show_date: Optional[str] = None,
+                     username: Optional[str] = None, room: Optional[str] = None,
+                     limit: int = 100) -> List[Dict[str, Any]]:
+        """Archived messages, oldest first - full-text query on message and username"""
+        selector: Dict[str, Any] = {}
+        if query:
+            selector["$text"] = {"$search": query}
+        if show_date:
+            selector["show_date"] = show_date
+        if username:
+            selector["username"] = username
+        if room is not None:
+            selector["room"] = room
+
+        cursor = self._archive.find(selector, {"_id": 0}).sort([("show_date", ASCENDING), ("timestamp", ASCENDING)])
+        return await cursor.limit(limit).to_list(limit)
+
+    async def show_dates(self) -> List[Dict[str, Any]]:
+        """Archived show dates with their message counts, newest first"""
+        pipeline = [
+            {"$group": {"_id": "$show_date", "messages": {"$sum": 1}}},
+            {"$sort": {"_id": -1}},
+            {"$project": {"_id": 0, "show_date": "$_id", "messages": 1}}
+        ]
+        return await self._archive.aggregate(pipeline).to_list(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hot_hours": CHAT_HOT_HOURS,
+            "interval": CHAT_ARCHIVE_INTERVAL,
+            "runs": self.runs,
+            "archived": self.archived,
+            "last_run": self.last_run
+        }
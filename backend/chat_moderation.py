@@ -0,0 +1,224 @@
+"""
+Chat Moderation
+Per-sender and per-address rate limits, near-duplicate suppression and a blocklist, checked
+in memory before a message is stored and fanned out
+"""
+
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+from admission import TokenBucket
+
+CHAT_RATE_PER_USER = float(os.getenv("CHAT_RATE_PER_USER", "0.5"))  # messages/s
+CHAT_BURST_PER_USER = float(os.getenv("CHAT_BURST_PER_USER", "5"))
+# Senders are display names, so one address can rotate them - this caps the
+# address itself, loose enough for a household or office behind one NAT
+CHAT_RATE_PER_IP = float(os.getenv("CHAT_RATE_PER_IP", "2"))  # messages/s
+CHAT_BURST_PER_IP = float(os.getenv("CHAT_BURST_PER_IP", "20"))
+# Same fingerprint within this window: from the same sender it is a duplicate,
+# CHAT_FLOOD_LIMIT times from anyone it is a flood
+CHAT_DUPLICATE_WINDOW = float(os.getenv("CHAT_DUPLICATE_WINDOW", "30"))  # seconds
+CHAT_FLOOD_LIMIT = int(os.getenv("CHAT_FLOOD_LIMIT", "5"))
+# Shorter texts ("ja", "Chat 1234 I" + emoji) are only rate limited
+CHAT_DUPLICATE_MIN_LENGTH = 12
+# Only this many characters are scanned - keeps the cost per message bounded
+CHAT_SCAN_LENGTH = 500
+CHAT_BLOCKLIST = os.getenv("CHAT_BLOCKLIST", "")  # comma separated
+CHAT_BLOCKLIST_FILE = os.getenv("CHAT_BLOCKLIST_FILE")  # one term per line
+
+# Rolling hash over SHINGLE_SIZE letters; the SKETCH_SIZE smallest hashes are the fingerprint
+SHINGLE_SIZE = 5
+SKETCH_SIZE = 8
+HASH_BASE = 257
+HASH_MOD = (1 << 61) - 1
+
+# Prune idle sender (and address) buckets once the table grows past this size
+MAX_TRACKED_SENDERS = 50000
+
+
+def normalize(text: str) -> str:
+    """Lowercase letters only - spacing, digits, punctuation and emoji don't make a message new"""
+    return "".join(char for char in text[:CHAT_SCAN_LENGTH].lower() if char.isalpha())
+
+
+def fingerprint(normalized: str) -> Tuple[int, ...]:
+    """
+    Bottom-k sketch of the Rabin-Karp hashes of all shingles
+
+    Messages that share most of their shingles ("Jetzt kaufen!!!" and
+    "jetzt   KAUFEN") get the same sketch.
+    """
+    value = 0
+    for char in normalized[:SHINGLE_SIZE]:
+        value = (value * HASH_BASE + ord(char)) % HASH_MOD
+    hashes = {value}
+
+    high = pow(HASH_BASE, SHINGLE_SIZE - 1, HASH_MOD)
+    for index in range(SHINGLE_SIZE, len(normalized)):
+        value = ((value - ord(normalized[index - SHINGLE_SIZE]) * high) * HASH_BASE + ord(normalized[index])) % HASH_MOD
+        hashes.add(value)
+    return tuple(sorted(hashes)[:SKETCH_SIZE])
+
+
+class AhoCorasick:
+    """Matches all blocklist terms in one pass over the text"""
+
+    def __init__(self, terms: Iterable[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[Optional[str]] = [None]
+        self.terms = 0
+
+        for term in terms:
+            if not term:
+                continue
+            state = 0
+            for char in term:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(None)
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state] = term
+            self.terms += 1
+
+        # Breadth-first failure links (first level fails to the root);
+        # a state also reports the term of its failure state
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                if self.output[child] is None:
+                    self.output[child] = self.output[self.fail[child]]
+
+    def find(self, text: str) -> Optional[str]:
+        """First blocklist term contained in text, or None"""
+        state = 0
+        for char in text:
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            if self.output[state] is not None:
+                return self.output[state]
+        return None
+
+
+def load_blocklist() -> List[str]:
+    terms = CHAT_BLOCKLIST.split(",")
+    if CHAT_BLOCKLIST_FILE and os.path.exists(CHAT_BLOCKLIST_FILE):
+        with open(CHAT_BLOCKLIST_FILE, encoding="utf-8") as file:
+            terms.extend(file.read().splitlines())
+    return sorted({normalize(term) for term in terms} - {""})
+
+
+class ChatModerator:
+    """
+    Decides per message whether it may be stored and broadcast
+
+    Everything is in memory and amortized O(1) per message (the text scan is
+    capped at CHAT_SCAN_LENGTH characters).
+    """
+
+    def __init__(self, blocklist: Optional[Iterable[str]] = None):
+        self.blocklist = AhoCorasick(load_blocklist() if blocklist is None else sorted({normalize(term) for term in blocklist}))
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.address_buckets: Dict[str, TokenBucket] = {}
+        # Fingerprints of the duplicate window: per sender, counts overall, expiry order
+        self._seen: Dict[Tuple[Tuple[int, ...], str], float] = {}
+        self._counts: Dict[Tuple[int, ...], int] = {}
+        self._recent: Deque[Tuple[float, Tuple[int, ...], str]] = deque()
+        self.accepted = 0
+        self.rejected: Dict[str, int] = {"rate_limited": 0, "duplicate": 0, "flood": 0, "blocked": 0}
+
+    def check(self, address: str, sender: str, text: str, now: Optional[float] = None,
+              check_duplicates: bool = True) -> Optional[str]:
+        """
+        Args:
+            address: Client address - rate limited on its own, whatever names it uses
+            sender: Name the message is sent under at that address
+            check_duplicates: False only for server-worded notices that look
+                alike on purpose (login/logout) - never set from client input
+
+        Returns:
+            None if the message may go out, otherwise the reason it is rejected
+        """
+        now = time.monotonic() if now is None else now
+        reason = self._check(address, f"{address}|{sender}", text, now, check_duplicates)
+        if reason:
+            self.rejected[reason] += 1
+        else:
+            self.accepted += 1
+        return reason
+
+    def _check(self, address: str, sender: str, text: str, now: float, check_duplicates: bool) -> Optional[str]:
+        # Address first: a rotated name gets a fresh sender bucket, but not a fresh address bucket
+        if not self._bucket(self.address_buckets, address, CHAT_RATE_PER_IP, CHAT_BURST_PER_IP).try_acquire():
+            return "rate_limited"
+        if not self._bucket(self.buckets, sender, CHAT_RATE_PER_USER, CHAT_BURST_PER_USER).try_acquire():
+            return "rate_limited"
+
+        normalized = normalize(text)
+        if self.blocklist.terms and self.blocklist.find(normalized):
+            return "blocked"
+
+        if len(normalized) < CHAT_DUPLICATE_MIN_LENGTH or not check_duplicates:
+            return None
+
+        self._expire(now)
+        sketch = fingerprint(normalized)
+        if (sketch, sender) in self._seen:
+            return "duplicate"
+        if self._counts.get(sketch, 0) >= CHAT_FLOOD_LIMIT:
+            return "flood"
+
+        self._seen[(sketch, sender)] = now
+        self._counts[sketch] = self._counts.get(sketch, 0) + 1
+        self._recent.append((now, sketch, sender))
+        return None
+
+    def _expire(self, now: float):
+        cutoff = now - CHAT_DUPLICATE_WINDOW
+        while self._recent and self._recent[0][0] < cutoff:
+            _, sketch, sender = self._recent.popleft()
+            del self._seen[(sketch, sender)]
+            count = self._counts[sketch] - 1
+            if count:
+                self._counts[sketch] = count
+            else:
+                del self._counts[sketch]
+
+    @staticmethod
+    def _bucket(buckets: Dict[str, TokenBucket], key: str, rate: float, burst: float) -> TokenBucket:
+        bucket = buckets.get(key)
+        if bucket is None:
+            if len(buckets) >= MAX_TRACKED_SENDERS:
+                for idle in [idle for idle, idle_bucket in buckets.items() if idle_bucket.is_idle()]:
+                    del buckets[idle]
+            bucket = buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    def stats(self) -> Dict[str, Any]:
+        rejected_total = sum(self.rejected.values())
+        return {
+            "accepted": self.accepted,
+            "rejected": dict(self.rejected),
+            "rejected_ratio": round(rejected_total / (rejected_total + self.accepted), 4) if rejected_total + self.accepted else 0.0,
+            "tracked_senders": len(self.buckets),
+            "tracked_addresses": len(self.address_buckets),
+            "window_fingerprints": len(self._counts),
+            "blocklist_terms": self.blocklist.terms,
+            "limits": {
+                "per_user": {"rate": CHAT_RATE_PER_USER, "burst": CHAT_BURST_PER_USER},
+                "per_ip": {"rate": CHAT_RATE_PER_IP, "burst": CHAT_BURST_PER_IP},
+                "duplicate_window": CHAT_DUPLICATE_WINDOW,
+                "flood_limit": CHAT_FLOOD_LIMIT
+            }
+        }
@@ -0,0 +1,65 @@
+"""
+Fast JSON Serialization
+Response class and WebSocket frame encoder - orjson when installed, stdlib json as fallback
+"""
+
+import json
+import uuid
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def to_serializable(obj: Any) -> Any:
+    """Serialize types neither encoder handles on its own"""
+    if isinstance(obj, BaseModel):
+        # Already validated - dump directly instead of going through jsonable_encoder
+        return obj.model_dump()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    # ObjectId & co. - same behaviour as the former json.dumps(..., default=str)
+    return str(obj)
+
+
+if ORJSON_AVAILABLE:
+    def dumps(obj: Any) -> bytes:
+        """Serialize to UTF-8 JSON bytes (datetimes and UUIDs natively)"""
+        return orjson.dumps(obj, default=to_serializable)
+else:
+    def dumps(obj: Any) -> bytes:
+        """Serialize to UTF-8 JSON bytes (stdlib fallback)"""
+        return json.dumps(
+            obj,
+            default=to_serializable,
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+
+
+def dumps_text(obj: Any) -> str:
+    """Serialize a WebSocket text frame"""
+    return dumps(obj).decode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse rendered with the fast encoder
+
+    Returning it directly from an endpoint skips FastAPI's jsonable_encoder
+    pass, so Pydantic models and datetimes are serialized in one step.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
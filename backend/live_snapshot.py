@@ -0,0 +1,175 @@
+"""
+Live Snapshot Cache
+Everything a customer view needs on load in one pre-rendered response:
+stream status, ticker, chat tail, events, products and counters
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from pymongo import ReturnDocument
+
+from fast_json import dumps
+
+# Messages of the main chat kept in memory for the snapshot
+LIVE_SNAPSHOT_CHAT_TAIL = int(os.getenv("LIVE_SNAPSHOT_CHAT_TAIL", "50"))
+# How often a worker checks for event edits made by other workers (seconds)
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "2"))
+
+EVENTS_REVISION_DOCUMENT_ID = "events_revision"
+
+
+class LiveSnapshotCache:
+    """
+    Holds the chat tail and event list in memory and renders the snapshot
+    body once per state version
+
+    The version combines the /ws broadcast position (every chat message,
+    order and ticker change is broadcast) with a local revision for changes
+    that are not broadcast, such as event edits. Event edits are also
+    counted in a shared revision document, so every worker drops its
+    cached event list.
+    """
+
+    def __init__(self, load_chat_tail: Callable[[int], Awaitable[List[Dict[str, Any]]]],
+                 load_events: Callable[[], Awaitable[List[Dict[str, Any]]]],
+                 events_key: Callable[[], str] = lambda: "",
+                 revisions=None):
+        self._load_chat_tail = load_chat_tail
+        self._load_events = load_events
+        # The event list is reloaded whenever this key changes (e.g. the calendar day)
+        self._events_key = events_key
+        # Collection holding the shared events revision (None: single worker)
+        self._revisions = revisions
+        self.chat_tail: deque = deque(maxlen=LIVE_SNAPSHOT_CHAT_TAIL)
+        self.chat_loaded = False
+        self.events: Optional[List[Dict[str, Any]]] = None
+        self.events_loaded_for: Optional[str] = None
+        self._events_etag: Optional[str] = None
+        self.revision = 0
+        self.events_revision: Optional[int] = None
+
+        self._etag: Optional[str] = None
+        self._body: Optional[bytes] = None
+        self._lock = asyncio.Lock()
+        self.renders = 0
+        self.hits = 0
+
+    def add_chat_message(self, message: Dict[str, Any]):
+        # Until the tail is loaded, the message will come from the DB anyway
+        if self.chat_loaded:
+            self.chat_tail.append(message)
+
+    def invalidate(self):
+        """Re-render on the next request - for state changes that are not broadcast"""
+        self.revision += 1
+
+    def invalidate_events(self):
+        self.events = None
+        self.invalidate()
+
+    async def get_events(self) -> List[Dict[str, Any]]:
+        while True:
+            key = self._events_key()
+            if self.events is not None and self.events_loaded_for == key:
+                return self.events
+
+            revision = self.revision
+            events = await self._load_events()
+            if self.revision == revision:
+                self.events = events
+                self.events_loaded_for = key
+                self._events_etag = f'"events.{hashlib.sha1(dumps(events)).hexdigest()[:20]}"'
+                return events
+            # Invalidated while loading - the result may predate the edit, load again
+
+    async def render(self, version: str, state: Callable[[], Dict[str, Any]]) -> Tuple[str, bytes]:
+        """
+        Return (etag, body) for the given state version
+
+        Concurrent requests for a version that is not rendered yet wait for
+        a single render instead of each querying Mongo.
+        """
+        etag = self.etag_for(version)
+        if etag == self._etag:
+            self.hits += 1
+            return etag, self._body
+
+        async with self._lock:
+            if etag == self._etag:
+                self.hits += 1
+                return etag, self._body
+
+            if not self.chat_loaded:
+                self.chat_tail.extend(await self._load_chat_tail(LIVE_SNAPSHOT_CHAT_TAIL))
+                self.chat_loaded = True
+            events = await self.get_events()
+
+            snapshot = state()
+            snapshot.update({
+                "version": etag.strip('"'),
+                "chat": list(self.chat_tail),
+                "events": events
+            })
+            self._body = dumps(snapshot)
+            self._etag = etag
+            self.renders += 1
+            return etag, self._body
+
+    def etag_for(self, version: str) -> str:
+        """ETag of the snapshot for a state version - cheap, for If-None-Match checks"""
+        return f'"{version}.{self.revision}.{self._events_key()}"'
+
+    def events_etag(self) -> Optional[str]:
+        """ETag of the event list get_events() last returned, derived from its content"""
+        return self._events_etag
+
+    async def publish_events_change(self):
+        """Drop the cached event list here and, through the shared revision, on every other worker"""
+        self.invalidate_events()
+        if self._revisions is None:
+            return
+        document = await self._revisions.find_one_and_update(
+            {"_id": EVENTS_REVISION_DOCUMENT_ID},
+            {"$inc": {"revision": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if self.events_revision is not None and document["revision"] != self.events_revision + 1:
+            # Another worker's change landed in between and won't be seen by the poll
+            self.invalidate_events()
+        self.events_revision = document["revision"]
+
+    async def refresh_events_revision(self) -> bool:
+        """Drop the cached event list if another worker changed events, returns True if it did"""
+        document = await self._revisions.find_one({"_id": EVENTS_REVISION_DOCUMENT_ID})
+        revision = document["revision"] if document else 0
+        if revision == self.events_revision:
+            return False
+        changed = self.events_revision is not None
+        self.events_revision = revision
+        if changed:
+            self.invalidate_events()
+        return changed
+
+    async def run(self):
+        """Poll loop for the shared events revision, started on app startup"""
+        while True:
+            try:
+                await self.refresh_events_revision()
+            except Exception as e:
+                logging.error(f"Events revision poll error: {str(e)}")
+            await asyncio.sleep(EVENTS_POLL_INTERVAL)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "renders": self.renders,
+            "hits": self.hits,
+            "chat_tail": len(self.chat_tail),
+            "events_cached": self.events is not None,
+            "body_bytes": len(self._body) if self._body else 0
+        }
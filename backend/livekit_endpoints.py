@@ -12,6 +12,7 @@ from livekit_streaming import (
     livekit_service,
     RoomCreateRequest,
     TokenRequest,
+    BatchTokenRequest,
     create_outlet34_room,
     create_admin_token,
     create_viewer_token
@@ -111,6 +112,22 @@ async def quick_generate_token(request: QuickTokenRequest):
         logger.error(f"❌ API: Quick token error - {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@livekit_router.post("/tokens/batch")
+async def batch_generate_tokens(request: BatchTokenRequest):
+    """
+    Viewer Tokens für eine Liste von Zuschauern in einem Aufruf generieren
+    """
+    try:
+        logger.info(f"🚀 API: Batch tokens for {len(request.viewer_ids)} viewers in {request.room_name}")
+        result = await livekit_service.generate_viewer_tokens(request)
+        logger.info(f"✅ API: Batch tokens generated - {result['total']} tokens, {result['reused']} reused")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"❌ API: Batch token error - {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @livekit_router.get("/rooms/list")
 async def list_rooms():
     """
@@ -189,6 +206,7 @@ async def livekit_health():
             "status": "healthy",
             "livekit_url": livekit_service.config.url,
             "active_rooms": rooms["total_rooms"],
+            "token_cache": livekit_service.token_cache.stats(),
             "sdk_available": True
         }
     except Exception as e:
@@ -5,13 +5,23 @@ Implements professional video streaming with LiveKit Cloud
 
 import os
 import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from livekit import api
 import asyncio
 
+from token_cache import TokenCache
+
 logger = logging.getLogger(__name__)
 
+# Viewer tokens are valid for 2 hours (streaming session)
+VIEWER_TOKEN_TTL_SECONDS = 2 * 3600
+
+# Worker threads used for bulk token signing
+TOKEN_SIGNING_WORKERS = int(os.getenv("LIVEKIT_TOKEN_WORKERS", "4"))
+
 class LiveKitTokenService:
     """Service for managing LiveKit Cloud tokens and rooms"""
     
@@ -21,6 +31,18 @@ class LiveKitTokenService:
         self.api_secret = os.getenv("LIVEKIT_API_SECRET")
         self.livekit_url = os.getenv("LIVEKIT_URL", "wss://live-stream-q7s7lvvw.livekit.cloud")
         
+        # Reuse signed viewer tokens while they have enough lifetime left
+        self.viewer_token_cache = TokenCache(
+            refresh_threshold=int(os.getenv("LIVEKIT_TOKEN_REFRESH_THRESHOLD", "900"))
+        )
+        
+        # Bulk signing runs off the event loop
+        self.signing_workers = TOKEN_SIGNING_WORKERS
+        self._signing_pool = ThreadPoolExecutor(
+            max_workers=TOKEN_SIGNING_WORKERS,
+            thread_name_prefix="livekit-token"
+        )
+        
         if not self.api_key or not self.api_secret:
             logger.warning("LiveKit API credentials not configured - LiveKit features will be disabled")
             self.livekit_api = None
@@ -99,6 +121,59 @@ class LiveKitTokenService:
             logger.error(f"Failed to create publisher token: {str(e)}")
             raise Exception(f"Token generation failed: {str(e)}")
     
+    def sign_viewer_token(
+        self,
+        room_name: str,
+        participant_identity: str,
+        participant_name: str = None,
+        metadata: Dict[str, Any] = None
+    ) -> Tuple[str, float]:
+        """
+        Sign (or reuse from cache) a view-only LiveKit token
+        
+        Synchronous so it can also run inside a worker pool.
+        
+        Returns:
+            Tuple of JWT token string and its expiry as unix timestamp
+        """
+        metadata_str = str(metadata) if metadata else ""
+        cache_key = (room_name, participant_identity, "viewer", participant_name or "", metadata_str)
+        
+        cached = self.viewer_token_cache.get(cache_key)
+        if cached:
+            return cached
+        
+        # Create access token with viewer permissions only
+        token = api.AccessToken(self.api_key, self.api_secret)
+        token.with_identity(participant_identity)
+        
+        if participant_name:
+            token.with_name(participant_name)
+        
+        if metadata_str:
+            token.with_metadata(metadata_str)
+        
+        # Configure video grants for viewer (view-only permissions)
+        video_grants = api.VideoGrants(
+            room_join=True,
+            room=room_name,
+            can_publish=False,       # Cannot publish video/audio
+            can_subscribe=True,      # Can subscribe to streams
+            can_publish_data=True,   # Can send chat messages
+            can_update_own_metadata=False, # Cannot update metadata
+            room_admin=False,
+            room_create=False
+        )
+        
+        token.with_grants(video_grants)
+        token.with_ttl(timedelta(seconds=VIEWER_TOKEN_TTL_SECONDS))
+        
+        expires_at = int(time.time()) + VIEWER_TOKEN_TTL_SECONDS
+        jwt_token = token.to_jwt()
+        self.viewer_token_cache.put(cache_key, jwt_token, expires_at)
+        
+        return jwt_token, expires_at
+    
     async def create_viewer_token(
         self,
         room_name: str,
@@ -109,6 +184,9 @@ class LiveKitTokenService:
         """
         Generate LiveKit access token for viewer (view-only customer)
         
+        A still-valid token for the same room, identity and grants is
+        returned from the cache instead of signing a new one.
+        
         Args:
             room_name: Name of the room
             participant_identity: Unique identity for participant
@@ -122,35 +200,10 @@ class LiveKitTokenService:
             raise Exception("LiveKit service not properly initialized - credentials missing")
             
         try:
-            # Create access token with viewer permissions only
-            token = api.AccessToken(self.api_key, self.api_secret)
-            token.with_identity(participant_identity)
-            
-            if participant_name:
-                token.with_name(participant_name)
-            
-            if metadata:
-                token.with_metadata(str(metadata))
-            
-            # Configure video grants for viewer (view-only permissions)
-            video_grants = api.VideoGrants(
-                room_join=True,
-                room=room_name,
-                can_publish=False,       # Cannot publish video/audio
-                can_subscribe=True,      # Can subscribe to streams
-                can_publish_data=True,   # Can send chat messages
-                can_update_own_metadata=False, # Cannot update metadata
-                room_admin=False,
-                room_create=False
+            jwt_token, _ = self.sign_viewer_token(
+                room_name, participant_identity, participant_name, metadata
             )
-            
-            token.with_grants(video_grants)
-            
-            # Token valid for 2 hours
-            token.with_ttl(timedelta(hours=2))
-            
-            jwt_token = token.to_jwt()
-            logger.info(f"Viewer token created for {participant_identity} in room {room_name}")
+            logger.debug(f"Viewer token ready for {participant_identity} in room {room_name}")
             
             return jwt_token
             
@@ -158,6 +211,41 @@ class LiveKitTokenService:
             logger.error(f"Failed to create viewer token: {str(e)}")
             raise Exception(f"Token generation failed: {str(e)}")
     
+    def _sign_viewer_token_chunk(
+        self,
+        room_name: str,
+        participants: List[Tuple[str, str, Dict[str, Any]]]
+    ) -> List[Tuple[str, str, float]]:
+        """Sign a chunk of viewer tokens (runs inside the signing pool)"""
+        signed = []
+        for identity, name, metadata in participants:
+            jwt_token, expires_at = self.sign_viewer_token(room_name, identity, name, metadata)
+            signed.append((identity, jwt_token, expires_at))
+        return signed
+    
+    async def sign_viewer_tokens_pooled(
+        self,
+        room_name: str,
+        participants: List[Tuple[str, str, Dict[str, Any]]]
+    ) -> List[Tuple[str, str, float]]:
+        """
+        Sign view-only tokens for many participants in the worker pool
+        
+        Args:
+            room_name: Name of the room
+            participants: List of (identity, display name, metadata) tuples
+            
+        Returns:
+            List of (identity, JWT token, expiry unix timestamp) tuples
+        """
+        if not self.livekit_api:
+            raise Exception("LiveKit service not properly initialized - credentials missing")
+        
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._signing_pool, self._sign_viewer_token_chunk, room_name, participants
+        )
+    
     async def create_room(
         self,
         room_name: str,
@@ -292,6 +380,7 @@ class LiveKitTokenService:
         try:
             request = api.DeleteRoomRequest(room=room_name)
             await self.livekit_api.room.delete_room(request)
+            self.viewer_token_cache.invalidate_room(room_name)
             
             logger.info(f"Room ended: {room_name}")
             return True
@@ -415,6 +504,8 @@ class LiveKitTokenService:
     
     async def close(self):
         """Close the LiveKit API connection"""
+        self._signing_pool.shutdown(wait=False)
+        
         if not self.livekit_api:
             return
             
@@ -8,11 +8,14 @@ import logging
 import asyncio
 from typing import Optional, Dict, Any, List
 from datetime import datetime, timedelta
+import time
 import uuid
 
 from fastapi import HTTPException
 from pydantic import BaseModel
 
+from token_cache import TokenCache
+
 # LiveKit Imports
 try:
     from livekit import api
@@ -53,6 +56,13 @@ class TokenRequest(BaseModel):
     participant_name: str
     is_admin: Optional[bool] = False
 
+class BatchTokenRequest(BaseModel):
+    room_name: str
+    viewer_ids: List[str]
+
+# Token Gültigkeit (4 Stunden)
+TOKEN_TTL_SECONDS = 4 * 3600
+
 class LiveKitStreamingService:
     """Hauptklasse für LiveKit Streaming Operations"""
     
@@ -60,6 +70,10 @@ class LiveKitStreamingService:
         self.config = livekit_config
         self.active_rooms = {}
         self.participants = {}
+        # Signierte Tokens wiederverwenden solange noch genug Restlaufzeit bleibt
+        self.token_cache = TokenCache(
+            refresh_threshold=int(os.getenv("LIVEKIT_TOKEN_REFRESH_THRESHOLD", "900"))
+        )
         
     def get_livekit_api(self):
         """LiveKit API Client erstellen"""
@@ -120,70 +134,130 @@ class LiveKitStreamingService:
                 detail=f"LiveKit room creation failed: {str(e)}"
             )
     
+    def _sign_token(self, room_name: str, participant_name: str, is_admin: bool):
+        """Token signieren oder aus dem Cache holen - gibt (jwt, expires_at, cached) zurück"""
+        cache_key = (room_name, participant_name, "admin" if is_admin else "viewer")
+        cached = self.token_cache.get(cache_key)
+        if cached:
+            return cached[0], cached[1], True
+
+        token = AccessToken(self.config.api_key, self.config.api_secret)
+        token = token.with_identity(participant_name)
+
+        # Permissions je nach Rolle
+        if is_admin:
+            grants = VideoGrants(
+                room_join=True,
+                room=room_name,
+                room_admin=True,
+                can_publish=True,
+                can_subscribe=True,
+                can_publish_data=True
+            )
+        else:
+            grants = VideoGrants(
+                room_join=True,
+                room=room_name,
+                can_subscribe=True,
+                can_publish_data=True
+            )
+
+        token = token.with_grants(grants)
+        token = token.with_ttl(timedelta(seconds=TOKEN_TTL_SECONDS))
+
+        expires_at = int(time.time()) + TOKEN_TTL_SECONDS
+        jwt_token = token.to_jwt()
+        self.token_cache.put(cache_key, jwt_token, expires_at)
+
+        return jwt_token, expires_at, False
+
+    def _register_participant(self, room_name: str, participant_name: str, is_admin: bool, expires_at: float):
+        """Teilnehmer in lokaler Registry vermerken"""
+        if room_name not in self.participants:
+            self.participants[room_name] = []
+
+        self.participants[room_name].append({
+            "name": participant_name,
+            "is_admin": is_admin,
+            "joined_at": datetime.utcnow(),
+            "token_expires": datetime.utcfromtimestamp(expires_at)
+        })
+
     async def generate_token(self, request: TokenRequest) -> Dict[str, Any]:
         """Access Token für Teilnehmer generieren"""
         try:
             logger.info(f"🎫 Generating token for {request.participant_name} (admin: {request.is_admin})")
-            
-            # Token erstellen
-            token = AccessToken(self.config.api_key, self.config.api_secret)
-            token = token.with_identity(request.participant_name)
-            
-            # Permissions je nach Rolle
-            if request.is_admin:
-                grants = VideoGrants(
-                    room_join=True,
-                    room=request.room_name,
-                    room_admin=True,
-                    can_publish=True,
-                    can_subscribe=True,
-                    can_publish_data=True
-                )
-                logger.info(f"👑 Admin permissions granted for {request.participant_name}")
-            else:
-                grants = VideoGrants(
-                    room_join=True,
-                    room=request.room_name,
-                    can_subscribe=True,
-                    can_publish_data=True
+
+            jwt_token, expires_at, cached = self._sign_token(
+                request.room_name, request.participant_name, request.is_admin
+            )
+
+            # Bei Cache-Treffer ist der Teilnehmer bereits registriert
+            if not cached:
+                self._register_participant(
+                    request.room_name, request.participant_name, request.is_admin, expires_at
                 )
-                logger.info(f"👤 Viewer permissions granted for {request.participant_name}")
-            
-            token = token.with_grants(grants)
-            token = token.with_ttl(timedelta(hours=4))  # 4 Stunden gültig
-            
-            jwt_token = token.to_jwt()
-            
-            # Teilnehmer registrieren
-            if request.room_name not in self.participants:
-                self.participants[request.room_name] = []
-            
-            self.participants[request.room_name].append({
-                "name": request.participant_name,
-                "is_admin": request.is_admin,
-                "joined_at": datetime.utcnow(),
-                "token_expires": datetime.utcnow() + timedelta(hours=4)
-            })
-            
-            logger.info(f"✅ Token generated successfully for {request.participant_name}")
-            
+
+            logger.info(f"✅ Token {'reused' if cached else 'generated'} for {request.participant_name}")
+
             return {
                 "success": True,
                 "token": jwt_token,
                 "participant_name": request.participant_name,
                 "room_name": request.room_name,
                 "livekit_url": self.config.url,
-                "expires_in": 14400,  # 4 hours in seconds
+                "expires_in": int(expires_at - time.time()),
                 "is_admin": request.is_admin
             }
-            
+
         except Exception as e:
             logger.error(f"❌ Token generation failed: {str(e)}")
             raise HTTPException(
                 status_code=500,
                 detail=f"Token generation failed: {str(e)}"
             )
-    
+
+    async def generate_viewer_tokens(self, request: BatchTokenRequest) -> Dict[str, Any]:
+        """Viewer Tokens für eine ganze Liste von Zuschauern auf einmal generieren"""
+        try:
+            logger.info(f"🎫 Generating {len(request.viewer_ids)} viewer tokens for room {request.room_name}")
+
+            tokens = []
+            reused = 0
+            now = time.time()
+            for viewer_id in dict.fromkeys(request.viewer_ids):
+                participant_name = f"viewer-{viewer_id}"
+                jwt_token, expires_at, cached = self._sign_token(request.room_name, participant_name, False)
+                if cached:
+                    reused += 1
+                else:
+                    self._register_participant(request.room_name, participant_name, False, expires_at)
+
+                tokens.append({
+                    "viewer_id": viewer_id,
+                    "participant_name": participant_name,
+                    "token": jwt_token,
+                    "expires_in": int(expires_at - now)
+                })
+
+            logger.info(f"✅ Batch tokens ready - {len(tokens)} total, {reused} reused")
+
+            return {
+                "success": True,
+                "room_name": request.room_name,
+                "livekit_url": self.config.url,
+                "tokens": tokens,
+                "total": len(tokens),
+                "reused": reused
+            }
+
+        except Exception as e:
+            logger.error(f"❌ Batch token generation failed: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Batch token generation failed: {str(e)}"
+            )
+
     async def list_rooms(self) -> Dict[str, Any]:
         """Aktive Räume auflisten"""
         try:
@@ -293,6 +367,7 @@ class LiveKitStreamingService:
                 del self.active_rooms[room_name]
             if room_name in self.participants:
                 del self.participants[room_name]
+            self.token_cache.invalidate_room(room_name)
             
             logger.info(f"✅ Room {room_name} deleted successfully")
             
@@ -0,0 +1,162 @@
+"""
+Event Pre-Warming
+Runs the expensive parts of a show start (LiveKit room, host token, caches)
+a configurable lead time before each calendar event instead of on click
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Events starting within this many minutes are warmed up
+PREWARM_LEAD_MINUTES = float(os.getenv("PREWARM_LEAD_MINUTES", "15"))
+PREWARM_POLL_INTERVAL = float(os.getenv("PREWARM_POLL_INTERVAL", "60"))  # seconds
+# Warm state is kept this long after the event start, then dropped
+PREWARM_RETENTION_HOURS = float(os.getenv("PREWARM_RETENTION_HOURS", "4"))
+# Cached customer status responses live this long - the bound on how stale a
+# block or deactivation made on another worker can be
+CUSTOMER_STATUS_CACHE_TTL = float(os.getenv("CUSTOMER_STATUS_CACHE_TTL", "10"))  # seconds
+CUSTOMER_STATUS_CACHE_SIZE = 50000
+
+
+class WarmCache:
+    """Entries that expire CUSTOMER_STATUS_CACHE_TTL seconds after they were put"""
+
+    def __init__(self, ttl: float = CUSTOMER_STATUS_CACHE_TTL, max_entries: int = CUSTOMER_STATUS_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        now = time.monotonic()
+        if len(self.entries) >= self.max_entries:
+            self.entries = {key: value for key, value in self.entries.items() if value[0] > now}
+            if len(self.entries) >= self.max_entries:
+                self.entries.pop(next(iter(self.entries)))
+        self.entries[key] = (now + self.ttl, entry)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        cached = self.entries.get(key)
+        if cached is not None and cached[0] <= time.monotonic():
+            del self.entries[key]
+            cached = None
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return cached[1]
+
+    def forget(self, key: str):
+        self.entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+class PrewarmScheduler:
+    """
+    Polls the calendar and warms every event once its start is within the
+    lead time
+
+    Warm state is keyed by event id and start time, so a rescheduled event
+    is warmed again for its new start.
+    """
+
+    def __init__(self, load_events: Callable[[datetime, datetime], Awaitable[List[Dict[str, Any]]]],
+                 warm_event: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]):
+        self._load_events = load_events
+        self._warm_event = warm_event
+        self.warmed: Dict[str, Dict[str, Any]] = {}
+        self._warmed_for: Dict[str, datetime] = {}
+        self.runs = 0
+        self.last_run: Optional[datetime] = None
+
+    def lead_time(self) -> timedelta:
+        return timedelta(minutes=PREWARM_LEAD_MINUTES)
+
+    async def run_once(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Warm all events starting before now + lead time, returns the newly warmed ones"""
+        now = now or datetime.now(timezone.utc)
+        self._prune(now)
+
+        # Events that already started are still warmed (e.g. after a restart mid-show)
+        retention = timedelta(hours=PREWARM_RETENTION_HOURS)
+        events = await self._load_events(now - retention, now + self.lead_time())
+
+        warmed = []
+        for event in events:
+            if self._warmed_for.get(event["id"]) == event["starts_at"]:
+                continue
+            try:
+                warmed.append(await self.warm(event, now))
+            except Exception as e:
+                logging.error(f"Pre-warming event {event['id']} failed: {str(e)}")
+
+        self.runs += 1
+        self.last_run = now
+        return warmed
+
+    async def warm(self, event: Dict[str, Any], now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Warm one event now, regardless of the lead time"""
+        result = await self._warm_event(event)
+        result.update({
+            "event_id": event["id"],
+            "title": event["title"],
+            "starts_at": event["starts_at"],
+            "warmed_at": now or datetime.now(timezone.utc)
+        })
+        self.warmed[event["id"]] = result
+        self._warmed_for[event["id"]] = event["starts_at"]
+        logging.info(f"🔥 Pre-warmed event '{event['title']}' starting {event['starts_at'].isoformat()}")
+        return result
+
+    async def run(self):
+        """Poll loop, started on app startup"""
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logging.error(f"Pre-warm scheduler error: {str(e)}")
+            await asyncio.sleep(PREWARM_POLL_INTERVAL)
+
+    def forget_event(self, event_id: str):
+        """Drop the warm state of a deleted or rescheduled event"""
+        self.warmed.pop(event_id, None)
+        self._warmed_for.pop(event_id, None)
+
+    def get(self, event_id: str) -> Optional[Dict[str, Any]]:
+        return self.warmed.get(event_id)
+
+    def find_room(self, room_name: str) -> Optional[Dict[str, Any]]:
+        for result in self.warmed.values():
+            if result.get("room_name") == room_name:
+                return result
+        return None
+
+    def _prune(self, now: datetime):
+        cutoff = now - timedelta(hours=PREWARM_RETENTION_HOURS)
+        for event_id in [event_id for event_id, starts_at in self._warmed_for.items() if starts_at < cutoff]:
+            self.forget_event(event_id)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "lead_minutes": PREWARM_LEAD_MINUTES,
+            "poll_interval": PREWARM_POLL_INTERVAL,
+            "runs": self.runs,
+            "last_run": self.last_run,
+            # Host tokens stay out of the overview
+            "events": [
+                {key: value for key, value in result.items() if key != "host_token"}
+                for result in sorted(self.warmed.values(), key=lambda result: result["starts_at"])
+            ]
+        }
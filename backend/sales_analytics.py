@@ -0,0 +1,265 @@
+"""
+Sales Analytics
+Aggregation pipelines over the orders collection and a result cache per
+show window, so dashboards do not rescan orders on every refresh; plus
+the in-memory live aggregates of the running session
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Results for windows that are still open (a live show) are reused this long
+ANALYTICS_LIVE_TTL = float(os.getenv("ANALYTICS_LIVE_TTL", "15"))  # seconds
+ANALYTICS_CACHE_SIZE = 256
+TOP_CUSTOMERS_LIMIT = 10
+
+# Per-minute buckets kept by the live aggregator, and the sliding windows it reports
+SALES_WINDOW_MINUTES = 60
+SALES_RATE_WINDOWS = (1, 5, 15)
+
+# Columns of the order export, in order
+ORDER_EXPORT_FIELDS = ["id", "timestamp", "customer_id", "product_id", "product_name", "size", "quantity", "price"]
+
+
+def match_window(start: Optional[datetime], end: Optional[datetime]) -> Dict[str, Any]:
+    """$match stage on the timestamp index"""
+    selector: Dict[str, Any] = {}
+    if start or end:
+        selector["timestamp"] = {}
+        if start:
+            selector["timestamp"]["$gte"] = start
+        if end:
+            selector["timestamp"]["$lt"] = end
+    return {"$match": selector}
+
+
+def _totals() -> Dict[str, Any]:
+    # Order.price already is unit price x quantity
+    return {
+        "orders": {"$sum": 1},
+        "quantity": {"$sum": "$quantity"},
+        "revenue": {"$sum": "$price"}
+    }
+
+
+def revenue_by_product(start: Optional[datetime], end: Optional[datetime], limit: int) -> List[Dict[str, Any]]:
+    return [
+        match_window(start, end),
+        {"$group": {"_id": "$product_id", **_totals()}},
+        {"$sort": {"revenue": -1, "_id": 1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "product_id": "$_id", "orders": 1, "quantity": 1, "revenue": {"$round": ["$revenue", 2]}}}
+    ]
+
+
+def revenue_by_size(start: Optional[datetime], end: Optional[datetime], limit: int) -> List[Dict[str, Any]]:
+    # Sizes are per product (A460 vs. XXL), so they are grouped together
+    return [
+        match_window(start, end),
+        {"$group": {"_id": {"product_id": "$product_id", "size": "$size"}, **_totals()}},
+        {"$sort": {"revenue": -1, "_id.product_id": 1, "_id.size": 1}},
+        {"$limit": limit},
+        {"$project": {
+            "_id": 0, "product_id": "$_id.product_id", "size": "$_id.size",
+            "orders": 1, "quantity": 1, "revenue": {"$round": ["$revenue", 2]}
+        }}
+    ]
+
+
+def orders_per_minute(start: Optional[datetime], end: Optional[datetime], limit: int) -> List[Dict[str, Any]]:
+    return [
+        match_window(start, end),
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%dT%H:%M:00Z", "date": "$timestamp"}},
+            **_totals()
+        }},
+        {"$sort": {"_id": 1}},
+        {"$limit": limit},
+        {"$project": {"_id": 0, "minute": "$_id", "orders": 1, "quantity": 1, "revenue": {"$round": ["$revenue", 2]}}}
+    ]
+
+
+def top_customers(start: Optional[datetime], end: Optional[datetime], limit: int) -> List[Dict[str, Any]]:
+    return [
+        match_window(start, end),
+        {"$group": {"_id": "$customer_id", **_totals(), "last_order_at": {"$max": "$timestamp"}}},
+        {"$sort": {"revenue": -1, "_id": 1}},
+        {"$limit": limit},
+        {"$project": {
+            "_id": 0, "customer_id": "$_id", "orders": 1, "quantity": 1,
+            "revenue": {"$round": ["$revenue", 2]}, "last_order_at": 1
+        }}
+    ]
+
+
+# Report name -> pipeline builder
+REPORTS: Dict[str, Callable[[Optional[datetime], Optional[datetime], int], List[Dict[str, Any]]]] = {
+    "revenue-by-product": revenue_by_product,
+    "revenue-by-size": revenue_by_size,
+    "orders-per-minute": orders_per_minute,
+    "top-customers": top_customers
+}
+
+
+class AnalyticsCache:
+    """
+    Report results keyed by report and window
+
+    Closed windows (a past show) cannot change and are kept until evicted;
+    open ones expire after ANALYTICS_LIVE_TTL. Concurrent requests for the
+    same key share one aggregation.
+    """
+
+    def __init__(self, max_entries: int = ANALYTICS_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple, Tuple[float, Any]] = {}
+        self._pending: Dict[Tuple, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get_or_compute(self, key: Tuple, end: Optional[datetime],
+                             compute: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        pending = self._pending.get(key)
+        if pending:
+            self.hits += 1
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = self._pending[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await compute()
+        except Exception as e:
+            future.set_exception(e)
+            # Nobody else may be waiting - don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+        closed = end is not None and end <= datetime.now(timezone.utc)
+        if len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (float("inf") if closed else time.monotonic() + ANALYTICS_LIVE_TTL, result)
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class SalesAggregator:
+    """
+    Running totals of the current session, fed by every order
+
+    record() is O(1); snapshot() only walks the products, sizes and the
+    per-minute buckets of the last SALES_WINDOW_MINUTES.
+    """
+
+    def __init__(self):
+        # All-time count - incremented per order, periodically reset to the DB count
+        # so workers that each only see their own orders agree again
+        self.total_orders = 0
+        self.version = 0
+        self.reset_session()
+
+    def reset_session(self):
+        self.session_started = datetime.now(timezone.utc)
+        self.session_orders = 0
+        self.units = 0
+        self.revenue = 0.0
+        self.by_product: Dict[str, List] = {}
+        self.by_size: Dict[Tuple[str, str], List] = {}
+        # [minute since epoch, orders, units, revenue] - only minutes with orders
+        self.minutes: deque = deque(maxlen=SALES_WINDOW_MINUTES)
+        self.version += 1
+
+    def record(self, product_id: str, size: str, quantity: int, revenue: float,
+               at: Optional[float] = None):
+        self.total_orders += 1
+        self.session_orders += 1
+        self.units += quantity
+        self.revenue += revenue
+
+        for totals in (self.by_product.setdefault(product_id, [0, 0, 0.0]),
+                       self.by_size.setdefault((product_id, size), [0, 0, 0.0])):
+            totals[0] += 1
+            totals[1] += quantity
+            totals[2] += revenue
+
+        minute = int((at if at is not None else time.time()) // 60)
+        if not self.minutes or self.minutes[-1][0] != minute:
+            self.minutes.append([minute, 0, 0, 0.0])
+        bucket = self.minutes[-1]
+        bucket[1] += 1
+        bucket[2] += quantity
+        bucket[3] += revenue
+        self.version += 1
+
+    def reconcile_total(self, total_orders: int):
+        """Adopt the all-time count from the database"""
+        if total_orders != self.total_orders:
+            self.total_orders = total_orders
+            self.version += 1
+
+    @staticmethod
+    def current_minute() -> int:
+        return int(time.time() // 60)
+
+    def window(self, minutes: int, now_minute: Optional[int] = None) -> Dict[str, Any]:
+        """Totals of the last `minutes` minutes, the current one included"""
+        first = (now_minute if now_minute is not None else self.current_minute()) - minutes + 1
+        orders = units = 0
+        revenue = 0.0
+        for minute, bucket_orders, bucket_units, bucket_revenue in self.minutes:
+            if minute < first:
+                continue
+            orders += bucket_orders
+            units += bucket_units
+            revenue += bucket_revenue
+        return {
+            "orders": orders,
+            "units": units,
+            "revenue": round(revenue, 2),
+            "orders_per_minute": round(orders / minutes, 2)
+        }
+
+    def snapshot(self, product_names: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        product_names = product_names or {}
+        now_minute = self.current_minute()
+        return {
+            "session_started": self.session_started,
+            "session_orders": self.session_orders,
+            "total_orders": self.total_orders,
+            "session_units": self.units,
+            "session_revenue": round(self.revenue, 2),
+            "products": sorted((
+                {
+                    "product_id": product_id,
+                    "product_name": product_names.get(product_id, "Unknown Product"),
+                    "orders": orders, "quantity": quantity, "revenue": round(revenue, 2)
+                }
+                for product_id, (orders, quantity, revenue) in self.by_product.items()
+            ), key=lambda row: -row["revenue"]),
+            "sizes": sorted((
+                {"product_id": product_id, "size": size, "orders": orders, "quantity": quantity, "revenue": round(revenue, 2)}
+                for (product_id, size), (orders, quantity, revenue) in self.by_size.items()
+            ), key=lambda row: -row["revenue"]),
+            "windows": {f"{minutes}m": self.window(minutes, now_minute) for minutes in SALES_RATE_WINDOWS},
+            "per_minute": [
+                {
+                    "minute": datetime.fromtimestamp(minute * 60, timezone.utc),
+                    "orders": orders, "units": units, "revenue": round(revenue, 2)
+                }
+                for minute, orders, units, revenue in self.minutes
+                if minute > now_minute - SALES_WINDOW_MINUTES
+            ]
+        }
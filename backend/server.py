@@ -1,16 +1,26 @@
 from fastapi import FastAPI, APIRouter, WebSocket, WebSocketDisconnect, HTTPException, File, UploadFile, Depends
 from fastapi.websockets import WebSocketState
+from fastapi import Query, Request, Response
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Literal, Optional, Set, Tuple
+from collections import deque
+import asyncio
 import uuid
 from datetime import datetime, timezone, timedelta
+from zoneinfo import ZoneInfo
+import hashlib
 import json
+import csv
+import io
 import jwt
 import time
 import base64
@@ -24,6 +34,18 @@ from livekit_service import livekit_service
 # LiveKit Imports
 from livekit_endpoints import livekit_router
 
+from zoom_token_service import ZoomTokenService, TokenRevokedError
+from fast_json import FastJSONResponse, dumps, dumps_text
+from live_snapshot import LiveSnapshotCache
+from ws_protocol import CompactEncoder, PROTOCOL_JSON, negotiate as negotiate_ws_protocol
+from webrtc_relay import WebRTCRelayManager
+from admission import AdmissionController, client_address
+from ticker_store import TickerStore
+from sales_analytics import AnalyticsCache, SalesAggregator, REPORTS, match_window, ORDER_EXPORT_FIELDS, TOP_CUSTOMERS_LIMIT
+from chat_archive import ChatArchiver
+from chat_moderation import ChatModerator
+from prewarm import PrewarmScheduler, WarmCache, PREWARM_LEAD_MINUTES
+
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
@@ -37,38 +59,219 @@ if not ZOOM_SDK_KEY or not ZOOM_SDK_SECRET:
     raise ValueError("Zoom SDK credentials must be set in environment variables")
 
 # Create the main app without a prefix
-app = FastAPI()
+app = FastAPI(default_response_class=FastJSONResponse)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
 
 # WebSocket connection manager
+GLOBAL_TOPIC = "global"
+# Topics a client may (un)subscribe itself; role topics are fixed at connect
+SELF_SERVICE_TOPIC_PREFIXES = ("room:", "lang:")
+MAX_TOPICS_PER_CONNECTION = 20
+# Recent broadcasts kept for clients resuming with ?last_seq=
+WS_EVENT_LOG_SIZE = int(os.environ.get('WS_EVENT_LOG_SIZE', '1000'))
+# State snapshots rather than events - a reconnecting client gets them fresh anyway
+EPHEMERAL_MESSAGE_TYPES = {"ping", "viewer_count", "sales_update"}
+
+
+class ConnectionInfo:
+    """A /ws client and what we know about it"""
+    __slots__ = ("id", "websocket", "customer_number", "language", "role", "protocol", "delta_state", "topics",
+                 "backlog", "joined_at", "last_seen")
+
+    def __init__(self, websocket: WebSocket, customer_number: Optional[str] = None, language: Optional[str] = None,
+                 role: str = "customer", protocol: str = PROTOCOL_JSON):
+        self.id = uuid.uuid4().hex
+        self.websocket = websocket
+        self.customer_number = customer_number
+        self.language = language
+        self.role = role
+        self.protocol = protocol
+        # Last counter values this client received, base for compact deltas
+        self.delta_state: Dict[str, Tuple] = {}
+        self.topics: Set[str] = set()
+        # Live broadcasts held back while a resume replay is in progress
+        self.backlog: Optional[List[dict]] = None
+        self.joined_at = datetime.now(timezone.utc)
+        self.last_seen = time.monotonic()
+
+
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.viewer_count = 0
-
-    async def connect(self, websocket: WebSocket):
+        # connection id -> info; insertion ordered, O(1) add/remove
+        self.active_connections: Dict[str, ConnectionInfo] = {}
+        self.connection_ids: Dict[WebSocket, str] = {}
+        # topic -> connection id -> info
+        self.topic_index: Dict[str, Dict[str, ConnectionInfo]] = {}
+        # Sequence numbers restart with the process; epoch tells clients they can't resume across restarts
+        self.epoch = uuid.uuid4().hex[:8]
+        self.sequence = 0
+        self.event_log: deque = deque(maxlen=WS_EVENT_LOG_SIZE)  # (seq, topic, message)
+
+    @property
+    def viewer_count(self) -> int:
+        return len(self.active_connections)
+
+    async def connect(self, websocket: WebSocket, customer_number: Optional[str] = None,
+                      language: Optional[str] = None, role: str = "customer",
+                      rooms: Optional[List[str]] = None, protocol: str = PROTOCOL_JSON,
+                      last_seq: Optional[int] = None, epoch: Optional[str] = None) -> ConnectionInfo:
         await websocket.accept()
-        self.active_connections.append(websocket)
-        self.viewer_count += 1
+        info = self.register(websocket, customer_number, language, role, rooms, protocol)
+        info.backlog = []
+        try:
+            if protocol != PROTOCOL_JSON:
+                # Tell the client which framing it actually got (msgpack may fall back to compact JSON)
+                await self.send_message(info, {"type": "hello", "protocol": protocol})
+            await self.resume(info, last_seq, epoch)
+        finally:
+            info.backlog = None
         await self.broadcast_viewer_count()
+        return info
+
+    async def resume(self, info: ConnectionInfo, last_seq: Optional[int], epoch: Optional[str]):
+        """
+        Bring a (re)connecting client up to date
+
+        Clients that send their last seen sequence get only the broadcasts
+        they missed from the event log, or resync_required if the gap is no
+        longer in the log (or the server restarted in between). The sync
+        frame follows the replay, so a client that disconnects mid-replay
+        has only advanced as far as the frames it actually received.
+        Broadcasts arriving meanwhile are queued in info.backlog and sent afterwards.
+        """
+        current = self.sequence
+
+        sent = current
+        if last_seq is not None and last_seq != current:
+            oldest = self.event_log[0][0] if self.event_log else current + 1
+            if epoch != self.epoch or last_seq > current or last_seq < oldest - 1:
+                await self.send_message(info, {"type": "resync_required", "seq": current})
+            else:
+                missed = [message for seq, topic, message in self.event_log
+                          if last_seq < seq <= current and topic in info.topics]
+                for message in missed:
+                    await self.send_message(info, message)
+
+        await self.send_message(info, {"type": "sync", "epoch": self.epoch, "seq": current})
+
+        # Live broadcasts that came in while replaying, minus anything the replay already covered
+        while info.backlog:
+            message = info.backlog.pop(0)
+            if message.get("seq", sent + 1) > sent:
+                await self.send_message(info, message)
+
+    def register(self, websocket: WebSocket, customer_number: Optional[str] = None,
+                 language: Optional[str] = None, role: str = "customer",
+                 rooms: Optional[List[str]] = None, protocol: str = PROTOCOL_JSON) -> ConnectionInfo:
+        info = ConnectionInfo(websocket, customer_number, language, role, protocol)
+        self.active_connections[info.id] = info
+        self.connection_ids[websocket] = info.id
+
+        self.subscribe(info, GLOBAL_TOPIC)
+        self.subscribe(info, f"role:{role}")
+        if language:
+            self.subscribe(info, f"lang:{language}")
+        for room in rooms or []:
+            self.subscribe(info, f"room:{room}")
+        return info
+
+    def disconnect(self, websocket: WebSocket) -> Optional[ConnectionInfo]:
+        connection_id = self.connection_ids.pop(websocket, None)
+        if connection_id is None:
+            return None
+        info = self.active_connections.pop(connection_id, None)
+        if info:
+            for topic in list(info.topics):
+                self.unsubscribe(info, topic)
+        return info
+
+    def subscribe(self, info: ConnectionInfo, topic: str) -> bool:
+        if topic in info.topics:
+            return True
+        if len(info.topics) >= MAX_TOPICS_PER_CONNECTION:
+            return False
+        info.topics.add(topic)
+        self.topic_index.setdefault(topic, {})[info.id] = info
+        return True
+
+    def unsubscribe(self, info: ConnectionInfo, topic: str):
+        info.topics.discard(topic)
+        subscribers = self.topic_index.get(topic)
+        if subscribers is not None:
+            subscribers.pop(info.id, None)
+            if not subscribers:
+                del self.topic_index[topic]
+
+    def handle_client_message(self, info: ConnectionInfo, message: dict):
+        """Self-service (un)subscribe: {"type": "subscribe"|"unsubscribe", "topics": [...]}"""
+        message_type = message.get("type")
+        if message_type not in ("subscribe", "unsubscribe"):
+            return
 
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-            self.viewer_count -= 1
+        for topic in message.get("topics") or []:
+            if not isinstance(topic, str) or not topic.startswith(SELF_SERVICE_TOPIC_PREFIXES):
+                continue
+            if message_type == "subscribe":
+                self.subscribe(info, topic)
+            else:
+                self.unsubscribe(info, topic)
+
+    def subscriber_count(self, topic: str) -> int:
+        return len(self.topic_index.get(topic, ()))
+
+    def reap_idle(self, cutoff: float) -> List[WebSocket]:
+        """Unregister every connection silent since before cutoff, returns their sockets"""
+        stale = [info for info in self.active_connections.values() if info.last_seen < cutoff]
+        for info in stale:
+            self.disconnect(info.websocket)
+        return [info.websocket for info in stale]
 
     async def send_personal_message(self, message: str, websocket: WebSocket):
         if websocket.client_state == WebSocketState.CONNECTED:
             await websocket.send_text(message)
 
-    async def broadcast(self, message: str):
+    async def send_message(self, info: ConnectionInfo, message: dict):
+        await self._send(info, message, None, None)
+
+    async def _send(self, info: ConnectionInfo, message: dict, json_frame: Optional[str],
+                    encoder: Optional[CompactEncoder]):
+        if info.protocol == PROTOCOL_JSON:
+            await info.websocket.send_text(json_frame if json_frame is not None else dumps_text(message))
+            return
+
+        frame = (encoder or CompactEncoder(message)).frame_for(info.protocol, info.delta_state)
+        if isinstance(frame, bytes):
+            await info.websocket.send_bytes(frame)
+        else:
+            await info.websocket.send_text(frame)
+
+    async def broadcast(self, message: dict, topic: str = GLOBAL_TOPIC):
+        """Send to every subscriber of topic (all clients for the global topic)"""
+        if message.get("type") not in EPHEMERAL_MESSAGE_TYPES:
+            self.sequence += 1
+            message = {**message, "seq": self.sequence}
+            self.event_log.append((self.sequence, topic, message))
+
         disconnected = []
-        for connection in self.active_connections:
+        subscribers = list(self.topic_index.get(topic, {}).values())
+        if not subscribers:
+            return
+
+        # Encode once per protocol, not once per connection
+        json_frame = dumps_text(message)
+        encoder = CompactEncoder(message)
+
+        # Snapshot - connects/disconnects during the awaits don't affect this broadcast
+        for info in subscribers:
+            if info.backlog is not None:
+                info.backlog.append(message)
+                continue
+            connection = info.websocket
             try:
                 if connection.client_state == WebSocketState.CONNECTED:
-                    await connection.send_text(message)
+                    await self._send(info, message, json_frame, encoder)
                 else:
                     disconnected.append(connection)
             except:
@@ -76,42 +279,17 @@ class ConnectionManager:
         
         # Remove disconnected clients
         for conn in disconnected:
-            if conn in self.active_connections:
-                self.active_connections.remove(conn)
-                self.viewer_count -= 1
+            self.disconnect(conn)
 
     async def broadcast_viewer_count(self):
-        message = json.dumps({
+        await self.broadcast({
             "type": "viewer_count",
             "count": self.viewer_count
         })
-        await self.broadcast(message)
 
 manager = ConnectionManager()
 
-def generate_zoom_jwt(topic: str, role: int = 0, expires_in_hours: int = 2) -> str:
-    """
-    Generate JWT token for Zoom Video SDK authentication
-    """
-    try:
-        current_time = int(time.time())
-        expiration_time = current_time + (expires_in_hours * 3600)
-        
-        payload = {
-            'iss': ZOOM_SDK_KEY,
-            'exp': expiration_time,
-            'topic': topic,
-            'role_type': role,
-            'aud': 'zoom',
-            'alg': 'HS256'
-        }
-        
-        token = jwt.encode(payload, ZOOM_SDK_SECRET, algorithm='HS256')
-        return token
-        
-    except Exception as e:
-        logging.error(f"JWT generation failed: {str(e)}")
-        raise HTTPException(status_code=500, detail="Token generation failed")
+zoom_token_service = ZoomTokenService(ZOOM_SDK_KEY, ZOOM_SDK_SECRET)
 
 # Models
 class ChatMessage(BaseModel):
@@ -120,11 +298,17 @@ class ChatMessage(BaseModel):
     message: str
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     emoji: str = ""
+    room: Optional[str] = None
 
 class ChatMessageCreate(BaseModel):
     username: str
     message: str
     emoji: str = ""
+    room: Optional[str] = None  # None = main show chat for everyone
+
+class ChatPresence(BaseModel):
+    customer_number: str
+    action: Literal["login", "logout"]
 
 class Product(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -161,6 +345,7 @@ class LiveShoppingEvent(BaseModel):
     time: str  # HH:MM format
     title: str
     description: str = ""
+    starts_at: Optional[datetime] = None  # date + time in EVENTS_TIMEZONE, stored as UTC
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
@@ -187,6 +372,7 @@ class StreamSession(BaseModel):
     streamer_id: str
     stream_title: str = "Live Shopping Stream"
     status: str = "active"  # active, ended
+    mode: Literal["p2p", "sfu"] = "p2p"  # p2p (streamer browser serves viewers), sfu (backend relays)
     viewer_count: int = 0
     max_viewers: int = 50
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
@@ -195,6 +381,7 @@ class StreamSession(BaseModel):
 class StreamSessionCreate(BaseModel):
     stream_title: Optional[str] = "Live Shopping Stream"
     max_viewers: Optional[int] = 50
+    mode: Literal["p2p", "sfu"] = "p2p"
 
 class WebRTCOffer(BaseModel):
     sdp: str
@@ -206,8 +393,13 @@ class WebRTCAnswer(BaseModel):
 
 class ICECandidate(BaseModel):
     candidate: str
-    sdpMLineIndex: int
-    sdpMid: str
+    sdpMLineIndex: Optional[int] = None
+    sdpMid: Optional[str] = None
+    usernameFragment: Optional[str] = None
+
+class ICECandidateBatch(BaseModel):
+    type: str = "ice-candidates"
+    candidates: List[ICECandidate]
 
 # LiveKit Models
 class LiveKitTokenRequest(BaseModel):
@@ -215,6 +407,7 @@ class LiveKitTokenRequest(BaseModel):
     participant_type: str = "viewer"  # "publisher" or "viewer"
     participant_name: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+    customer_number: Optional[str] = None  # registered viewers get a stable identity
 
 class LiveKitTokenResponse(BaseModel):
     token: str
@@ -224,6 +417,18 @@ class LiveKitTokenResponse(BaseModel):
     livekit_url: str
     expires_in: int = 7200  # 2 hours
 
+class TickerSettings(BaseModel):
+    text: str
+    enabled: bool
+
+class TickerSettingsUpdate(BaseModel):
+    text: Optional[str] = None
+    enabled: Optional[bool] = None
+
+class LiveKitBulkTokenRequest(BaseModel):
+    customer_numbers: List[str]
+    room_names: List[str]
+
 class LiveKitRoomRequest(BaseModel):
     room_name: str
     max_participants: Optional[int] = 50
@@ -261,83 +466,282 @@ class CustomerUpdate(BaseModel):
     activation_status: str  # active, blocked
     profile_image: Optional[str] = None
 
-# In-memory counter and settings for demo
-order_counter = 0
-ticker_settings = {
-    "text": "Nur für Händler | Ab 10 € - Heute 18:00 - Frische Ware | Young Fashion & Plus Size",
-    "enabled": True
+class CustomerBulkStatusRequest(BaseModel):
+    activation_status: str  # pending, active, blocked
+    customer_ids: Optional[List[str]] = None
+    # Alternatively select by current status, e.g. "pending" to approve the whole queue
+    current_status: Optional[str] = None
+
+# Tokens signed per worker pool task in bulk minting
+BULK_TOKEN_CHUNK_SIZE = 500
+
+# Customers per insert_many/update_many batch in bulk admin operations
+CUSTOMER_BATCH_SIZE = 1000
+CUSTOMER_ACTIVATION_STATUSES = ("pending", "active", "blocked")
+
+# Live sales KPIs of the running session, updated per order without DB queries
+sales_aggregator = SalesAggregator()
+# Admins get sales_update at most once per interval
+SALES_PUSH_INTERVAL = float(os.environ.get('SALES_PUSH_INTERVAL', '1'))
+# The all-time order total is re-read from the DB this often (orders from other workers)
+SALES_RECONCILE_INTERVAL = float(os.environ.get('SALES_RECONCILE_INTERVAL', '10'))
+
+DEFAULT_TICKER_SETTINGS = TickerSettings(
+    text="Nur für Händler | Ab 10 € - Heute 18:00 - Frische Ware | Young Fashion & Plus Size",
+    enabled=True
+)
+
+async def load_chat_tail(limit: int) -> List[Dict[str, Any]]:
+    """Newest messages of the main chat, oldest first"""
+    messages = await db.chat_messages.find({"room": None}).sort("timestamp", -1).limit(limit).to_list(limit)
+    return [ChatMessage(**msg).dict() for msg in reversed(messages)]
+
+# Calendar dates/times are entered in local show time
+EVENTS_TIMEZONE = ZoneInfo(os.environ.get('EVENTS_TIMEZONE', 'Europe/Berlin'))
+MAX_EVENTS_PER_QUERY = 1000
+
+def event_starts_at(date: str, time_of_day: str) -> datetime:
+    """UTC start of an event from its local YYYY-MM-DD and HH:MM"""
+    local = datetime.strptime(f"{date} {time_of_day}", "%Y-%m-%d %H:%M").replace(tzinfo=EVENTS_TIMEZONE)
+    return local.astimezone(timezone.utc)
+
+def events_today() -> str:
+    return datetime.now(EVENTS_TIMEZONE).date().isoformat()
+
+def event_response(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": event["id"],
+        "date": event["date"],
+        "time": event["time"],
+        "title": event["title"],
+        "description": event.get("description", ""),
+        # Mongo hands back naive UTC datetimes
+        "starts_at": event["starts_at"].replace(tzinfo=timezone.utc) if event.get("starts_at") else None,
+        "created_at": event["created_at"],
+        "updated_at": event["updated_at"]
+    }
+
+async def query_events(starts_from: Optional[datetime] = None, starts_to: Optional[datetime] = None,
+                       limit: int = MAX_EVENTS_PER_QUERY) -> List[Dict[str, Any]]:
+    """Events by start time range, served by the (starts_at, id) index"""
+    selector: Dict[str, Any] = {}
+    if starts_from or starts_to:
+        selector["starts_at"] = {}
+        if starts_from:
+            selector["starts_at"]["$gte"] = starts_from
+        if starts_to:
+            selector["starts_at"]["$lt"] = starts_to
+    
+    cursor = db.events.find(selector, {"_id": 0}).sort([("starts_at", ASCENDING), ("id", ASCENDING)]).limit(limit)
+    return [event_response(event) for event in await cursor.to_list(limit)]
+
+async def load_events() -> List[Dict[str, Any]]:
+    """Upcoming events (from the start of today, local show time)"""
+    start_of_today = datetime.now(EVENTS_TIMEZONE).replace(hour=0, minute=0, second=0, microsecond=0)
+    return await query_events(starts_from=start_of_today.astimezone(timezone.utc))
+
+# Chat messages older than CHAT_HOT_HOURS move to chat_archive, keyed by local show date
+chat_archiver = ChatArchiver(
+    db.chat_messages, db.chat_archive,
+    show_date_for=lambda timestamp: timestamp.astimezone(EVENTS_TIMEZONE).date().isoformat()
+)
+
+# Rate limits, duplicate suppression and blocklist for chat, before anything is stored or broadcast
+chat_moderator = ChatModerator()
+# Login/logout notices, worded by the server - they look alike on purpose
+CHAT_PRESENCE_MESSAGES = {
+    "login": "{customer_number} hat sich angemeldet",
+    "logout": "{customer_number} hat sich abgemeldet"
+}
+CHAT_REJECTIONS = {
+    "rate_limited": (429, "Too many messages, please wait a moment"),
+    "duplicate": (429, "Message already sent"),
+    "flood": (429, "Message already sent by too many users"),
+    "blocked": (400, "Message contains blocked content")
 }
 
+# In-memory state behind /api/live/snapshot
+live_snapshot = LiveSnapshotCache(load_chat_tail, load_events, events_key=events_today, revisions=db.settings)
+
+# Status check responses, kept for a few seconds - writes on this worker forget them right away
+customer_status_cache = WarmCache()
+
+async def sfu_viewers_changed(stream_id: str, count: int):
+    """Keep a relayed stream's viewer count in step with its subscribers, dropped connections included"""
+    stream = stream_manager.active_streams.get(stream_id)
+    if stream:
+        stream.viewer_count = count
+        stream_manager.schedule_viewer_count_update(stream_id)
+
+# Server-side relay for SFU mode streams
+relay_manager = WebRTCRelayManager(on_viewers_changed=sfu_viewers_changed)
+
+# Aggregation window for trickled ICE candidates on signaling sockets
+ICE_BATCH_WINDOW = float(os.environ.get('ICE_BATCH_WINDOW_MS', '30')) / 1000
+
+# Viewer count DB writes and broadcasts are coalesced over this interval
+VIEWER_COUNT_FLUSH_INTERVAL = 0.25
+
+# Rate limits and join queue for viewer sockets
+admission_controller = AdmissionController()
+
+# Server-driven heartbeat: sockets silent for WS_IDLE_TIMEOUT seconds are reaped
+WS_HEARTBEAT_INTERVAL = float(os.environ.get('WS_HEARTBEAT_INTERVAL', '20'))
+WS_IDLE_TIMEOUT = float(os.environ.get('WS_IDLE_TIMEOUT', '60'))
+WS_CLOSE_TIMEOUT = 2.0
+
 # WebRTC Stream Manager
 class WebRTCStreamManager:
     def __init__(self):
         self.active_streams: Dict[str, StreamSession] = {}
-        self.stream_connections: Dict[str, List[WebSocket]] = {}  # stream_id -> viewer connections
+        self.stream_connections: Dict[str, Dict[str, WebSocket]] = {}  # stream_id -> viewer_id -> viewer connection
         self.streamer_connections: Dict[str, WebSocket] = {}  # stream_id -> streamer connection
+        # Peers that accept batched candidate frames: (stream_id, viewer_id or None for the streamer)
+        self.ice_batching_peers: Set[Tuple[str, Optional[str]]] = set()
+        # (stream_id, target viewer_id or None, sender viewer_id or None) -> buffered candidates
+        self.pending_candidates: Dict[Tuple[str, Optional[str], Optional[str]], List[dict]] = {}
+        # Streams with a pending viewer count flush
+        self.viewer_count_flushes: Set[str] = set()
+        # (stream_id, viewer_id or None for the streamer) -> last inbound frame (monotonic)
+        self.last_seen: Dict[Tuple[str, Optional[str]], float] = {}
+        # Timer-driven flushes in flight - referenced here so they are not garbage collected
+        self.background_tasks: Set[asyncio.Task] = set()
         
     async def create_stream(self, streamer_id: str, stream_data: StreamSessionCreate) -> StreamSession:
         """Create new streaming session"""
+        max_viewers = stream_data.max_viewers
+        if stream_data.mode == "sfu" and "max_viewers" not in stream_data.model_fields_set:
+            # Relay capacity scales with server cores instead of the streamer's uplink
+            max_viewers = relay_manager.capacity()
+        
         stream = StreamSession(
             streamer_id=streamer_id,
             stream_title=stream_data.stream_title,
-            max_viewers=stream_data.max_viewers
+            mode=stream_data.mode,
+            max_viewers=max_viewers
         )
         
         self.active_streams[stream.id] = stream
-        self.stream_connections[stream.id] = []
+        self.stream_connections[stream.id] = {}
         
         # Store in database
         await db.stream_sessions.insert_one(stream.dict())
         
         return stream
     
-    async def join_stream(self, stream_id: str, viewer_ws: WebSocket) -> bool:
-        """Add viewer to stream"""
+    async def join_stream(self, stream_id: str, viewer_ws: WebSocket) -> Optional[str]:
+        """Add viewer to stream, returns the assigned viewer id (None if the join failed)"""
         if stream_id not in self.active_streams:
-            return False
+            return None
             
         stream = self.active_streams[stream_id]
         if len(self.stream_connections[stream_id]) >= stream.max_viewers:
-            return False
-            
-        self.stream_connections[stream_id].append(viewer_ws)
-        stream.viewer_count = len(self.stream_connections[stream_id])
+            return None
         
-        # Update database
-        await db.stream_sessions.update_one(
-            {"id": stream_id},
-            {"$set": {"viewer_count": stream.viewer_count}}
-        )
+        viewer_id = uuid.uuid4().hex[:12]
+        self.stream_connections[stream_id][viewer_id] = viewer_ws
+        self.touch(stream_id, viewer_id)
+        stream.viewer_count = len(self.stream_connections[stream_id])
         
-        # Broadcast viewer count update
-        await self.broadcast_to_stream(stream_id, {
-            "type": "viewer_count_update",
-            "count": stream.viewer_count
+        # Tell the viewer its id and the streamer whom to negotiate with
+        await self.send_to_viewer(stream_id, viewer_id, {
+            "type": "joined",
+            "viewer_id": viewer_id
+        })
+        await self.send_to_streamer(stream_id, {
+            "type": "viewer-joined",
+            "viewer_id": viewer_id
         })
         
-        return True
+        self.schedule_viewer_count_update(stream_id)
+        
+        return viewer_id
     
-    async def leave_stream(self, stream_id: str, viewer_ws: WebSocket):
+    async def leave_stream(self, stream_id: str, viewer_id: str):
         """Remove viewer from stream"""
         if stream_id in self.stream_connections:
-            if viewer_ws in self.stream_connections[stream_id]:
-                self.stream_connections[stream_id].remove(viewer_ws)
+            if self.stream_connections[stream_id].pop(viewer_id, None) is None:
+                return
+            self.ice_batching_peers.discard((stream_id, viewer_id))
+            self.last_seen.pop((stream_id, viewer_id), None)
                 
             if stream_id in self.active_streams:
                 stream = self.active_streams[stream_id]
                 stream.viewer_count = len(self.stream_connections[stream_id])
                 
-                # Update database
-                await db.stream_sessions.update_one(
-                    {"id": stream_id},
-                    {"$set": {"viewer_count": stream.viewer_count}}
-                )
-                
-                # Broadcast viewer count update
-                await self.broadcast_to_stream(stream_id, {
-                    "type": "viewer_count_update",
-                    "count": stream.viewer_count
+                # Let the streamer close that viewer's peer connection
+                await self.send_to_streamer(stream_id, {
+                    "type": "viewer-left",
+                    "viewer_id": viewer_id
                 })
+                
+                self.schedule_viewer_count_update(stream_id)
+    
+    def touch(self, stream_id: str, viewer_id: Optional[str] = None):
+        """Record an inbound frame - any frame counts as liveness"""
+        self.last_seen[(stream_id, viewer_id)] = time.monotonic()
+    
+    async def reap_idle(self, cutoff: float) -> List[WebSocket]:
+        """Drop viewers and streamers silent since before cutoff, returns their sockets"""
+        sockets = []
+        stale = [peer for peer, seen in self.last_seen.items() if seen < cutoff]
+        for stream_id, viewer_id in stale:
+            if viewer_id is not None:
+                viewer_ws = self.stream_connections.get(stream_id, {}).get(viewer_id)
+                if viewer_ws is not None:
+                    sockets.append(viewer_ws)
+                await self.leave_stream(stream_id, viewer_id)
+                self.last_seen.pop((stream_id, viewer_id), None)
+                continue
+            
+            # A dead streamer ends the stream, same as a regular disconnect
+            streamer_ws = self.streamer_connections.pop(stream_id, None)
+            self.last_seen.pop((stream_id, None), None)
+            if streamer_ws is not None:
+                sockets.append(streamer_ws)
+            stream = self.active_streams.get(stream_id)
+            if stream:
+                await self.end_stream(stream_id, stream.streamer_id)
+        return sockets
+    
+    def schedule_viewer_count_update(self, stream_id: str):
+        """Persist and broadcast the viewer count once per flush interval instead of per join/leave"""
+        if stream_id in self.viewer_count_flushes:
+            return
+        
+        self.viewer_count_flushes.add(stream_id)
+        asyncio.get_running_loop().call_later(
+            VIEWER_COUNT_FLUSH_INTERVAL, lambda: self._spawn(self._flush_viewer_count(stream_id))
+        )
+    
+    def _spawn(self, coro):
+        """Run a flush as a task that is kept alive and whose failure is logged"""
+        task = asyncio.ensure_future(coro)
+        self.background_tasks.add(task)
+        task.add_done_callback(self._background_task_done)
+    
+    def _background_task_done(self, task: asyncio.Task):
+        self.background_tasks.discard(task)
+        if not task.cancelled() and task.exception():
+            logging.error(f"Stream background task failed: {str(task.exception())}")
+    
+    async def _flush_viewer_count(self, stream_id: str):
+        self.viewer_count_flushes.discard(stream_id)
+        stream = self.active_streams.get(stream_id)
+        if not stream:
+            return
+        
+        # Update database
+        await db.stream_sessions.update_one(
+            {"id": stream_id},
+            {"$set": {"viewer_count": stream.viewer_count}}
+        )
+        
+        # Broadcast viewer count update
+        await self.broadcast_to_stream(stream_id, {
+            "type": "viewer_count_update",
+            "count": stream.viewer_count
+        })
     
     async def end_stream(self, stream_id: str, streamer_id: str) -> bool:
         """End streaming session"""
@@ -363,44 +767,155 @@ class WebRTCStreamManager:
         )
         
         # Cleanup
+        if stream.mode == "sfu":
+            await relay_manager.close_session(stream_id)
         if stream_id in self.streamer_connections:
             del self.streamer_connections[stream_id]
         if stream_id in self.stream_connections:
             del self.stream_connections[stream_id]
+        self.ice_batching_peers = {peer for peer in self.ice_batching_peers if peer[0] != stream_id}
+        self.last_seen = {peer: seen for peer, seen in self.last_seen.items() if peer[0] != stream_id}
+        admission_controller.forget_stream(stream_id)
         del self.active_streams[stream_id]
         
         return True
     
-    async def broadcast_to_stream(self, stream_id: str, message: dict):
-        """Broadcast message to all participants in stream"""
+    async def send_to_viewer(self, stream_id: str, viewer_id: str, message: dict) -> bool:
+        """Send message to a single viewer"""
+        ws = self.stream_connections.get(stream_id, {}).get(viewer_id)
+        if ws is None:
+            return False
+        
+        try:
+            if ws.client_state == WebSocketState.CONNECTED:
+                await ws.send_text(dumps_text(message))
+                return True
+        except:
+            pass
+        
+        await self.leave_stream(stream_id, viewer_id)
+        return False
+    
+    async def send_to_streamer(self, stream_id: str, message: dict) -> bool:
+        """Send message to the stream's streamer"""
+        streamer_ws = self.streamer_connections.get(stream_id)
+        if streamer_ws is None:
+            return False
+        
+        try:
+            if streamer_ws.client_state == WebSocketState.CONNECTED:
+                await streamer_ws.send_text(dumps_text(message))
+                return True
+        except:
+            pass
+        return False
+    
+    @staticmethod
+    def _extract_candidates(message: dict) -> Optional[List[dict]]:
+        """Candidates carried by a single ("ice-candidate") or batched ("ice-candidates") frame"""
+        if message.get("type") == "ice-candidate" and message.get("candidate"):
+            # model_validate rejects a non-object candidate with a ValidationError (a ValueError)
+            return [ICECandidate.model_validate(message["candidate"]).dict(exclude_none=True)]
+        if message.get("type") == "ice-candidates":
+            return [c.dict(exclude_none=True) for c in ICECandidateBatch.model_validate(message).candidates]
+        return None
+    
+    async def _deliver(self, stream_id: str, target: Optional[str], sender: Optional[str], data: dict):
+        """Send signaling data to a viewer (target) or to the streamer (target None)"""
+        if target is None:
+            await self.send_to_streamer(stream_id, {
+                "type": "signaling",
+                "from": "viewer",
+                "viewer_id": sender,
+                "data": data
+            })
+        else:
+            await self.send_to_viewer(stream_id, target, {
+                "type": "signaling",
+                "from": "streamer",
+                "data": data
+            })
+    
+    async def _route_candidates(self, stream_id: str, target: Optional[str], sender: Optional[str], candidates: List[dict]):
+        """Aggregate candidates for batching peers, forward one by one to legacy peers"""
+        if (stream_id, target) not in self.ice_batching_peers:
+            for candidate in candidates:
+                await self._deliver(stream_id, target, sender, {"type": "ice-candidate", "candidate": candidate})
+            return
+        
+        key = (stream_id, target, sender)
+        pending = self.pending_candidates.get(key)
+        if pending is not None:
+            pending.extend(candidates)
+            return
+        
+        # First candidate opens the aggregation window
+        self.pending_candidates[key] = list(candidates)
+        asyncio.get_running_loop().call_later(
+            ICE_BATCH_WINDOW, lambda: self._spawn(self._flush_candidates(key))
+        )
+    
+    async def _flush_candidates(self, key: Tuple[str, Optional[str], Optional[str]]):
+        candidates = self.pending_candidates.pop(key, None)
+        if not candidates:
+            return
+        
+        stream_id, target, sender = key
+        await self._deliver(stream_id, target, sender, {"type": "ice-candidates", "candidates": candidates})
+    
+    async def route_streamer_message(self, stream_id: str, message: dict):
+        """Route a signaling message from the streamer to its target viewer"""
+        target = message.get("to") if isinstance(message, dict) else None
+        if target:
+            candidates = self._extract_candidates(message)
+            if candidates is not None:
+                await self._route_candidates(stream_id, target, None, candidates)
+            else:
+                await self._deliver(stream_id, target, None, message)
+        else:
+            # Legacy clients without addressing: all viewers, never back to the streamer
+            await self.broadcast_to_viewers(stream_id, {
+                "type": "signaling",
+                "from": "streamer",
+                "data": message
+            })
+    
+    async def route_viewer_message(self, stream_id: str, viewer_id: str, message: dict):
+        """Route a signaling message from a viewer to the streamer, tagged with the sender"""
+        candidates = self._extract_candidates(message) if isinstance(message, dict) else None
+        if candidates is not None:
+            await self._route_candidates(stream_id, None, viewer_id, candidates)
+        else:
+            await self._deliver(stream_id, None, viewer_id, message)
+    
+    async def broadcast_to_viewers(self, stream_id: str, message: dict):
+        """Broadcast message to all viewers in stream"""
         if stream_id not in self.stream_connections:
             return
             
-        message_str = json.dumps(message, default=str)
+        message_str = dumps_text(message)
         disconnected = []
         
-        # Send to all viewers
-        for ws in self.stream_connections[stream_id]:
+        for viewer_id, ws in list(self.stream_connections[stream_id].items()):
             try:
                 if ws.client_state == WebSocketState.CONNECTED:
                     await ws.send_text(message_str)
                 else:
-                    disconnected.append(ws)
-            except:
-                disconnected.append(ws)
-        
-        # Send to streamer
-        if stream_id in self.streamer_connections:
-            try:
-                streamer_ws = self.streamer_connections[stream_id]
-                if streamer_ws.client_state == WebSocketState.CONNECTED:
-                    await streamer_ws.send_text(message_str)
+                    disconnected.append(viewer_id)
             except:
-                pass
+                disconnected.append(viewer_id)
         
         # Cleanup disconnected viewers
-        for ws in disconnected:
-            await self.leave_stream(stream_id, ws)
+        for viewer_id in disconnected:
+            await self.leave_stream(stream_id, viewer_id)
+    
+    async def broadcast_to_stream(self, stream_id: str, message: dict):
+        """Broadcast message to all participants in stream"""
+        if stream_id not in self.stream_connections:
+            return
+        
+        await self.broadcast_to_viewers(stream_id, message)
+        await self.send_to_streamer(stream_id, message)
 
 stream_manager = WebRTCStreamManager()
 
@@ -411,37 +926,59 @@ async def root():
 
 @api_router.get("/admin/stats")
 async def get_admin_stats():
-    global order_counter
-    total_orders = await db.orders.count_documents({})
     return {
-        "total_orders": total_orders,
-        "session_orders": order_counter
+        "total_orders": sales_aggregator.total_orders,
+        "session_orders": sales_aggregator.session_orders
     }
 
+@api_router.get("/admin/sales/live")
+async def get_live_sales():
+    """Current session KPIs - the same data admins receive as sales_update over /ws"""
+    return FastJSONResponse(sales_aggregator.snapshot({product["id"]: product["name"] for product in DEMO_PRODUCTS}))
+
 @api_router.post("/admin/reset-counter")
 async def reset_order_counter():
-    global order_counter
-    order_counter = 0
-    return {"message": "Order counter reset", "new_count": order_counter}
+    sales_aggregator.reset_session()
+    # The snapshot carries session_orders too
+    live_snapshot.invalidate()
+    if manager.subscriber_count("role:admin"):
+        await manager.broadcast({
+            "type": "order_counter_update",
+            "data": {
+                "session_orders": sales_aggregator.session_orders,
+                "total_orders": sales_aggregator.total_orders
+            }
+        }, "role:admin")
+    return {"message": "Order counter reset", "new_count": sales_aggregator.session_orders}
+
+async def broadcast_ticker_update(settings: Dict[str, Any]):
+    # Local /ws clients only - every worker broadcasts the versions it sees
+    await manager.broadcast({
+        "type": "ticker_update",
+        "data": settings
+    })
+
+# Persisted ticker settings, shared by all workers through Mongo
+ticker_store = TickerStore(db.settings, DEFAULT_TICKER_SETTINGS.dict(), on_change=broadcast_ticker_update)
 
 @api_router.get("/admin/ticker")
-async def get_ticker_settings():
-    global ticker_settings
-    return ticker_settings
+async def get_ticker_settings(request: Request):
+    """Current ticker settings with their version, 304 if the client's ETag matches"""
+    etag = ticker_store.etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return FastJSONResponse(ticker_store.public(), headers={"ETag": etag, "Cache-Control": "no-cache"})
 
 @api_router.post("/admin/ticker")
-async def update_ticker_settings(settings: dict):
-    global ticker_settings
-    ticker_settings.update(settings)
-    
-    # Broadcast ticker update to all clients
-    broadcast_data = {
-        "type": "ticker_update",
-        "data": ticker_settings
-    }
-    await manager.broadcast(json.dumps(broadcast_data, default=str))
-    
-    return ticker_settings
+async def update_ticker_settings(settings: TickerSettingsUpdate):
+    """Change text and/or enabled - broadcast to clients only if the content changes"""
+    try:
+        await ticker_store.update({key: value for key, value in settings.dict().items() if value is not None})
+        return ticker_store.public()
+        
+    except Exception as e:
+        logging.error(f"Error updating ticker settings: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to update ticker settings")
 
 # Zoom Integration Endpoints
 @api_router.post("/zoom/generate-token")
@@ -453,13 +990,18 @@ async def generate_zoom_token(request: ZoomTokenRequest):
         if not request.topic.strip():
             raise HTTPException(status_code=400, detail="Topic name cannot be empty")
             
-        token = generate_zoom_jwt(
-            topic=request.topic,
-            role=request.role,
-            expires_in_hours=2
-        )
+        # Cached per (topic, role) and signed off the event loop
+        try:
+            token, exp = await zoom_token_service.get_token(
+                topic=request.topic,
+                role=request.role,
+                expires_in_hours=2
+            )
+        except Exception as e:
+            logging.error(f"JWT generation failed: {str(e)}")
+            raise HTTPException(status_code=500, detail="Token generation failed")
         
-        expires_at = datetime.now(timezone.utc) + timedelta(hours=2)
+        expires_at = datetime.fromtimestamp(exp, tz=timezone.utc)
         
         return {
             "token": token,
@@ -474,6 +1016,13 @@ async def generate_zoom_token(request: ZoomTokenRequest):
         logging.error(f"Zoom token generation error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@api_router.get("/zoom/token-stats")
+async def get_zoom_token_stats():
+    """
+    Latency and CPU cost of Zoom token generation
+    """
+    return zoom_token_service.stats()
+
 @api_router.post("/zoom/create-session")
 async def create_zoom_session(request: ZoomSessionRequest):
     """
@@ -482,19 +1031,11 @@ async def create_zoom_session(request: ZoomSessionRequest):
     try:
         session_id = f"live_shopping_{int(time.time())}"
         
-        # Generate host token for session creator
-        host_token = generate_zoom_jwt(
-            topic=session_id,
-            role=1,  # Host role
-            expires_in_hours=4
-        )
-        
-        # Generate viewer token template
-        viewer_token = generate_zoom_jwt(
-            topic=session_id,
-            role=0,  # Participant role
-            expires_in_hours=4
-        )
+        # Host and viewer tokens, both signed in the worker pool
+        host_token, viewer_token = [token for token, _ in await asyncio.gather(
+            zoom_token_service.get_token(topic=session_id, role=1, expires_in_hours=4),  # Host role
+            zoom_token_service.get_token(topic=session_id, role=0, expires_in_hours=4)   # Participant role
+        )]
         
         session_data = {
             "session_id": session_id,
@@ -523,7 +1064,7 @@ async def validate_zoom_token(token: str):
     Validate Zoom JWT token for debugging
     """
     try:
-        payload = jwt.decode(token, ZOOM_SDK_SECRET, algorithms=['HS256'], audience='zoom')
+        payload = zoom_token_service.validate(token)
         return {
             "valid": True,
             "payload": payload,
@@ -531,66 +1072,190 @@ async def validate_zoom_token(token: str):
         }
     except jwt.ExpiredSignatureError:
         return {"valid": False, "error": "Token has expired"}
+    except TokenRevokedError:
+        return {"valid": False, "error": "Session has ended"}
     except jwt.InvalidTokenError:
         return {"valid": False, "error": "Invalid token"}
 
+@api_router.post("/zoom/session/{session_id}/end")
+async def end_zoom_session(session_id: str):
+    """
+    End a Zoom live shopping session and revoke its tokens
+    """
+    try:
+        result = await db.zoom_sessions.update_one(
+            {"session_id": session_id},
+            {"$set": {
+                "status": "ended",
+                "ended_at": datetime.now(timezone.utc).isoformat()
+            }}
+        )
+        
+        if result.matched_count == 0:
+            raise HTTPException(status_code=404, detail="Session not found")
+        
+        evicted = zoom_token_service.revoke_topic(session_id)
+        
+        return {"message": "Zoom session ended successfully", "session_id": session_id, "revoked_tokens": evicted}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Zoom session end error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to end Zoom session")
+
 @api_router.get("/stream/status")
 async def get_stream_status():
     return {
         "is_live": True,
         "viewer_count": manager.viewer_count,
         "stream_title": "Live Shopping Demo with Zoom",
-        "stream_description": ticker_settings["text"]
+        "stream_description": ticker_store.settings["text"]
     }
 
-@api_router.post("/chat", response_model=ChatMessage)
-async def send_chat_message(message: ChatMessageCreate):
-    chat_msg = ChatMessage(**message.dict())
+def live_snapshot_state() -> Dict[str, Any]:
+    # viewer_count is left out on purpose - it changes with every join and arrives via /ws on connect
+    return {
+        "stream": {
+            "is_live": True,
+            "stream_title": "Live Shopping Demo with Zoom",
+            "stream_description": ticker_store.settings["text"]
+        },
+        "ticker": ticker_store.public(),
+        "products": DEMO_PRODUCTS,
+        "counters": {"session_orders": sales_aggregator.session_orders},
+        "ws": {"epoch": manager.epoch, "seq": manager.sequence}
+    }
+
+@api_router.get("/live/snapshot")
+async def get_live_snapshot(request: Request):
+    """
+    Stream status, ticker, chat tail, events, products and counters in one response
     
+    Served from memory with an ETag; If-None-Match gets a 304 without rendering.
+    Connect /ws with the returned ws.epoch/ws.seq to receive only newer broadcasts.
+    """
+    try:
+        version = f"{manager.epoch}.{manager.sequence}"
+        etag = live_snapshot.etag_for(version)
+        if request.headers.get("if-none-match") == etag:
+            live_snapshot.hits += 1
+            return Response(status_code=304, headers={"ETag": etag})
+        
+        etag, body = await live_snapshot.render(version, live_snapshot_state)
+        return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+        
+    except Exception as e:
+        logging.error(f"Error building live snapshot: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to build live snapshot")
+
+def moderate_chat_message(client_ip: str, sender: str, text: str, check_duplicates: bool = True):
+    rejection = chat_moderator.check(client_ip, sender, text, check_duplicates=check_duplicates)
+    if rejection:
+        status_code, detail = CHAT_REJECTIONS[rejection]
+        raise HTTPException(status_code=status_code, detail=detail)
+
+async def publish_chat_message(chat_msg: ChatMessage) -> ChatMessage:
     # Store in database
     await db.chat_messages.insert_one(chat_msg.dict())
+    if not chat_msg.room:
+        live_snapshot.add_chat_message(chat_msg.dict())
     
-    # Broadcast to all connected clients
+    # Broadcast to the room's subscribers, or to everyone for the main chat
     broadcast_data = {
         "type": "chat_message",
         "data": chat_msg.dict()
     }
-    await manager.broadcast(json.dumps(broadcast_data, default=str))
+    await manager.broadcast(broadcast_data, f"room:{chat_msg.room}" if chat_msg.room else GLOBAL_TOPIC)
     
     return chat_msg
 
+@api_router.post("/chat", response_model=ChatMessage)
+async def send_chat_message(message: ChatMessageCreate, request: Request):
+    # Usernames are display names: the address is limited as a whole, address plus name per sender
+    client_ip = client_address(request.client.host if request.client else None, request.headers)
+    moderate_chat_message(client_ip, message.username, message.message)
+    return await publish_chat_message(ChatMessage(**message.dict()))
+
+@api_router.post("/chat/presence", response_model=ChatMessage)
+async def send_presence_message(presence: ChatPresence, request: Request):
+    """Login/logout notice of a registered customer in the main chat"""
+    try:
+        customer = await db.customers.find_one({"customer_number": presence.customer_number}, {"_id": 0, "customer_number": 1})
+    except Exception as e:
+        logging.error(f"Presence customer lookup error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to send presence message")
+    if not customer:
+        raise HTTPException(status_code=404, detail="Customer not registered")
+    
+    # Only the server words these, so only these skip duplicate suppression; rate limits still apply
+    client_ip = client_address(request.client.host if request.client else None, request.headers)
+    text = CHAT_PRESENCE_MESSAGES[presence.action].format(customer_number=presence.customer_number)
+    moderate_chat_message(client_ip, f"presence:{presence.customer_number}", text, check_duplicates=False)
+    return await publish_chat_message(ChatMessage(username="System", message=text, emoji=""))
+
 @api_router.get("/chat", response_model=List[ChatMessage])
-async def get_chat_messages(limit: int = 50):
-    messages = await db.chat_messages.find().sort("timestamp", -1).limit(limit).to_list(limit)
-    return [ChatMessage(**msg) for msg in reversed(messages)]
+async def get_chat_messages(limit: int = 50, room: Optional[str] = None):
+    # room=None also matches messages stored before rooms existed; served by the room_timestamp index
+    messages = await db.chat_messages.find({"room": room}).sort("timestamp", -1).limit(limit).to_list(limit)
+    return FastJSONResponse([ChatMessage(**msg) for msg in reversed(messages)])
+
+@api_router.get("/admin/chat/moderation")
+async def get_chat_moderation_stats():
+    """Accepted and rejected chat messages by reason, with the active limits"""
+    return chat_moderator.stats()
+
+@api_router.get("/admin/chat/archive")
+async def search_chat_archive(
+    q: Optional[str] = None,
+    show_date: Optional[str] = None,
+    username: Optional[str] = None,
+    room: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """Search archived chat messages (full text over message and username), optionally per show date"""
+    try:
+        messages = await chat_archiver.search(q, show_date, username, room, limit)
+        return FastJSONResponse({"messages": messages, "count": len(messages)})
+    except Exception as e:
+        logging.error(f"Chat archive search error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to search chat archive")
+
+@api_router.get("/admin/chat/archive/dates")
+async def get_chat_archive_dates():
+    """Archived show dates with message counts, plus archiver stats"""
+    try:
+        return FastJSONResponse({"dates": await chat_archiver.show_dates(), "archiver": chat_archiver.stats()})
+    except Exception as e:
+        logging.error(f"Chat archive dates error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get chat archive dates")
+
+# Sample products for demo
+DEMO_PRODUCTS = [
+    {
+        "id": "1",
+        "name": "Young Fashion Shirt",
+        "price": 12.90,
+        "sizes": ["OneSize", "A460", "A465", "A470", "A475", "Oversize"],
+        "image_url": "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=400",
+        "description": "Trendy fashion shirt for young adults"
+    },
+    {
+        "id": "2", 
+        "name": "Plus Size Blouse",
+        "price": 15.90,
+        "sizes": ["L", "XL", "XXL", "XXXL"],
+        "image_url": "https://images.unsplash.com/photo-1434389677669-e08b4cac3105?w=400",
+        "description": "Comfortable plus size blouse"
+    }
+]
 
 @api_router.get("/products", response_model=List[Product])
 async def get_products():
-    # Sample products for demo
-    products = [
-        {
-            "id": "1",
-            "name": "Young Fashion Shirt",
-            "price": 12.90,
-            "sizes": ["OneSize", "A460", "A465", "A470", "A475", "Oversize"],
-            "image_url": "https://images.unsplash.com/photo-1521572163474-6864f9cf17ab?w=400",
-            "description": "Trendy fashion shirt for young adults"
-        },
-        {
-            "id": "2", 
-            "name": "Plus Size Blouse",
-            "price": 15.90,
-            "sizes": ["L", "XL", "XXL", "XXXL"],
-            "image_url": "https://images.unsplash.com/photo-1434389677669-e08b4cac3105?w=400",
-            "description": "Comfortable plus size blouse"
-        }
-    ]
-    return products
+    return DEMO_PRODUCTS
 
 @api_router.post("/orders", response_model=Order)
 async def create_order(order: OrderCreate):
-    global order_counter
-    
     # Get product details
     products = await get_products()
     product = next((p for p in products if p['id'] == order.product_id), None)
@@ -611,9 +1276,9 @@ async def create_order(order: OrderCreate):
     
     # Store in database
     await db.orders.insert_one(order_obj.dict())
+    await store_last_order(order_obj, product['name'])
     
-    # Increment counter
-    order_counter += 1
+    sales_aggregator.record(order.product_id, order.size, order.quantity, order_obj.price)
     
     # Broadcast order to chat in the requested German format with bold "Bestellung"
     order_id = order.customer_id[-4:] if len(order.customer_id) >= 4 else order.customer_id
@@ -633,40 +1298,211 @@ async def create_order(order: OrderCreate):
             "unit_price": unit_price
         }
     }
-    await manager.broadcast(json.dumps(broadcast_data, default=str))
+    await manager.broadcast(broadcast_data)
     
     # Broadcast updated counter to admins
-    counter_data = {
-        "type": "order_counter_update",
-        "data": {
-            "session_orders": order_counter,
-            "total_orders": await db.orders.count_documents({})
+    if manager.subscriber_count("role:admin"):
+        counter_data = {
+            "type": "order_counter_update",
+            "data": {
+                "session_orders": sales_aggregator.session_orders,
+                "total_orders": sales_aggregator.total_orders
+            }
         }
-    }
-    await manager.broadcast(json.dumps(counter_data, default=str))
+        await manager.broadcast(counter_data, "role:admin")
     
     return order_obj
 
+def last_order_summary(order: Order, product_name: str) -> Dict[str, Any]:
+    """What /customers/{n}/last-order returns, computed once at write time"""
+    return {
+        "id": order.id,
+        "product_id": order.product_id,
+        "product_name": product_name,
+        "size": order.size,
+        "quantity": order.quantity,
+        "price": order.price,
+        "timestamp": order.timestamp,
+        "formatted_time": order.timestamp.strftime("%d.%m.%Y %H:%M:%S")
+    }
+
+async def store_last_order(order: Order, product_name: str):
+    """Upsert the customer's last-order summary unless a newer order is already stored"""
+    try:
+        await db.customer_last_orders.update_one(
+            {"_id": order.customer_id, "order.timestamp": {"$lt": order.timestamp}},
+            {"$set": {"order": last_order_summary(order, product_name)}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        # A concurrent, newer order of the same customer won
+        pass
+    except Exception as e:
+        # The order itself is stored - only the summary is behind
+        logging.error(f"Error storing last order of {order.customer_id}: {str(e)}")
+
 @api_router.get("/orders", response_model=List[Order])
 async def get_orders():
     orders = await db.orders.find().sort("timestamp", -1).to_list(100)
-    return [Order(**order) for order in orders]
+    return FastJSONResponse([Order(**order) for order in orders])
+
+# Sales analytics: a show is the window from an event's start over SHOW_DURATION_HOURS
+SHOW_DURATION_HOURS = float(os.environ.get('SHOW_DURATION_HOURS', '3'))
+MAX_ANALYTICS_ROWS = 10000
+ORDER_EXPORT_BATCH_SIZE = 1000
+
+analytics_cache = AnalyticsCache()
+
+async def sales_window(event_id: Optional[str], starts_from: Optional[datetime],
+                       starts_to: Optional[datetime]) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """Order time window for a show (event_id) or an explicit from/to range, in UTC"""
+    if event_id:
+        event = await db.events.find_one({"id": event_id}, {"_id": 0, "starts_at": 1})
+        if not event:
+            raise HTTPException(status_code=404, detail="Event not found")
+        if not event.get("starts_at"):
+            raise HTTPException(status_code=400, detail="Event has no start time")
+        start = event["starts_at"].replace(tzinfo=timezone.utc)
+        return start, start + timedelta(hours=SHOW_DURATION_HOURS)
+    
+    # Naive query values are taken as UTC
+    if starts_from and starts_from.tzinfo is None:
+        starts_from = starts_from.replace(tzinfo=timezone.utc)
+    if starts_to and starts_to.tzinfo is None:
+        starts_to = starts_to.replace(tzinfo=timezone.utc)
+    return starts_from, starts_to
+
+@api_router.get("/admin/analytics")
+async def list_sales_reports():
+    """Available reports and cache stats"""
+    return {"reports": list(REPORTS), "show_duration_hours": SHOW_DURATION_HOURS, "cache": analytics_cache.stats()}
+
+@api_router.get("/admin/analytics/{report}")
+async def get_sales_report(
+    report: str,
+    event_id: Optional[str] = None,
+    starts_from: Optional[datetime] = Query(None, alias="from"),
+    starts_to: Optional[datetime] = Query(None, alias="to"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_ANALYTICS_ROWS)
+):
+    """
+    revenue-by-product, revenue-by-size, orders-per-minute or top-customers
+    for a show (event_id) or a from/to range - aggregated in Mongo on the
+    timestamp index and cached per window
+    """
+    if report not in REPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown report, available: {', '.join(REPORTS)}")
+    
+    try:
+        start, end = await sales_window(event_id, starts_from, starts_to)
+        if limit is None:
+            limit = TOP_CUSTOMERS_LIMIT if report == "top-customers" else MAX_ANALYTICS_ROWS
+        
+        async def aggregate():
+            pipeline = REPORTS[report](start, end, limit)
+            rows = await db.orders.aggregate(pipeline).to_list(limit)
+            products = {product["id"]: product["name"] for product in DEMO_PRODUCTS}
+            for row in rows:
+                if "product_id" in row:
+                    row["product_name"] = products.get(row["product_id"], "Unknown Product")
+            return {
+                "report": report,
+                "event_id": event_id,
+                "from": start,
+                "to": end,
+                "generated_at": datetime.now(timezone.utc),
+                "rows": rows
+            }
+        
+        result = await analytics_cache.get_or_compute((report, start, end, limit), end, aggregate)
+        return FastJSONResponse(result)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error building sales report {report}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to build sales report")
+
+@api_router.get("/admin/orders/export")
+async def export_orders(
+    format: str = "csv",
+    event_id: Optional[str] = None,
+    starts_from: Optional[datetime] = Query(None, alias="from"),
+    starts_to: Optional[datetime] = Query(None, alias="to")
+):
+    """Stream all orders of a show or range as CSV or NDJSON, oldest first"""
+    if format not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+    start, end = await sales_window(event_id, starts_from, starts_to)
+    
+    selector = match_window(start, end)["$match"]
+    products = {product["id"]: product["name"] for product in DEMO_PRODUCTS}
+    
+    def export_row(order: Dict[str, Any]) -> Dict[str, Any]:
+        row = {field: order.get(field) for field in ORDER_EXPORT_FIELDS}
+        row["timestamp"] = order["timestamp"].replace(tzinfo=timezone.utc).isoformat()
+        row["product_name"] = products.get(order.get("product_id"), "Unknown Product")
+        return row
+    
+    async def order_stream():
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=ORDER_EXPORT_FIELDS)
+        if format == "csv":
+            writer.writeheader()
+        
+        cursor = db.orders.find(selector, {"_id": 0}).sort("timestamp", ASCENDING).batch_size(ORDER_EXPORT_BATCH_SIZE)
+        count = 0
+        try:
+            async for order in cursor:
+                if format == "csv":
+                    writer.writerow(export_row(order))
+                else:
+                    buffer.write(dumps_text(export_row(order)) + "\n")
+                count += 1
+                if count % ORDER_EXPORT_BATCH_SIZE == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        except Exception as e:
+            # Headers are already sent - the error goes into the output
+            logging.error(f"Order export error: {str(e)}")
+            buffer.write(f"# export aborted: {str(e)}\n" if format == "csv" else dumps_text({"error": f"Export aborted: {str(e)}"}) + "\n")
+        yield buffer.getvalue()
+    
+    name = f"orders-{event_id or (start.date().isoformat() if start else 'all')}.{format}"
+    return StreamingResponse(
+        order_stream(),
+        media_type="text/csv" if format == "csv" else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{name}"'}
+    )
 
 # Customer Management Endpoints
+def duplicate_customer_field(error: Exception) -> str:
+    """Which unique index a DuplicateKeyError (or bulk write error entry) hit"""
+    details = error if isinstance(error, dict) else (getattr(error, "details", None) or {})
+    key_pattern = details.get("keyPattern") or {}
+    if "email" in key_pattern or "email_" in str(details.get("errmsg", error)):
+        return "email"
+    return "customer_number"
+
+def customer_response(customer_obj: Customer) -> Dict[str, Any]:
+    """Clean serializable customer data"""
+    return {
+        "id": customer_obj.id,
+        "customer_number": customer_obj.customer_number,
+        "email": customer_obj.email,
+        "name": customer_obj.name,
+        "profile_image": customer_obj.profile_image,
+        "preferred_language": customer_obj.preferred_language,
+        "activation_status": customer_obj.activation_status,
+        "created_at": customer_obj.created_at.isoformat() if hasattr(customer_obj.created_at, 'isoformat') else str(customer_obj.created_at),
+        "updated_at": customer_obj.updated_at.isoformat() if hasattr(customer_obj.updated_at, 'isoformat') else str(customer_obj.updated_at)
+    }
+
 @api_router.post("/customers/register")
 async def register_customer(customer: CustomerCreate):
     """Register a new customer with pending status"""
     try:
-        # Check if customer number already exists
-        existing = await db.customers.find_one({"customer_number": customer.customer_number})
-        if existing:
-            raise HTTPException(status_code=400, detail="Customer number already registered")
-        
-        # Check if email already exists
-        existing_email = await db.customers.find_one({"email": customer.email})
-        if existing_email:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
         # Create new customer with pending status
         customer_obj = Customer(
             customer_number=customer.customer_number,
@@ -676,34 +1512,39 @@ async def register_customer(customer: CustomerCreate):
             activation_status="pending"
         )
         
-        # Store in database
+        # Store in database - the unique indexes reject duplicate numbers and emails
         await db.customers.insert_one(customer_obj.dict())
         
-        # Return clean serializable customer data
-        created_customer = {
-            "id": customer_obj.id,
-            "customer_number": customer_obj.customer_number,
-            "email": customer_obj.email,
-            "name": customer_obj.name,
-            "profile_image": customer_obj.profile_image,
-            "preferred_language": customer_obj.preferred_language,
-            "activation_status": customer_obj.activation_status,
-            "created_at": customer_obj.created_at.isoformat() if hasattr(customer_obj.created_at, 'isoformat') else str(customer_obj.created_at),
-            "updated_at": customer_obj.updated_at.isoformat() if hasattr(customer_obj.updated_at, 'isoformat') else str(customer_obj.updated_at)
-        }
-        
-        return created_customer
+        return customer_response(customer_obj)
         
-    except HTTPException:
-        raise
+    except DuplicateKeyError as e:
+        if duplicate_customer_field(e) == "email":
+            raise HTTPException(status_code=400, detail="Email already registered")
+        raise HTTPException(status_code=400, detail="Customer number already registered")
     except Exception as e:
         logging.error(f"Customer registration error: {str(e)}")
         raise HTTPException(status_code=500, detail="Registration failed")
 
+def customer_check_response(customer: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "exists": True,
+        "customer_number": customer["customer_number"],
+        "activation_status": customer["activation_status"],
+        "name": customer["name"],
+        "email": customer["email"],
+        "profile_image": customer.get("profile_image", None),
+        "preferred_language": customer.get("preferred_language", "de"),
+        "message": f"Customer status: {customer['activation_status']}"
+    }
+
 @api_router.get("/customers/check/{customer_number}")
 async def check_customer_status(customer_number: str):
     """Check customer registration and activation status"""
     try:
+        cached = customer_status_cache.get(customer_number)
+        if cached:
+            return cached
+        
         customer = await db.customers.find_one({"customer_number": customer_number})
         if not customer:
             return {
@@ -712,16 +1553,9 @@ async def check_customer_status(customer_number: str):
                 "message": "Customer not registered"
             }
         
-        return {
-            "exists": True,
-            "customer_number": customer["customer_number"],
-            "activation_status": customer["activation_status"],
-            "name": customer["name"],
-            "email": customer["email"],
-            "profile_image": customer.get("profile_image", None),
-            "preferred_language": customer.get("preferred_language", "de"),
-            "message": f"Customer status: {customer['activation_status']}"
-        }
+        response = customer_check_response(customer)
+        customer_status_cache.put(customer_number, response)
+        return response
         
     except Exception as e:
         logging.error(f"Customer status check error: {str(e)}")
@@ -732,16 +1566,6 @@ async def check_customer_status(customer_number: str):
 async def create_customer_by_admin(customer: CustomerCreate):
     """Manually create a new customer by admin with active status"""
     try:
-        # Check if customer number already exists
-        existing = await db.customers.find_one({"customer_number": customer.customer_number})
-        if existing:
-            raise HTTPException(status_code=400, detail="Customer number already exists")
-        
-        # Check if email already exists
-        existing_email = await db.customers.find_one({"email": customer.email})
-        if existing_email:
-            raise HTTPException(status_code=400, detail="Email already registered")
-        
         # Create new customer with active status (admin created)
         customer_obj = Customer(
             customer_number=customer.customer_number,
@@ -751,57 +1575,152 @@ async def create_customer_by_admin(customer: CustomerCreate):
             activation_status="active"  # Admin-created customers are automatically active
         )
         
-        # Store in database
+        # Store in database - the unique indexes reject duplicate numbers and emails
         await db.customers.insert_one(customer_obj.dict())
         
-        # Return clean serializable customer data
-        created_customer = {
-            "id": customer_obj.id,
-            "customer_number": customer_obj.customer_number,
-            "email": customer_obj.email,
-            "name": customer_obj.name,
-            "profile_image": customer_obj.profile_image,
-            "preferred_language": customer_obj.preferred_language,
-            "activation_status": customer_obj.activation_status,
-            "created_at": customer_obj.created_at.isoformat() if hasattr(customer_obj.created_at, 'isoformat') else str(customer_obj.created_at),
-            "updated_at": customer_obj.updated_at.isoformat() if hasattr(customer_obj.updated_at, 'isoformat') else str(customer_obj.updated_at)
-        }
-        
-        return created_customer
+        return customer_response(customer_obj)
         
-    except HTTPException:
-        raise
+    except DuplicateKeyError as e:
+        if duplicate_customer_field(e) == "email":
+            raise HTTPException(status_code=400, detail="Email already registered")
+        raise HTTPException(status_code=400, detail="Customer number already exists")
     except Exception as e:
         logging.error(f"Admin customer creation error: {str(e)}")
         raise HTTPException(status_code=500, detail="Customer creation failed")
 
+def read_customer_import_rows(content: str, is_ndjson: bool):
+    """Yield (row number, dict) from an uploaded CSV or NDJSON file"""
+    text = io.StringIO(content)
+    
+    if is_ndjson:
+        for row_number, line in enumerate(text, start=1):
+            if line.strip():
+                try:
+                    yield row_number, json.loads(line)
+                except ValueError as e:
+                    yield row_number, ValueError(f"Invalid JSON: {str(e)}")
+    else:
+        # Header row is line 1
+        for row_number, row in enumerate(csv.DictReader(text), start=2):
+            yield row_number, row
+
+@api_router.post("/admin/customers/import")
+async def import_customers(file: UploadFile = File(...), activation_status: str = "active"):
+    """
+    Bulk import wholesale customers from CSV (header: customer_number,email,name[,preferred_language])
+    or NDJSON, inserted in unordered insert_many batches
+    Streams NDJSON: one line per rejected row, then a summary line
+    """
+    if activation_status not in CUSTOMER_ACTIVATION_STATUSES:
+        raise HTTPException(status_code=400, detail=f"activation_status must be one of: {', '.join(CUSTOMER_ACTIVATION_STATUSES)}")
+    
+    # Read before streaming - the upload is closed once the endpoint returns
+    try:
+        content = (await file.read()).decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    is_ndjson = (file.filename or "").endswith((".ndjson", ".jsonl")) or \
+        (file.content_type or "") in ("application/x-ndjson", "application/jsonl")
+    
+    async def insert_batch(batch):
+        """Insert one batch, returns (inserted, failed rows)"""
+        try:
+            result = await db.customers.insert_many([customer for _, customer in batch], ordered=False)
+            return len(result.inserted_ids), []
+        except BulkWriteError as e:
+            failed = []
+            for write_error in e.details.get("writeErrors", []):
+                row_number, customer = batch[write_error["index"]]
+                if write_error.get("code") == 11000:
+                    error = "Email already registered" if duplicate_customer_field(write_error) == "email" \
+                        else "Customer number already exists"
+                else:
+                    error = write_error.get("errmsg", "Insert failed")
+                failed.append({"row": row_number, "customer_number": customer["customer_number"],
+                               "success": False, "error": error})
+            return e.details.get("nInserted", 0), failed
+    
+    async def import_stream():
+        inserted = 0
+        rejected = 0
+        batch = []
+        
+        try:
+            for row_number, row in read_customer_import_rows(content, is_ndjson):
+                try:
+                    if isinstance(row, Exception):
+                        raise row
+                    customer = CustomerCreate(**{key: value for key, value in row.items() if key and value not in (None, "")})
+                    batch.append((row_number, Customer(
+                        customer_number=customer.customer_number,
+                        email=customer.email,
+                        name=customer.name,
+                        preferred_language=customer.preferred_language or "de",
+                        activation_status=activation_status
+                    ).dict()))
+                except (ValueError, TypeError) as e:
+                    rejected += 1
+                    yield dumps_text({"row": row_number, "success": False, "error": str(e)}) + "\n"
+                    continue
+                
+                if len(batch) >= CUSTOMER_BATCH_SIZE:
+                    count, failed = await insert_batch(batch)
+                    batch = []
+                    inserted += count
+                    rejected += len(failed)
+                    if failed:
+                        yield "\n".join(dumps_text(line) for line in failed) + "\n"
+            
+            if batch:
+                count, failed = await insert_batch(batch)
+                inserted += count
+                rejected += len(failed)
+                if failed:
+                    yield "\n".join(dumps_text(line) for line in failed) + "\n"
+        except Exception as e:
+            logging.error(f"Customer import error: {str(e)}")
+            yield dumps_text({"success": False, "error": f"Import aborted: {str(e)}"}) + "\n"
+        
+        yield dumps_text({
+            "summary": True,
+            "inserted": inserted,
+            "rejected": rejected
+        }) + "\n"
+    
+    return StreamingResponse(import_stream(), media_type="application/x-ndjson")
+
 @api_router.get("/admin/customers", response_model=List[Customer])
 async def get_all_customers():
     """Get all customers for admin management"""
     try:
         customers = await db.customers.find().sort("created_at", -1).to_list(1000)
-        return [Customer(**customer) for customer in customers]
+        return FastJSONResponse([Customer(**customer) for customer in customers])
     except Exception as e:
         logging.error(f"Error fetching customers: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch customers")
 
+async def set_customer_status(customer_id: str, activation_status: str) -> Optional[Dict[str, Any]]:
+    """Update and return the customer in one round trip (None if not found)"""
+    customer = await db.customers.find_one_and_update(
+        {"id": customer_id},
+        {"$set": {
+            "activation_status": activation_status,
+            "updated_at": datetime.now(timezone.utc)
+        }},
+        return_document=ReturnDocument.AFTER
+    )
+    if customer:
+        customer_status_cache.forget(customer["customer_number"])
+    return customer
+
 @api_router.post("/admin/customers/{customer_id}/activate")
 async def activate_customer(customer_id: str):
     """Activate a customer (admin only)"""
     try:
-        result = await db.customers.update_one(
-            {"id": customer_id},
-            {"$set": {
-                "activation_status": "active",
-                "updated_at": datetime.now(timezone.utc)
-            }}
-        )
-        
-        if result.matched_count == 0:
+        customer = await set_customer_status(customer_id, "active")
+        if customer is None:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        # Get updated customer
-        customer = await db.customers.find_one({"id": customer_id})
         return {"message": "Customer activated successfully", "customer": Customer(**customer)}
         
     except HTTPException:
@@ -814,19 +1733,10 @@ async def activate_customer(customer_id: str):
 async def block_customer(customer_id: str):
     """Block a customer (admin only)"""
     try:
-        result = await db.customers.update_one(
-            {"id": customer_id},
-            {"$set": {
-                "activation_status": "blocked",
-                "updated_at": datetime.now(timezone.utc)
-            }}
-        )
-        
-        if result.matched_count == 0:
+        customer = await set_customer_status(customer_id, "blocked")
+        if customer is None:
             raise HTTPException(status_code=404, detail="Customer not found")
         
-        # Get updated customer
-        customer = await db.customers.find_one({"id": customer_id})
         return {"message": "Customer blocked successfully", "customer": Customer(**customer)}
         
     except HTTPException:
@@ -835,14 +1745,90 @@ async def block_customer(customer_id: str):
         logging.error(f"Customer blocking error: {str(e)}")
         raise HTTPException(status_code=500, detail="Blocking failed")
 
+@api_router.post("/admin/customers/bulk-status")
+async def bulk_update_customer_status(request: CustomerBulkStatusRequest):
+    """
+    Activate/block many customers at once, selected by id list or current status
+    One lookup and one update_many per batch; streams NDJSON with one line per
+    customer id, then a summary line
+    """
+    if request.activation_status not in CUSTOMER_ACTIVATION_STATUSES:
+        raise HTTPException(status_code=400, detail=f"activation_status must be one of: {', '.join(CUSTOMER_ACTIVATION_STATUSES)}")
+    if request.customer_ids is None and request.current_status is None:
+        raise HTTPException(status_code=400, detail="customer_ids or current_status is required")
+    
+    selector: Dict[str, Any] = {}
+    if request.customer_ids is not None:
+        selector["id"] = {"$in": list(dict.fromkeys(request.customer_ids))}
+    if request.current_status is not None:
+        selector["activation_status"] = request.current_status
+    
+    try:
+        found = {}
+        async for customer in db.customers.find(
+            selector,
+            {"_id": 0, "id": 1, "customer_number": 1, "activation_status": 1}
+        ):
+            found[customer["id"]] = customer
+    except Exception as e:
+        logging.error(f"Bulk status customer lookup error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to look up customers")
+    
+    async def status_stream():
+        modified = 0
+        not_found = 0
+        
+        if request.customer_ids is not None:
+            for customer_id in dict.fromkeys(request.customer_ids):
+                if customer_id not in found:
+                    not_found += 1
+                    yield dumps_text({"id": customer_id, "success": False, "error": "Customer not found"}) + "\n"
+        
+        customer_ids = list(found)
+        try:
+            for offset in range(0, len(customer_ids), CUSTOMER_BATCH_SIZE):
+                batch = customer_ids[offset:offset + CUSTOMER_BATCH_SIZE]
+                result = await db.customers.update_many(
+                    {"id": {"$in": batch}, "activation_status": {"$ne": request.activation_status}},
+                    {"$set": {
+                        "activation_status": request.activation_status,
+                        "updated_at": datetime.now(timezone.utc)
+                    }}
+                )
+                modified += result.modified_count
+                for customer_id in batch:
+                    customer_status_cache.forget(found[customer_id]["customer_number"])
+                
+                yield "\n".join(dumps_text({
+                    "id": customer_id,
+                    "customer_number": found[customer_id]["customer_number"],
+                    "success": True,
+                    "previous_status": found[customer_id]["activation_status"],
+                    "activation_status": request.activation_status
+                }) for customer_id in batch) + "\n"
+        except Exception as e:
+            logging.error(f"Bulk status update error: {str(e)}")
+            yield dumps_text({"success": False, "error": f"Status update aborted: {str(e)}"}) + "\n"
+        
+        yield dumps_text({
+            "summary": True,
+            "matched": len(found),
+            "modified": modified,
+            "not_found": not_found,
+            "activation_status": request.activation_status
+        }) + "\n"
+    
+    return StreamingResponse(status_stream(), media_type="application/x-ndjson")
+
 @api_router.delete("/admin/customers/{customer_id}")
 async def delete_customer(customer_id: str):
     """Delete a customer (admin only)"""
     try:
-        result = await db.customers.delete_one({"id": customer_id})
+        customer = await db.customers.find_one_and_delete({"id": customer_id}, {"_id": 0, "customer_number": 1})
         
-        if result.deleted_count == 0:
+        if not customer:
             raise HTTPException(status_code=404, detail="Customer not found")
+        customer_status_cache.forget(customer["customer_number"])
         
         return {"message": "Customer deleted successfully"}
         
@@ -880,6 +1866,7 @@ async def upload_profile_image_by_number(customer_number: str, file: UploadFile
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Customer not found")
+        customer_status_cache.forget(customer_number)
         
         return {"message": "Profile image uploaded successfully", "profile_image": image_data_url}
         
@@ -893,11 +1880,8 @@ async def upload_profile_image_by_number(customer_number: str, file: UploadFile
 async def get_customer_last_order(customer_number: str):
     """Get the last order for a specific customer"""
     try:
-        # Find the most recent order for this customer
-        last_order = await db.orders.find_one(
-            {"customer_id": customer_number},
-            sort=[("timestamp", -1)]  # Sort by timestamp descending (most recent first)
-        )
+        # Summary maintained on every order write - a single _id lookup
+        last_order = await db.customer_last_orders.find_one({"_id": customer_number})
         
         if not last_order:
             return {
@@ -905,23 +1889,9 @@ async def get_customer_last_order(customer_number: str):
                 "message": "No orders found for this customer"
             }
         
-        # Get product details for the order
-        products = await get_products()
-        product = next((p for p in products if p['id'] == last_order.get('product_id')), None)
-        product_name = product['name'] if product else "Unknown Product"
-        
         return {
             "has_order": True,
-            "order": {
-                "id": last_order["id"],
-                "product_id": last_order["product_id"],
-                "product_name": product_name,
-                "size": last_order["size"],
-                "quantity": last_order["quantity"],
-                "price": last_order["price"],
-                "timestamp": last_order["timestamp"],
-                "formatted_time": last_order["timestamp"].strftime("%d.%m.%Y %H:%M:%S")
-            }
+            "order": last_order["order"]
         }
         
     except Exception as e:
@@ -942,6 +1912,7 @@ async def delete_profile_image_by_number(customer_number: str):
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Customer not found")
+        customer_status_cache.forget(customer_number)
         
         return {"message": "Profile image deleted successfully"}
         
@@ -973,6 +1944,7 @@ async def update_customer_language(customer_number: str, request: LanguageUpdate
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Customer not found")
+        customer_status_cache.forget(customer_number)
         
         return {"message": "Language preference updated successfully", "language": request.language}
         
@@ -983,25 +1955,38 @@ async def update_customer_language(customer_number: str, request: LanguageUpdate
         raise HTTPException(status_code=500, detail="Language update failed")
 
 # Live Shopping Calendar Endpoints
+def events_json_response(request: Request, events: List[Dict[str, Any]], etag: Optional[str] = None) -> Response:
+    """Event list with ETag; If-None-Match gets a 304 (the countdown UI polls this)"""
+    body = dumps(events)
+    if etag is None:
+        etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag, "Cache-Control": "no-cache"})
+
 @api_router.get("/events")
-async def get_events():
-    """Get all live shopping events"""
+async def get_events(
+    request: Request,
+    starts_from: Optional[datetime] = Query(None, alias="from"),
+    starts_to: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(MAX_EVENTS_PER_QUERY, ge=1, le=MAX_EVENTS_PER_QUERY)
+):
+    """
+    Get live shopping events
+    Without from/to: upcoming events (from today on) out of the in-memory cache
+    """
     try:
-        events = []
-        async for event in db.events.find():
-            events.append({
-                "id": event["id"],
-                "date": event["date"],
-                "time": event["time"],
-                "title": event["title"],
-                "description": event.get("description", ""),
-                "created_at": event["created_at"],
-                "updated_at": event["updated_at"]
-            })
-        
-        # Sort events by date and time
-        events.sort(key=lambda x: f"{x['date']} {x['time']}")
-        return events
+        if starts_from is None and starts_to is None:
+            events = await live_snapshot.get_events()
+            # Taken right after the load, so it describes exactly this list
+            etag = live_snapshot.events_etag()
+            if limit < len(events):
+                return events_json_response(request, events[:limit])
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers={"ETag": etag})
+            return events_json_response(request, events, etag)
+        
+        return events_json_response(request, await query_events(starts_from, starts_to, limit))
         
     except Exception as e:
         logging.error(f"Error getting events: {str(e)}")
@@ -1010,16 +1995,23 @@ async def get_events():
 @api_router.post("/admin/events")
 async def create_event(event: LiveShoppingEventCreate):
     """Create a new live shopping event (Admin only)"""
+    try:
+        starts_at = event_starts_at(event.date, event.time)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Date must be YYYY-MM-DD and time HH:MM")
+    
     try:
         new_event = LiveShoppingEvent(
             date=event.date,
             time=event.time,
             title=event.title,
-            description=event.description
+            description=event.description,
+            starts_at=starts_at
         )
         
         event_dict = new_event.dict()
         result = await db.events.insert_one(event_dict)
+        await live_snapshot.publish_events_change()
         
         # Convert ObjectId to string and return clean event data
         created_event = {
@@ -1028,6 +2020,7 @@ async def create_event(event: LiveShoppingEventCreate):
             "time": event_dict["time"],
             "title": event_dict["title"],
             "description": event_dict["description"],
+            "starts_at": event_dict["starts_at"].isoformat(),
             "created_at": event_dict["created_at"].isoformat() if hasattr(event_dict["created_at"], 'isoformat') else str(event_dict["created_at"]),
             "updated_at": event_dict["updated_at"].isoformat() if hasattr(event_dict["updated_at"], 'isoformat') else str(event_dict["updated_at"])
         }
@@ -1039,24 +2032,15 @@ async def create_event(event: LiveShoppingEventCreate):
         raise HTTPException(status_code=500, detail="Failed to create event")
 
 @api_router.get("/admin/events")
-async def get_admin_events():
-    """Get all events for admin management"""
+async def get_admin_events(
+    request: Request,
+    starts_from: Optional[datetime] = Query(None, alias="from"),
+    starts_to: Optional[datetime] = Query(None, alias="to"),
+    limit: int = Query(MAX_EVENTS_PER_QUERY, ge=1, le=MAX_EVENTS_PER_QUERY)
+):
+    """Get all events (or a from/to range) for admin management"""
     try:
-        events = []
-        async for event in db.events.find():
-            events.append({
-                "id": event["id"],
-                "date": event["date"],
-                "time": event["time"],
-                "title": event["title"],
-                "description": event.get("description", ""),
-                "created_at": event["created_at"],
-                "updated_at": event["updated_at"]
-            })
-        
-        # Sort events by date and time
-        events.sort(key=lambda x: f"{x['date']} {x['time']}")
-        return events
+        return events_json_response(request, await query_events(starts_from, starts_to, limit))
         
     except Exception as e:
         logging.error(f"Error getting admin events: {str(e)}")
@@ -1069,10 +2053,26 @@ async def update_event(event_id: str, event_update: LiveShoppingEventUpdate):
         update_data = {k: v for k, v in event_update.dict().items() if v is not None}
         update_data["updated_at"] = datetime.now(timezone.utc)
         
+        if "date" in update_data or "time" in update_data:
+            # Recompute starts_at - needs the stored half if only one of them changes
+            if "date" not in update_data or "time" not in update_data:
+                existing = await db.events.find_one({"id": event_id}, {"_id": 0, "date": 1, "time": 1})
+                if not existing:
+                    raise HTTPException(status_code=404, detail="Event not found")
+                update_data.setdefault("date", existing["date"])
+                update_data.setdefault("time", existing["time"])
+            try:
+                update_data["starts_at"] = event_starts_at(update_data["date"], update_data["time"])
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Date must be YYYY-MM-DD and time HH:MM")
+            # Warmed again (new room and token) once the new start is within the lead time
+            prewarm_scheduler.forget_event(event_id)
+        
         result = await db.events.update_one(
             {"id": event_id},
             {"$set": update_data}
         )
+        await live_snapshot.publish_events_change()
         
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Event not found")
@@ -1090,6 +2090,8 @@ async def delete_event(event_id: str):
     """Delete a live shopping event (Admin only)"""
     try:
         result = await db.events.delete_one({"id": event_id})
+        await live_snapshot.publish_events_change()
+        prewarm_scheduler.forget_event(event_id)
         
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Event not found")
@@ -1103,6 +2105,24 @@ async def delete_event(event_id: str):
         raise HTTPException(status_code=500, detail="Failed to delete event")
 
 # LiveKit Cloud Integration Endpoints
+async def livekit_participant_identity(request: LiveKitTokenRequest, current_user_id: str) -> str:
+    """
+    Identity for a LiveKit token
+    
+    Display names are neither unique nor verified ("Zuschauer" for every guest),
+    and LiveKit drops the earlier participant when an identity joins twice. Only
+    active customers get a stable identity - the same one /livekit/token/bulk
+    uses, so their cached token is reused; everyone else gets a unique one.
+    """
+    if request.participant_type == "viewer" and request.customer_number:
+        customer = await db.customers.find_one(
+            {"customer_number": request.customer_number},
+            {"_id": 0, "activation_status": 1}
+        )
+        if customer and customer.get("activation_status") == "active":
+            return f"customer-{request.customer_number}"
+    return f"{current_user_id}_{uuid.uuid4().hex[:12]}"
+
 @api_router.post("/livekit/token", response_model=LiveKitTokenResponse)
 async def generate_livekit_token(request: LiveKitTokenRequest, current_user_id: str = "user"):
     """
@@ -1110,10 +2130,23 @@ async def generate_livekit_token(request: LiveKitTokenRequest, current_user_id:
     Supports both publisher (admin) and viewer (customer) roles
     """
     try:
-        # Generate unique participant identity
-        participant_identity = f"{current_user_id}_{int(time.time())}"
+        participant_identity = await livekit_participant_identity(request, current_user_id)
         participant_name = request.participant_name or current_user_id
         
+        # Host token minted ahead of a calendar event
+        if request.participant_type == "publisher" and not request.metadata:
+            warm = prewarm_scheduler.find_room(request.room_name)
+            expires_in = host_token_expires_in(warm) if warm else 0
+            if expires_in > HOST_TOKEN_MIN_REMAINING:
+                return LiveKitTokenResponse(
+                    token=warm["host_token"],
+                    room_name=request.room_name,
+                    participant_identity=warm["host_identity"],
+                    participant_type="publisher",
+                    livekit_url=livekit_service.livekit_url,
+                    expires_in=expires_in
+                )
+        
         # Generate appropriate token based on participant type
         if request.participant_type == "publisher":
             # Admin/publisher token with full permissions
@@ -1144,6 +2177,102 @@ async def generate_livekit_token(request: LiveKitTokenRequest, current_user_id:
         logging.error(f"LiveKit token generation error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate LiveKit token: {str(e)}")
 
+@api_router.post("/livekit/token/bulk")
+async def bulk_generate_livekit_tokens(request: LiveKitBulkTokenRequest):
+    """
+    Mint viewer tokens for many customers and rooms in one request
+    Activation status is checked with a single query, tokens are signed in
+    the worker pool and streamed back as NDJSON (one line per token)
+    """
+    customer_numbers = list(dict.fromkeys(request.customer_numbers))
+    room_names = list(dict.fromkeys(request.room_names))
+    
+    if not customer_numbers or not room_names:
+        raise HTTPException(status_code=400, detail="customer_numbers and room_names must not be empty")
+    
+    if not livekit_service.livekit_api:
+        raise HTTPException(status_code=500, detail="LiveKit service not properly initialized")
+    
+    try:
+        # One round trip for all activation statuses
+        customers = {}
+        async for customer in db.customers.find(
+            {"customer_number": {"$in": customer_numbers}},
+            {"_id": 0, "customer_number": 1, "name": 1, "activation_status": 1}
+        ):
+            customers[customer["customer_number"]] = customer
+    except Exception as e:
+        logging.error(f"Bulk token customer lookup error: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to look up customers")
+    
+    async def token_stream():
+        minted = 0
+        rejected = 0
+        eligible = []
+        
+        for customer_number in customer_numbers:
+            customer = customers.get(customer_number)
+            if not customer:
+                error = "Customer not registered"
+            elif customer["activation_status"] != "active":
+                error = f"Customer status: {customer['activation_status']}"
+            else:
+                eligible.append((
+                    f"customer-{customer_number}",
+                    customer.get("name") or customer_number,
+                    {"role": "viewer", "user_id": customer_number}
+                ))
+                continue
+            
+            rejected += 1
+            yield dumps_text({"customer_number": customer_number, "success": False, "error": error}) + "\n"
+        
+        chunks = [
+            (room_name, eligible[offset:offset + BULK_TOKEN_CHUNK_SIZE])
+            for room_name in room_names
+            for offset in range(0, len(eligible), BULK_TOKEN_CHUNK_SIZE)
+        ]
+        # One chunk in flight per pool worker; results are still streamed in order
+        window = deque()
+        try:
+            for index, (room_name, chunk) in enumerate(chunks):
+                window.append((room_name, asyncio.ensure_future(
+                    livekit_service.sign_viewer_tokens_pooled(room_name, chunk)
+                )))
+                # Keep the pool busy: only wait once every worker has a chunk, or nothing is left to schedule
+                while window and (len(window) >= livekit_service.signing_workers or index == len(chunks) - 1):
+                    room_name, signing = window.popleft()
+                    lines = [
+                        dumps_text({
+                            "customer_number": identity[len("customer-"):],
+                            "success": True,
+                            "room_name": room_name,
+                            "participant_identity": identity,
+                            "token": token,
+                            "expires_at": expires_at
+                        })
+                        for identity, token, expires_at in await signing
+                    ]
+                    minted += len(lines)
+                    yield "\n".join(lines) + "\n"
+        except Exception as e:
+            logging.error(f"Bulk token minting error: {str(e)}")
+            yield dumps_text({"success": False, "error": f"Token minting aborted: {str(e)}"}) + "\n"
+        finally:
+            # Aborted (or client went away) - don't leave chunks signing for nobody
+            for _, signing in window:
+                signing.cancel()
+        
+        yield dumps_text({
+            "summary": True,
+            "minted": minted,
+            "rejected": rejected,
+            "rooms": len(room_names),
+            "livekit_url": livekit_service.livekit_url
+        }) + "\n"
+    
+    return StreamingResponse(token_stream(), media_type="application/x-ndjson")
+
 @api_router.post("/livekit/room/create", response_model=LiveKitRoomResponse)
 async def create_livekit_room(request: LiveKitRoomRequest, current_user_id: str = "admin"):
     """
@@ -1308,9 +2437,11 @@ async def start_streaming(stream_data: StreamSessionCreate, current_user_id: str
             "stream_id": stream.id,
             "stream_title": stream.stream_title,
             "status": stream.status,
+            "mode": stream.mode,
             "max_viewers": stream.max_viewers,
             "created_at": stream.created_at,
-            "signaling_endpoint": f"/ws/stream/{stream.id}/signaling"
+            "signaling_endpoint": f"/ws/stream/{stream.id}/signaling",
+            "publish_endpoint": f"/api/stream/{stream.id}/sfu/publish" if stream.mode == "sfu" else None
         }
         
     except Exception as e:
@@ -1326,15 +2457,16 @@ async def join_streaming_session(stream_id: str, current_user_id: str = "viewer"
             
         stream = stream_manager.active_streams[stream_id]
         
-        if len(stream_manager.stream_connections.get(stream_id, [])) >= stream.max_viewers:
+        if stream.viewer_count >= stream.max_viewers:
             raise HTTPException(status_code=400, detail="Stream is at maximum capacity")
         
         return {
             "stream_id": stream_id,
             "stream_title": stream.stream_title,
+            "mode": stream.mode,
             "viewer_count": stream.viewer_count,
             "max_viewers": stream.max_viewers,
-            "signaling_endpoint": f"/ws/stream/{stream_id}/viewer",
+            "signaling_endpoint": f"/api/stream/{stream_id}/sfu/subscribe" if stream.mode == "sfu" else f"/ws/stream/{stream_id}/viewer",
             "status": "ready_to_join"
         }
         
@@ -1344,6 +2476,69 @@ async def join_streaming_session(stream_id: str, current_user_id: str = "viewer"
         logging.error(f"Error joining stream: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to join streaming session")
 
+@api_router.post("/stream/{stream_id}/sfu/publish")
+async def publish_to_relay(stream_id: str, offer: WebRTCOffer, current_user_id: str = "admin"):
+    """Streamer publishes once to the backend relay (SFU mode)"""
+    try:
+        stream = stream_manager.active_streams.get(stream_id)
+        if not stream or stream.mode != "sfu":
+            raise HTTPException(status_code=404, detail="SFU stream not found")
+        
+        if stream.streamer_id != current_user_id:
+            raise HTTPException(status_code=403, detail="Only the streamer can publish")
+        
+        return await relay_manager.publish(stream_id, offer.sdp, offer.type)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error publishing to relay: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to publish stream")
+
+@api_router.post("/stream/{stream_id}/sfu/subscribe")
+async def subscribe_to_relay(stream_id: str, offer: WebRTCOffer):
+    """Viewer receives the relayed stream from the backend (SFU mode)"""
+    try:
+        stream = stream_manager.active_streams.get(stream_id)
+        if not stream or stream.mode != "sfu":
+            raise HTTPException(status_code=404, detail="SFU stream not found")
+        
+        if relay_manager.viewer_count(stream_id) >= stream.max_viewers:
+            raise HTTPException(status_code=400, detail="Stream is at maximum capacity")
+        
+        try:
+            answer = await relay_manager.subscribe(stream_id, offer.sdp, offer.type)
+        except LookupError:
+            raise HTTPException(status_code=409, detail="Stream has not started publishing")
+        
+        return answer
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error subscribing to relay: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to subscribe to stream")
+
+@api_router.delete("/stream/{stream_id}/sfu/subscribers/{viewer_id}")
+async def unsubscribe_from_relay(stream_id: str, viewer_id: str):
+    """Viewer leaves a relayed stream (SFU mode)"""
+    try:
+        if not await relay_manager.unsubscribe(stream_id, viewer_id):
+            raise HTTPException(status_code=404, detail="Viewer not found")
+        
+        return {"message": "Left stream successfully"}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error leaving relayed stream: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to leave stream")
+
+@api_router.get("/stream/sfu/stats")
+async def get_relay_stats():
+    """Relay sessions and capacity"""
+    return relay_manager.stats()
+
 @api_router.delete("/stream/{stream_id}")
 async def end_streaming_session(stream_id: str, current_user_id: str = "admin"):
     """End streaming session (admin/streamer only)"""
@@ -1383,6 +2578,11 @@ async def get_active_streams():
         logging.error(f"Error getting active streams: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get active streams")
 
+@api_router.get("/stream/admission/metrics")
+async def get_admission_metrics():
+    """Admitted vs. shed viewer joins"""
+    return admission_controller.metrics()
+
 @api_router.get("/webrtc/config")
 async def get_webrtc_config():
     """Get WebRTC configuration including STUN/TURN servers"""
@@ -1429,6 +2629,11 @@ async def webrtc_signaling_streamer(websocket: WebSocket, stream_id: str):
     # Register streamer connection
     if stream_id in stream_manager.active_streams:
         stream_manager.streamer_connections[stream_id] = websocket
+        stream_manager.touch(stream_id)
+        if websocket.query_params.get("ice_batching") == "1":
+            stream_manager.ice_batching_peers.add((stream_id, None))
+        else:
+            stream_manager.ice_batching_peers.discard((stream_id, None))
     else:
         await websocket.close(code=1008, reason="Stream not found")
         return
@@ -1436,19 +2641,26 @@ async def webrtc_signaling_streamer(websocket: WebSocket, stream_id: str):
     try:
         while True:
             data = await websocket.receive_text()
-            message = json.loads(data)
-            
-            # Broadcast signaling messages to all viewers
-            await stream_manager.broadcast_to_stream(stream_id, {
-                "type": "signaling",
-                "from": "streamer",
-                "data": message
-            })
+            stream_manager.touch(stream_id)
+            try:
+                message = json.loads(data)
+                if not isinstance(message, dict):
+                    raise ValueError("Signaling frame is not a JSON object")
+                if message.get("type") == "pong":
+                    continue
+                
+                # Route signaling messages to the addressed viewer ("to": viewer_id)
+                await stream_manager.route_streamer_message(stream_id, message)
+            except (ValueError, TypeError, KeyError) as e:
+                # Malformed frame - skip it, keep the socket
+                logging.warning(f"Invalid signaling message from streamer: {str(e)}")
             
     except WebSocketDisconnect:
-        # Clean up streamer connection
-        if stream_id in stream_manager.streamer_connections:
-            del stream_manager.streamer_connections[stream_id]
+        # Clean up streamer connection (unless the reaper already did, or a new one took over)
+        if stream_manager.streamer_connections.get(stream_id) is not websocket:
+            return
+        del stream_manager.streamer_connections[stream_id]
+        stream_manager.last_seen.pop((stream_id, None), None)
         
         # End the stream when streamer disconnects
         if stream_id in stream_manager.active_streams:
@@ -1457,45 +2669,250 @@ async def webrtc_signaling_streamer(websocket: WebSocket, stream_id: str):
 @app.websocket("/ws/stream/{stream_id}/viewer")
 async def webrtc_signaling_viewer(websocket: WebSocket, stream_id: str):
     """WebSocket for WebRTC signaling (viewer)"""
+    # Shed cheaply before accept() - the client gets a plain HTTP 403
+    stream = stream_manager.active_streams.get(stream_id)
+    if not stream:
+        admission_controller.record_shed("not_found")
+        await websocket.close(code=1008)
+        return
+    
+    if stream.viewer_count >= stream.max_viewers:
+        admission_controller.record_shed("stream_full")
+        await websocket.close(code=1008)
+        return
+    
+    client_ip = client_address(websocket.client.host if websocket.client else None, websocket.headers)
+    wait, shed_reason = admission_controller.admit(client_ip, stream_id)
+    if shed_reason:
+        await websocket.close(code=1008)
+        return
+    
     await websocket.accept()
     
+    # Stream join rate exceeded: hold the viewer in the join queue
+    if wait > 0:
+        await websocket.send_text(dumps_text({
+            "type": "join_queued",
+            "position": admission_controller.queue_position(stream_id),
+            "estimated_wait": round(wait, 1)
+        }))
+        await asyncio.sleep(wait)
+    
     # Join stream as viewer
-    success = await stream_manager.join_stream(stream_id, websocket)
-    if not success:
+    viewer_id = await stream_manager.join_stream(stream_id, websocket)
+    if not viewer_id:
         await websocket.close(code=1008, reason="Cannot join stream")
         return
     
+    # Client accepts batched "ice-candidates" frames
+    if websocket.query_params.get("ice_batching") == "1":
+        stream_manager.ice_batching_peers.add((stream_id, viewer_id))
+    
     try:
         while True:
             data = await websocket.receive_text()
-            message = json.loads(data)
-            
-            # Send signaling message to streamer
-            if stream_id in stream_manager.streamer_connections:
-                streamer_ws = stream_manager.streamer_connections[stream_id]
-                if streamer_ws.client_state == WebSocketState.CONNECTED:
-                    await streamer_ws.send_text(json.dumps({
-                        "type": "signaling",
-                        "from": "viewer",
-                        "data": message
-                    }))
+            stream_manager.touch(stream_id, viewer_id)
+            try:
+                message = json.loads(data)
+                if not isinstance(message, dict):
+                    raise ValueError("Signaling frame is not a JSON object")
+                if message.get("type") == "pong":
+                    continue
+                
+                # Send signaling message to streamer, tagged with the sender
+                await stream_manager.route_viewer_message(stream_id, viewer_id, message)
+            except (ValueError, TypeError, KeyError) as e:
+                # Malformed frame - skip it, keep the socket
+                logging.warning(f"Invalid signaling message from viewer {viewer_id}: {str(e)}")
             
     except WebSocketDisconnect:
         # Remove viewer from stream
-        await stream_manager.leave_stream(stream_id, websocket)
+        await stream_manager.leave_stream(stream_id, viewer_id)
 
 # WebSocket endpoint
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    params = websocket.query_params
+    rooms = [room for room in params.get("rooms", "").split(",") if room]
+    info = await manager.connect(
+        websocket,
+        customer_number=params.get("customer_number"),
+        language=params.get("language"),
+        role="admin" if params.get("role") == "admin" else "customer",
+        rooms=rooms,
+        protocol=negotiate_ws_protocol(params.get("protocol")),
+        last_seq=int(params["last_seq"]) if params.get("last_seq", "").isdigit() else None,
+        epoch=params.get("epoch")
+    )
     try:
         while True:
             data = await websocket.receive_text()
-            # Handle incoming WebSocket messages if needed
-            pass
+            # Any frame (including "pong") counts as liveness
+            info.last_seen = time.monotonic()
+            try:
+                message = json.loads(data)
+                if isinstance(message, dict):
+                    manager.handle_client_message(info, message)
+            except ValueError:
+                pass
     except WebSocketDisconnect:
-        manager.disconnect(websocket)
-        await manager.broadcast_viewer_count()
+        # Already gone if the reaper evicted it
+        if manager.disconnect(websocket):
+            await manager.broadcast_viewer_count()
+
+async def close_sockets(sockets: List[WebSocket]):
+    """Close reaped sockets concurrently without waiting on dead peers"""
+    async def close(ws: WebSocket):
+        if ws.client_state == WebSocketState.CONNECTED:
+            await asyncio.wait_for(ws.close(code=1001), timeout=WS_CLOSE_TIMEOUT)
+    
+    await asyncio.gather(*[close(ws) for ws in sockets], return_exceptions=True)
+
+async def heartbeat_loop():
+    """Ping every socket each interval and reap the ones that stopped answering"""
+    ping = {"type": "ping"}
+    while True:
+        await asyncio.sleep(WS_HEARTBEAT_INTERVAL)
+        try:
+            cutoff = time.monotonic() - WS_IDLE_TIMEOUT
+            
+            reaped = manager.reap_idle(cutoff)
+            reaped_stream = await stream_manager.reap_idle(cutoff)
+            if reaped or reaped_stream:
+                logging.info(f"💓 Reaped {len(reaped)} idle /ws and {len(reaped_stream)} idle stream sockets")
+                await close_sockets(reaped + reaped_stream)
+            if reaped:
+                await manager.broadcast_viewer_count()
+            
+            await manager.broadcast(ping)
+            for stream_id in list(stream_manager.active_streams):
+                await stream_manager.broadcast_to_stream(stream_id, {"type": "ping"})
+        except Exception as e:
+            logging.error(f"Heartbeat error: {str(e)}")
+
+async def sales_push_loop():
+    """Push the session KPIs to admins on a fixed tick, when they changed"""
+    product_names = {product["id"]: product["name"] for product in DEMO_PRODUCTS}
+    last_pushed = None
+    last_reconciled = time.monotonic()
+    while True:
+        await asyncio.sleep(SALES_PUSH_INTERVAL)
+        try:
+            if time.monotonic() - last_reconciled >= SALES_RECONCILE_INTERVAL:
+                last_reconciled = time.monotonic()
+                sales_aggregator.reconcile_total(await db.orders.estimated_document_count())
+            
+            if not manager.subscriber_count("role:admin"):
+                last_pushed = None
+                continue
+            # The sliding windows move with the clock even without new orders
+            state = (sales_aggregator.version, sales_aggregator.current_minute())
+            if state == last_pushed:
+                continue
+            await manager.broadcast({"type": "sales_update", "data": sales_aggregator.snapshot(product_names)}, "role:admin")
+            last_pushed = state
+        except Exception as e:
+            logging.error(f"Sales push error: {str(e)}")
+
+# Pre-warming ahead of calendar events: LiveKit room, host token and caches
+EVENT_ROOM_PREFIX = os.environ.get('EVENT_ROOM_PREFIX', 'outlet34-event-')
+EVENT_ROOM_MAX_PARTICIPANTS = int(os.environ.get('EVENT_ROOM_MAX_PARTICIPANTS', '500'))
+# Pre-minted host tokens are only handed out with at least this much lifetime left
+HOST_TOKEN_MIN_REMAINING = 1800
+
+def event_room_name(event: Dict[str, Any]) -> str:
+    return f"{EVENT_ROOM_PREFIX}{event['date']}-{event['id'][:8]}"
+
+def host_token_expires_in(warm: Dict[str, Any]) -> int:
+    if not warm.get("host_token_expires_at"):
+        return 0
+    return int((warm["host_token_expires_at"] - datetime.now(timezone.utc)).total_seconds())
+
+async def prewarm_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Do everything a show start would otherwise do while customers wait
+    
+    Each step is independent - without LiveKit credentials the snapshot is
+    still warmed. Customer statuses are not: they are cached on demand by
+    /customers/check for seconds, far shorter than the lead time.
+    """
+    room_name = event_room_name(event)
+    result: Dict[str, Any] = {"room_name": room_name, "steps": {}}
+    
+    try:
+        room = await livekit_service.get_room_info(room_name)
+        if not room:
+            room = await livekit_service.create_room(
+                room_name=room_name,
+                max_participants=EVENT_ROOM_MAX_PARTICIPANTS,
+                # The room stays empty until the host joins at show start
+                empty_timeout=int(PREWARM_LEAD_MINUTES * 60) + 600,
+                metadata={"event_id": event["id"], "title": event["title"]}
+            )
+        result["room_sid"] = room["sid"]
+        
+        host_identity = f"host_{event['id'][:8]}"
+        host_token = await livekit_service.create_publisher_token(
+            room_name=room_name,
+            participant_identity=host_identity,
+            participant_name="Host",
+            metadata={"role": "publisher", "event_id": event["id"]}
+        )
+        claims = jwt.decode(host_token, options={"verify_signature": False})
+        result.update({
+            "host_identity": host_identity,
+            "host_token": host_token,
+            "host_token_expires_at": datetime.fromtimestamp(claims["exp"], timezone.utc)
+        })
+        result["steps"]["livekit"] = "ok"
+    except Exception as e:
+        logging.error(f"Pre-warming LiveKit room {room_name} failed: {str(e)}")
+        result["steps"]["livekit"] = f"failed: {str(e)}"
+    
+    try:
+        # Chat tail, events and products - what /api/live/snapshot serves joining viewers
+        await live_snapshot.render(f"{manager.epoch}.{manager.sequence}", live_snapshot_state)
+        result["steps"]["snapshot"] = "ok"
+    except Exception as e:
+        logging.error(f"Pre-warming live snapshot failed: {str(e)}")
+        result["steps"]["snapshot"] = f"failed: {str(e)}"
+    
+    return result
+
+prewarm_scheduler = PrewarmScheduler(query_events, prewarm_event)
+
+@api_router.get("/admin/prewarm")
+async def get_prewarm_status():
+    """Upcoming events the scheduler has warmed up, with cache stats"""
+    return {
+        **prewarm_scheduler.status(),
+        "customer_cache": customer_status_cache.stats(),
+        "snapshot": live_snapshot.stats()
+    }
+
+@api_router.post("/admin/events/{event_id}/prewarm")
+async def prewarm_event_now(event_id: str):
+    """
+    Warm an event right away (or return its warm state) - includes the
+    pre-minted host token and the room name to stream into
+    """
+    try:
+        warm = prewarm_scheduler.get(event_id)
+        if not warm:
+            event = await db.events.find_one({"id": event_id}, {"_id": 0})
+            if not event:
+                raise HTTPException(status_code=404, detail="Event not found")
+            if not event.get("starts_at"):
+                raise HTTPException(status_code=400, detail="Event has no start time")
+            warm = await prewarm_scheduler.warm(event_response(event))
+        
+        return {**warm, "livekit_url": livekit_service.livekit_url}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error pre-warming event {event_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to pre-warm event")
 
 # Include the router in the main app
 app.include_router(api_router)
@@ -1519,6 +2936,122 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    """Unique indexes registration relies on instead of find_one pre-checks"""
+    unindexed = []
+    for field in ("customer_number", "email", "id"):
+        try:
+            await db.customers.create_index(field, unique=True, name=f"{field}_unique")
+        except Exception as e:
+            logging.error(f"Error creating unique customer index on {field}: {str(e)}")
+            unindexed.append(field)
+    if unindexed:
+        # Without the index duplicates would be inserted silently - refuse to serve until the data is fixed
+        raise RuntimeError(f"Unique customer indexes missing for: {', '.join(unindexed)} (remove duplicates and restart)")
+    
+    try:
+        # Analytics and exports match on timestamp; last-order lookups on customer + timestamp
+        await db.orders.create_index([("timestamp", ASCENDING)], name="timestamp")
+        await db.orders.create_index([("customer_id", ASCENDING), ("timestamp", -1)], name="customer_id_timestamp")
+    except Exception as e:
+        logging.error(f"Error creating order indexes: {str(e)}")
+    
+    try:
+        await backfill_last_orders()
+    except Exception as e:
+        logging.error(f"Error backfilling customer last orders: {str(e)}")
+    
+    try:
+        await db.events.create_index([("starts_at", ASCENDING), ("id", ASCENDING)], name="starts_at_id")
+        await backfill_event_start_times()
+    except Exception as e:
+        logging.error(f"Error preparing events collection: {str(e)}")
+
+async def backfill_last_orders():
+    """Build the last-order summaries from existing orders when the collection is still empty"""
+    if await db.customer_last_orders.estimated_document_count() or not await db.orders.estimated_document_count():
+        return
+    
+    products = {product["id"]: product["name"] for product in DEMO_PRODUCTS}
+    pipeline = [
+        # Served by the customer_id_timestamp index
+        {"$sort": {"customer_id": 1, "timestamp": -1}},
+        {"$group": {"_id": "$customer_id", "order": {"$first": "$$ROOT"}}}
+    ]
+    updates = []
+    stored = 0
+    async for row in db.orders.aggregate(pipeline, allowDiskUse=True):
+        order = Order(**row["order"])
+        summary = last_order_summary(order, products.get(order.product_id, "Unknown Product"))
+        updates.append(UpdateOne({"_id": row["_id"]}, {"$setOnInsert": {"order": summary}}, upsert=True))
+        if len(updates) >= CUSTOMER_BATCH_SIZE:
+            await db.customer_last_orders.bulk_write(updates, ordered=False)
+            stored += len(updates)
+            updates = []
+    if updates:
+        await db.customer_last_orders.bulk_write(updates, ordered=False)
+        stored += len(updates)
+    logging.info(f"🧾 Backfilled last-order summaries for {stored} customers")
+
+async def backfill_event_start_times():
+    """Give events created before starts_at existed their UTC start time"""
+    updates = []
+    async for event in db.events.find({"starts_at": {"$exists": False}}, {"_id": 0, "id": 1, "date": 1, "time": 1}):
+        try:
+            updates.append(UpdateOne({"id": event["id"]}, {"$set": {"starts_at": event_starts_at(event["date"], event["time"])}}))
+        except (KeyError, ValueError):
+            logging.warning(f"Event {event.get('id')} has no valid date/time - not backfilled")
+    
+    if updates:
+        await db.events.bulk_write(updates, ordered=False)
+        await live_snapshot.publish_events_change()
+        logging.info(f"📅 Backfilled starts_at for {len(updates)} events")
+
+@app.on_event("startup")
+async def start_heartbeat():
+    app.state.heartbeat_task = asyncio.create_task(heartbeat_loop())
+
+@app.on_event("startup")
+async def start_ticker_store():
+    try:
+        await ticker_store.load()
+    except Exception as e:
+        logging.error(f"Error loading ticker settings, serving defaults: {str(e)}")
+    app.state.ticker_task = asyncio.create_task(ticker_store.run())
+
+@app.on_event("startup")
+async def start_sales_aggregator():
+    try:
+        # Only the all-time total comes from the DB, once - collection metadata, no scan
+        sales_aggregator.reconcile_total(await db.orders.estimated_document_count())
+    except Exception as e:
+        logging.error(f"Error seeding order total: {str(e)}")
+    app.state.sales_task = asyncio.create_task(sales_push_loop())
+
+@app.on_event("startup")
+async def start_chat_archiver():
+    try:
+        await chat_archiver.create_indexes()
+    except Exception as e:
+        logging.error(f"Error creating chat indexes: {str(e)}")
+    app.state.chat_archive_task = asyncio.create_task(chat_archiver.run())
+
+@app.on_event("startup")
+async def start_events_revision_poll():
+    app.state.events_poll_task = asyncio.create_task(live_snapshot.run())
+
+@app.on_event("startup")
+async def start_prewarm_scheduler():
+    app.state.prewarm_task = asyncio.create_task(prewarm_scheduler.run())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.heartbeat_task.cancel()
+    app.state.prewarm_task.cancel()
+    app.state.ticker_task.cancel()
+    app.state.sales_task.cancel()
+    app.state.chat_archive_task.cancel()
+    app.state.events_poll_task.cancel()
+    zoom_token_service.close()
     client.close()
\ No newline at end of file
@@ -0,0 +1,110 @@
+"""
+Ticker Settings Store
+Versioned ticker settings persisted in Mongo and cached in memory, so
+restarts keep them and every worker serves the same version
+"""
+
+import asyncio
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import ReturnDocument
+
+# How often a worker checks for updates made by other workers (seconds)
+TICKER_POLL_INTERVAL = float(os.getenv("TICKER_POLL_INTERVAL", "2"))
+
+TICKER_DOCUMENT_ID = "ticker"
+
+
+class TickerStore:
+    """
+    One settings document with a version counter
+
+    Updates are compare-and-set on the version, so concurrent writers from
+    different workers never overwrite each other silently. Writes that do
+    not change the content keep the version and trigger no broadcast.
+    """
+
+    def __init__(self, collection, defaults: Dict[str, Any],
+                 on_change: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None):
+        self._collection = collection
+        self._defaults = dict(defaults)
+        self._on_change = on_change
+        self.settings: Dict[str, Any] = dict(defaults)
+        self.version = 0
+        self.updated_at: Optional[datetime] = None
+
+    def public(self) -> Dict[str, Any]:
+        """Settings as served to clients"""
+        return {**self.settings, "version": self.version}
+
+    def etag(self) -> str:
+        return f'"ticker.{self.version}"'
+
+    def _adopt(self, document: Dict[str, Any]):
+        self.settings = {key: document.get(key, default) for key, default in self._defaults.items()}
+        self.version = document["version"]
+        self.updated_at = document.get("updated_at")
+
+    async def load(self):
+        """Read the stored settings, creating the document from the defaults on first start"""
+        document = await self._collection.find_one_and_update(
+            {"_id": TICKER_DOCUMENT_ID},
+            {"$setOnInsert": {**self._defaults, "version": 1, "updated_at": datetime.now(timezone.utc)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._adopt(document)
+
+    async def update(self, changes: Dict[str, Any]) -> bool:
+        """
+        Apply changes to the stored settings
+
+        Returns:
+            True if the content changed (and was broadcast), False otherwise
+        """
+        changes = {key: value for key, value in changes.items() if key in self._defaults}
+        while True:
+            if all(self.settings.get(key) == value for key, value in changes.items()):
+                return False
+
+            document = await self._collection.find_one_and_update(
+                {"_id": TICKER_DOCUMENT_ID, "version": self.version},
+                {"$set": {**changes, "updated_at": datetime.now(timezone.utc)}, "$inc": {"version": 1}},
+                return_document=ReturnDocument.AFTER
+            )
+            if document is not None:
+                self._adopt(document)
+                await self._notify()
+                return True
+
+            # Another worker wrote first - compare against its version and retry
+            if not await self.refresh():
+                # Document was reset or removed
+                await self.load()
+
+    async def refresh(self) -> bool:
+        """Pick up a newer version written by another worker"""
+        document = await self._collection.find_one({"_id": TICKER_DOCUMENT_ID, "version": {"$gt": self.version}})
+        if document is None:
+            return False
+        previous = self.settings
+        self._adopt(document)
+        if self.settings != previous:
+            await self._notify()
+        return True
+
+    async def run(self):
+        """Poll loop, started on app startup"""
+        while True:
+            await asyncio.sleep(TICKER_POLL_INTERVAL)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logging.error(f"Ticker settings poll error: {str(e)}")
+
+    async def _notify(self):
+        if self._on_change:
+            await self._on_change(self.public())
@@ -0,0 +1,79 @@
+"""
+Signed Token Cache
+Reuses still-valid access tokens instead of signing a fresh JWT per request
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TokenCache:
+    """LRU cache of signed tokens keyed on (room, identity, grants)"""
+
+    def __init__(self, refresh_threshold: int = 900, max_entries: int = 50000):
+        """
+        Args:
+            refresh_threshold: Minimum remaining lifetime (seconds) a cached
+                token must have to be handed out again
+            max_entries: Upper bound on cached tokens (least recently used evicted)
+        """
+        self.refresh_threshold = refresh_threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, float]]:
+        """
+        Return (token, expires_at) if a cached token is still valid for
+        longer than the refresh threshold, otherwise None
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry[1] - now <= self.refresh_threshold:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, token: str, expires_at: float):
+        """Store a freshly signed token"""
+        with self._lock:
+            self._entries[key] = (token, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_room(self, room_name: str) -> int:
+        """Drop all tokens issued for a room (keys start with the room name)"""
+        with self._lock:
+            stale = [key for key in self._entries if key[0] == room_name]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "refresh_threshold": self.refresh_threshold
+            }
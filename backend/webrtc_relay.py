@@ -0,0 +1,170 @@
+"""
+WebRTC Relay (SFU) für OUTLET34 Live Shopping
+Der Streamer publiziert einmal an das Backend, das Backend verteilt die Tracks
+über aiortc MediaRelay an alle Zuschauer
+"""
+
+import os
+import asyncio
+import logging
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+try:
+    from aiortc import RTCConfiguration, RTCIceServer, RTCPeerConnection, RTCSessionDescription
+    from aiortc.contrib.media import MediaRelay
+    AIORTC_AVAILABLE = True
+except ImportError as e:
+    print(f"aiortc not available: {e}")
+    AIORTC_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Relayed viewers per CPU core (each viewer has its own encoder on the server)
+SFU_VIEWERS_PER_CORE = int(os.getenv("SFU_VIEWERS_PER_CORE", "15"))
+SFU_STUN_SERVER = os.getenv("SFU_STUN_SERVER", "stun:stun.l.google.com:19302")
+
+
+class RelaySession:
+    """Ein publizierender Streamer und seine weitergeleiteten Zuschauer"""
+
+    def __init__(self, stream_id: str, publisher_pc: "RTCPeerConnection"):
+        self.stream_id = stream_id
+        self.publisher_pc = publisher_pc
+        self.relay = MediaRelay()
+        self.tracks: Dict[str, Any] = {}  # kind -> remote track of the streamer
+        self.subscribers: Dict[str, "RTCPeerConnection"] = {}  # viewer_id -> peer connection
+
+
+class WebRTCRelayManager:
+    """Server-seitige Weiterleitung (SFU) für den nativen WebRTC Pfad"""
+
+    def __init__(self, ice_servers: Optional[List[str]] = None,
+                 on_viewers_changed: Optional[Callable[[str, int], Awaitable[None]]] = None):
+        self.ice_servers = [SFU_STUN_SERVER] if ice_servers is None else ice_servers
+        self.sessions: Dict[str, RelaySession] = {}
+        # Called with (stream_id, viewer count) whenever a viewer joins or drops
+        self._on_viewers_changed = on_viewers_changed
+
+    def capacity(self) -> int:
+        """Maximale Zuschauerzahl pro Stream im Relay-Modus"""
+        return SFU_VIEWERS_PER_CORE * (os.cpu_count() or 1)
+
+    def _create_peer_connection(self) -> "RTCPeerConnection":
+        if not AIORTC_AVAILABLE:
+            raise RuntimeError("aiortc not available - SFU mode disabled")
+
+        return RTCPeerConnection(RTCConfiguration(
+            iceServers=[RTCIceServer(urls=url) for url in self.ice_servers]
+        ))
+
+    async def publish(self, stream_id: str, sdp: str, sdp_type: str) -> Dict[str, str]:
+        """Offer des Streamers annehmen und Answer zurückgeben"""
+        # A re-publish replaces the previous session
+        await self.close_session(stream_id)
+
+        pc = self._create_peer_connection()
+        session = RelaySession(stream_id, pc)
+        self.sessions[stream_id] = session
+
+        @pc.on("track")
+        def on_track(track):
+            logger.info(f"📡 SFU: {track.kind} track published for stream {stream_id}")
+            session.tracks[track.kind] = track
+
+        @pc.on("connectionstatechange")
+        async def on_connectionstatechange():
+            if pc.connectionState in ("failed", "closed"):
+                logger.info(f"📡 SFU: Publisher connection {pc.connectionState} for stream {stream_id}")
+                if self.sessions.get(stream_id) is session:
+                    await self.close_session(stream_id)
+
+        await pc.setRemoteDescription(RTCSessionDescription(sdp=sdp, type=sdp_type))
+        await pc.setLocalDescription(await pc.createAnswer())
+
+        return {"sdp": pc.localDescription.sdp, "type": pc.localDescription.type}
+
+    async def subscribe(self, stream_id: str, sdp: str, sdp_type: str) -> Dict[str, str]:
+        """Zuschauer an die weitergeleiteten Tracks anhängen"""
+        session = self.sessions.get(stream_id)
+        if not session or not session.tracks:
+            raise LookupError("Stream is not publishing")
+
+        viewer_id = uuid.uuid4().hex[:12]
+        pc = self._create_peer_connection()
+        session.subscribers[viewer_id] = pc
+
+        @pc.on("connectionstatechange")
+        async def on_connectionstatechange():
+            if pc.connectionState in ("failed", "closed"):
+                await self.unsubscribe(stream_id, viewer_id)
+
+        try:
+            await pc.setRemoteDescription(RTCSessionDescription(sdp=sdp, type=sdp_type))
+
+            # One source, N consumers - the relay fans frames out to every subscriber
+            for transceiver in pc.getTransceivers():
+                track = session.tracks.get(transceiver.kind)
+                if track is not None:
+                    pc.addTrack(session.relay.subscribe(track))
+
+            await pc.setLocalDescription(await pc.createAnswer())
+        except Exception:
+            await self.unsubscribe(stream_id, viewer_id)
+            raise
+
+        await self._viewers_changed(stream_id)
+        return {"viewer_id": viewer_id, "sdp": pc.localDescription.sdp, "type": pc.localDescription.type}
+
+    async def unsubscribe(self, stream_id: str, viewer_id: str) -> bool:
+        """Zuschauer-Verbindung schließen"""
+        session = self.sessions.get(stream_id)
+        if not session:
+            return False
+
+        pc = session.subscribers.pop(viewer_id, None)
+        if pc is None:
+            return False
+
+        # Explicit leave and failed/closed connections alike
+        await pc.close()
+        await self._viewers_changed(stream_id)
+        return True
+
+    def viewer_count(self, stream_id: str) -> int:
+        session = self.sessions.get(stream_id)
+        return len(session.subscribers) if session else 0
+
+    async def close_session(self, stream_id: str):
+        """Publisher und alle Zuschauer eines Streams schließen"""
+        session = self.sessions.pop(stream_id, None)
+        if not session:
+            return
+
+        await asyncio.gather(
+            *[pc.close() for pc in session.subscribers.values()],
+            session.publisher_pc.close(),
+            return_exceptions=True
+        )
+        had_viewers = bool(session.subscribers)
+        session.subscribers.clear()
+        logger.info(f"📡 SFU: Session closed for stream {stream_id}")
+        if had_viewers:
+            await self._viewers_changed(stream_id)
+
+    async def _viewers_changed(self, stream_id: str):
+        if self._on_viewers_changed:
+            await self._on_viewers_changed(stream_id, self.viewer_count(stream_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "available": AIORTC_AVAILABLE,
+            "capacity_per_stream": self.capacity(),
+            "sessions": {
+                stream_id: {
+                    "publishing": sorted(session.tracks),
+                    "viewers": len(session.subscribers)
+                }
+                for stream_id, session in self.sessions.items()
+            }
+        }
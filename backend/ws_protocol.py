@@ -0,0 +1,102 @@
+"""
+Compact WebSocket Protocol
+Opt-in framing for /ws clients: short type codes, counters as deltas and
+MessagePack binary frames (compact JSON text when msgpack is not installed)
+"""
+
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from fast_json import dumps_text, to_serializable
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+# Negotiated with ?protocol=... on connect
+PROTOCOL_JSON = "json"
+PROTOCOL_COMPACT = "compact"  # compact JSON text frames
+PROTOCOL_MSGPACK = "msgpack"  # compact MessagePack binary frames
+
+TYPE_CODES = {
+    "ping": "p",
+    "hello": "h",
+    "chat_message": "c",
+    "order_notification": "o",
+    "order_counter_update": "oc",
+    "viewer_count": "v",
+    "ticker_update": "t",
+    "sync": "y",
+    "resync_required": "r",
+    "sales_update": "su"
+}
+
+# Frequent small updates: message type -> values sent as deltas against the
+# last values the same connection received
+DELTA_VALUES: Dict[str, Callable[[Dict[str, Any]], Tuple]] = {
+    "viewer_count": lambda message: (message["count"],),
+    "order_counter_update": lambda message: (message["data"]["session_orders"], message["data"]["total_orders"])
+}
+
+
+def negotiate(requested: Optional[str]) -> str:
+    """Protocol the server will actually speak for the requested one"""
+    if requested == PROTOCOL_MSGPACK:
+        return PROTOCOL_MSGPACK if MSGPACK_AVAILABLE else PROTOCOL_COMPACT
+    if requested == PROTOCOL_COMPACT:
+        return PROTOCOL_COMPACT
+    return PROTOCOL_JSON
+
+
+class CompactEncoder:
+    """
+    Encodes one broadcast message for compact clients
+
+    Frames are built lazily and shared between connections - once per
+    protocol and distinct delta base, not once per connection.
+    """
+
+    def __init__(self, message: Dict[str, Any]):
+        self.message_type = message.get("type")
+        self.code = TYPE_CODES.get(self.message_type, self.message_type)
+        self.seq = message.get("seq")
+
+        extract = DELTA_VALUES.get(self.message_type)
+        self.values = extract(message) if extract else None
+
+        # Remaining payload: the "data" object itself, or every other key
+        rest = {key: value for key, value in message.items() if key not in ("type", "seq")}
+        self.payload = rest["data"] if set(rest) == {"data"} else rest
+
+        self._frames: Dict[Tuple[str, Optional[Tuple]], Union[str, bytes]] = {}
+
+    def frame_for(self, protocol: str, last_values: Dict[str, Tuple]) -> Union[str, bytes]:
+        """Frame for one connection, advancing its delta state"""
+        base = None
+        if self.values is not None:
+            base = last_values.get(self.message_type)
+            last_values[self.message_type] = self.values
+
+        key = (protocol, base)
+        frame = self._frames.get(key)
+        if frame is None:
+            frame = self._frames[key] = self._encode(protocol, base)
+        return frame
+
+    def _encode(self, protocol: str, base: Optional[Tuple]) -> Union[str, bytes]:
+        if self.values is None:
+            frame = {"t": self.code}
+            if self.payload:
+                frame["p"] = self.payload
+        elif base is None or len(base) != len(self.values):
+            frame = {"t": self.code, "v": list(self.values)}
+        else:
+            frame = {"t": self.code, "d": [value - previous for value, previous in zip(self.values, base)]}
+
+        if self.seq is not None:
+            frame["s"] = self.seq
+
+        if protocol == PROTOCOL_MSGPACK:
+            return msgpack.packb(frame, default=to_serializable)
+        return dumps_text(frame)
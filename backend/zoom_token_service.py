@@ -0,0 +1,245 @@
+"""
+Zoom Video SDK Token Service
+Caches signed session JWTs and signs them off the event loop
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Hashable, Set, Tuple
+
+import jwt
+
+from token_cache import TokenCache
+
+logger = logging.getLogger(__name__)
+
+# Cached tokens are re-signed once less than this many seconds remain
+ZOOM_TOKEN_REFRESH_AHEAD = int(os.getenv("ZOOM_TOKEN_REFRESH_AHEAD", "600"))
+ZOOM_TOKEN_WORKERS = int(os.getenv("ZOOM_TOKEN_WORKERS", "2"))
+ZOOM_VALIDATION_CACHE_SIZE = int(os.getenv("ZOOM_VALIDATION_CACHE_SIZE", "10000"))
+
+# Longest lifetime of any issued token - revocations can be forgotten after this
+MAX_TOKEN_LIFETIME_SECONDS = 4 * 3600
+
+
+class TokenRevokedError(jwt.InvalidTokenError):
+    """Token belongs to a session that has ended"""
+
+
+class ZoomTokenService:
+    """Signs Zoom Video SDK JWTs with a per-(topic, role) cache and single-flight"""
+
+    def __init__(self, sdk_key: str, sdk_secret: str):
+        self.sdk_key = sdk_key
+        self.sdk_secret = sdk_secret
+        self.token_cache = TokenCache(refresh_threshold=ZOOM_TOKEN_REFRESH_AHEAD)
+        self._signing_pool = ThreadPoolExecutor(
+            max_workers=ZOOM_TOKEN_WORKERS,
+            thread_name_prefix="zoom-token"
+        )
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+        # sha256(token) -> verified claims, bounded LRU
+        self._validated: "OrderedDict[bytes, Dict[str, Any]]" = OrderedDict()
+        # topic -> (revocation time, generation); tokens issued before it are rejected
+        self._revoked_topics: Dict[str, Tuple[int, int]] = {}
+        # Bumped on every revocation - a signature that started before it is discarded
+        self._generation = 0
+        # topic -> digests of tokens signed after its revocation within the same second
+        self._reissued: Dict[str, Set[bytes]] = {}
+        self.validation_hits = 0
+        self.validation_misses = 0
+
+        # Measurements for /api/zoom/token-stats
+        self._latencies = deque(maxlen=2048)
+        self.requests = 0
+        self.shared_signatures = 0
+        self.signatures = 0
+        self.signing_cpu_seconds = 0.0
+
+    def sign(self, topic: str, role: int = 0, expires_in_hours: int = 2) -> Tuple[str, int]:
+        """
+        Sign a new token (synchronous, uncached)
+
+        Returns:
+            Tuple of JWT token string and its expiry as unix timestamp
+        """
+        cpu_start = time.thread_time()
+
+        current_time = int(time.time())
+        expiration_time = current_time + (expires_in_hours * 3600)
+
+        payload = {
+            'iss': self.sdk_key,
+            'iat': current_time,
+            'exp': expiration_time,
+            'topic': topic,
+            'role_type': role,
+            'aud': 'zoom',
+            'alg': 'HS256'
+        }
+
+        token = jwt.encode(payload, self.sdk_secret, algorithm='HS256')
+
+        self.signatures += 1
+        self.signing_cpu_seconds += time.thread_time() - cpu_start
+        return token, expiration_time
+
+    async def get_token(self, topic: str, role: int = 0, expires_in_hours: int = 2) -> Tuple[str, int]:
+        """
+        Return a cached token for (topic, role) or sign one in the worker pool
+
+        Concurrent callers asking for the same key while it is being signed
+        share that single signature.
+
+        Returns:
+            Tuple of JWT token string and its expiry as unix timestamp
+        """
+        started = time.perf_counter()
+        self.requests += 1
+        key = (topic, role, expires_in_hours)
+
+        try:
+            cached = self.token_cache.get(key)
+            if cached:
+                return cached
+
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                self.shared_signatures += 1
+                return await asyncio.shield(inflight)
+
+            inflight = self._inflight[key] = asyncio.ensure_future(self._sign_current(key))
+            inflight.add_done_callback(lambda _: self._inflight.pop(key, None))
+            return await asyncio.shield(inflight)
+        finally:
+            self._latencies.append(time.perf_counter() - started)
+
+    async def _sign_current(self, key: Tuple[str, int, int]) -> Tuple[str, int]:
+        """Sign in the worker pool until no revocation of the topic overlaps the signature"""
+        topic, role, expires_in_hours = key
+        loop = asyncio.get_running_loop()
+        while True:
+            generation = self._topic_generation(topic)
+            token, expires_at = await loop.run_in_executor(
+                self._signing_pool, self.sign, topic, role, expires_in_hours
+            )
+            if self._topic_generation(topic) == generation:
+                break
+            # Revoked while signing - the token may predate the revocation
+
+        revocation = self._revoked_topics.get(topic)
+        if revocation is not None and expires_at - expires_in_hours * 3600 == revocation[0]:
+            # Same second as the revocation, but signed after it
+            self._reissued.setdefault(topic, set()).add(hashlib.sha256(token.encode()).digest())
+
+        self.token_cache.put(key, token, expires_at)
+        return token, expires_at
+
+    def _topic_generation(self, topic: str) -> int:
+        revocation = self._revoked_topics.get(topic)
+        return revocation[1] if revocation else 0
+
+    def validate(self, token: str) -> Dict[str, Any]:
+        """
+        Verify a token and return its claims
+
+        Repeat validations of the same token are served from the LRU without
+        HMAC verification until the token's exp passes.
+
+        Raises:
+            jwt.ExpiredSignatureError: Token has expired
+            TokenRevokedError: The token's session has ended
+            jwt.InvalidTokenError: Token is invalid
+        """
+        digest = hashlib.sha256(token.encode()).digest()
+
+        claims = self._validated.get(digest)
+        if claims is not None:
+            if claims['exp'] <= time.time():
+                del self._validated[digest]
+                raise jwt.ExpiredSignatureError("Signature has expired")
+            self._validated.move_to_end(digest)
+            self.validation_hits += 1
+            return dict(claims)
+
+        self.validation_misses += 1
+        claims = jwt.decode(token, self.sdk_secret, algorithms=['HS256'], audience='zoom')
+
+        revocation = self._revoked_topics.get(claims.get('topic'))
+        if revocation is not None:
+            issued_at = claims.get('iat', 0)
+            if issued_at < revocation[0] or (
+                issued_at == revocation[0] and digest not in self._reissued.get(claims['topic'], ())
+            ):
+                raise TokenRevokedError("Session has ended")
+
+        self._validated[digest] = claims
+        if len(self._validated) > ZOOM_VALIDATION_CACHE_SIZE:
+            self._validated.popitem(last=False)
+        return dict(claims)
+
+    def revoke_topic(self, topic: str) -> int:
+        """
+        End a session: reject its existing tokens and evict them from both caches
+
+        Returns:
+            Number of evicted validation entries
+        """
+        now = int(time.time())
+        self._generation += 1
+        self._revoked_topics[topic] = (now, self._generation)
+        self._reissued.pop(topic, None)
+
+        # Forget revocations no issued token can outlive any more
+        for revoked_topic, (revoked_at, _) in list(self._revoked_topics.items()):
+            if revoked_at + MAX_TOKEN_LIFETIME_SECONDS < now:
+                del self._revoked_topics[revoked_topic]
+                self._reissued.pop(revoked_topic, None)
+
+        stale = [digest for digest, claims in self._validated.items() if claims.get('topic') == topic]
+        for digest in stale:
+            del self._validated[digest]
+
+        self.token_cache.invalidate_room(topic)
+        logger.info(f"Zoom topic {topic} revoked - {len(stale)} validated tokens evicted")
+        return len(stale)
+
+    def stats(self) -> Dict[str, Any]:
+        """Latency and CPU cost per token request"""
+        latencies = sorted(self._latencies)
+        count = len(latencies)
+
+        def percentile(p: float) -> float:
+            if not count:
+                return 0.0
+            return round(latencies[min(count - 1, int(count * p))] * 1000, 3)
+
+        return {
+            "requests": self.requests,
+            "signatures": self.signatures,
+            "shared_signatures": self.shared_signatures,
+            "cache": self.token_cache.stats(),
+            "validation": {
+                "entries": len(self._validated),
+                "hits": self.validation_hits,
+                "misses": self.validation_misses,
+                "revoked_topics": len(self._revoked_topics)
+            },
+            "latency_ms": {
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "samples": count
+            },
+            "cpu_ms_per_signature": round(self.signing_cpu_seconds / self.signatures * 1000, 4) if self.signatures else 0.0,
+            "cpu_ms_per_request": round(self.signing_cpu_seconds / self.requests * 1000, 4) if self.requests else 0.0
+        }
+
+    def close(self):
+        self._signing_pool.shutdown(wait=False)
@@ -0,0 +1,594 @@
+#!/usr/bin/env python3
+"""
+Backend Micro-Benchmarks
+In-process throughput measurements for the performance-critical backend paths
+"""
+
+import os
+import sys
+import time
+import asyncio
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+from dotenv import load_dotenv
+load_dotenv(BACKEND_DIR / ".env")
+
+
+class BackendBenchmark:
+    def __init__(self):
+        self.results = []
+
+    def log_result(self, name, value, unit, details=""):
+        """Log benchmark result"""
+        print(f"⏱️  {name}: {value:,.1f} {unit}" + (f" ({details})" if details else ""))
+        self.results.append({
+            "name": name,
+            "value": value,
+            "unit": unit,
+            "details": details
+        })
+
+    def bench_livekit_token_cache(self, viewers=2000, rounds=5):
+        """Viewer tokens per second - cold signing vs. cache hits after a reconnect wave"""
+        print("\n🎫 LiveKit viewer token cache...")
+        from livekit_streaming import livekit_service, BatchTokenRequest
+
+        room_name = "benchmark-room"
+        viewer_ids = [f"{i:05d}" for i in range(viewers)]
+        livekit_service.token_cache.invalidate_room(room_name)
+
+        start = time.perf_counter()
+        asyncio.run(livekit_service.generate_viewer_tokens(
+            BatchTokenRequest(room_name=room_name, viewer_ids=viewer_ids)
+        ))
+        cold = time.perf_counter() - start
+        self.log_result("Token signing (cold)", viewers / cold, "tokens/s")
+
+        start = time.perf_counter()
+        for _ in range(rounds):
+            asyncio.run(livekit_service.generate_viewer_tokens(
+                BatchTokenRequest(room_name=room_name, viewer_ids=viewer_ids)
+            ))
+        warm = time.perf_counter() - start
+        self.log_result("Token reuse (cached)", viewers * rounds / warm, "tokens/s",
+                        f"{cold / (warm / rounds):.1f}x faster")
+
+        livekit_service.token_cache.invalidate_room(room_name)
+        livekit_service.participants.pop(room_name, None)
+
+    def bench_zoom_token_burst(self, callers=1000, topics=5):
+        """Zoom token endpoint path - session start burst of identical (topic, role) requests"""
+        print("\n🎥 Zoom token cache & single-flight...")
+        from zoom_token_service import ZoomTokenService
+
+        service = ZoomTokenService(os.environ["ZOOM_SDK_KEY"], os.environ["ZOOM_SDK_SECRET"])
+
+        start = time.perf_counter()
+        for i in range(callers):
+            service.sign(f"topic-{i % topics}", 0)
+        uncached = time.perf_counter() - start
+        self.log_result("Uncached signing", callers / uncached, "req/s")
+
+        async def burst():
+            await asyncio.gather(*[
+                service.get_token(f"topic-{i % topics}", 0) for i in range(callers)
+            ])
+
+        service.signatures = 0
+        service.signing_cpu_seconds = 0.0
+        start = time.perf_counter()
+        asyncio.run(burst())
+        cached = time.perf_counter() - start
+
+        stats = service.stats()
+        self.log_result("Cached burst", callers / cached, "req/s",
+                        f"{stats['signatures']} signatures, {stats['shared_signatures']} shared")
+        self.log_result("Latency p95", stats["latency_ms"]["p95"] * 1000, "µs")
+        self.log_result("CPU per request", stats["cpu_ms_per_request"] * 1000, "µs")
+        service.close()
+
+    def bench_json_responses(self, rounds=20):
+        """Response serialization - FastAPI default path vs. fast path for /api/chat, /api/orders, /api/admin/customers"""
+        print("\n📦 JSON response serialization...")
+        import uuid
+        from datetime import datetime, timezone
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.responses import JSONResponse
+        import fast_json
+        from server import ChatMessage, Order, Customer
+
+        now = datetime.now(timezone.utc)
+        payloads = {
+            "/api/chat": [ChatMessage(username=f"user{i}", message="Habt ihr das in XL? 😍", timestamp=now)
+                          for i in range(50)],
+            "/api/orders": [Order(customer_id=f"{10000 + i}", product_id="1", size="XL", quantity=2,
+                                  price=25.8, timestamp=now) for i in range(100)],
+            "/api/admin/customers": [Customer(customer_number=f"{10000 + i}", email=f"h{i}@example.com",
+                                              name=f"Händler {i}", id=str(uuid.uuid4())) for i in range(1000)]
+        }
+
+        encoder = "orjson" if fast_json.ORJSON_AVAILABLE else "stdlib"
+        for endpoint, models in payloads.items():
+            start = time.perf_counter()
+            for _ in range(rounds):
+                JSONResponse(jsonable_encoder(models)).body
+            default_path = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(rounds):
+                fast_json.FastJSONResponse(models).body
+            fast_path = time.perf_counter() - start
+
+            self.log_result(f"{endpoint} default", rounds / default_path, "responses/s")
+            self.log_result(f"{endpoint} fast ({encoder})", rounds / fast_path, "responses/s",
+                            f"{default_path / fast_path:.1f}x faster")
+
+    def bench_signaling_bytes(self, viewers=500, candidates=15):
+        """Signaling bytes per viewer join - broadcast-to-all vs. targeted routing"""
+        print("\n📡 WebRTC signaling routing...")
+        from fastapi.websockets import WebSocketState
+        from server import WebRTCStreamManager, StreamSession
+
+        class CountingSocket:
+            client_state = WebSocketState.CONNECTED
+
+            def __init__(self):
+                self.bytes_sent = 0
+                self.frames_sent = 0
+
+            async def send_text(self, text):
+                self.bytes_sent += len(text.encode("utf-8"))
+                self.frames_sent += 1
+
+        sdp = "v=0\r\n" + "a=candidate:1 1 udp 2122260223 192.168.1.10 54321 typ host\r\n" * 40
+        candidate = {"candidate": "candidate:842163049 1 udp 1677729535 203.0.113.7 61234 typ srflx raddr 0.0.0.0 rport 0",
+                     "sdpMLineIndex": 0, "sdpMid": "0"}
+
+        async def negotiate(targeted):
+            manager = WebRTCStreamManager()
+            manager.active_streams["bench"] = StreamSession(streamer_id="admin", max_viewers=viewers + 1)
+            sockets = {f"viewer{i}": CountingSocket() for i in range(viewers)}
+            manager.stream_connections["bench"] = dict(sockets)
+            streamer = CountingSocket()
+            manager.streamer_connections["bench"] = streamer
+
+            # One join: offer + candidates from the streamer, answer + candidates from the viewer
+            target = {"to": "viewer0"} if targeted else {}
+            streamer_messages = [{"type": "offer", "sdp": sdp, **target}] + \
+                [{"type": "ice-candidate", "candidate": candidate, **target}] * candidates
+            for message in streamer_messages:
+                if targeted:
+                    await manager.route_streamer_message("bench", message)
+                else:
+                    # Previous behaviour: every frame to every viewer and back to the streamer
+                    await manager.broadcast_to_stream("bench", {"type": "signaling", "from": "streamer", "data": message})
+
+            viewer_messages = [{"type": "answer", "sdp": sdp}] + \
+                [{"type": "ice-candidate", "candidate": candidate}] * candidates
+            for message in viewer_messages:
+                await manager.route_viewer_message("bench", "viewer0", message)
+
+            return sum(ws.bytes_sent for ws in sockets.values()) + streamer.bytes_sent
+
+        broadcast_bytes = asyncio.run(negotiate(False))
+        targeted_bytes = asyncio.run(negotiate(True))
+        self.log_result(f"Broadcast signaling ({viewers} viewers)", broadcast_bytes / 1024, "KiB/join")
+        self.log_result(f"Targeted signaling ({viewers} viewers)", targeted_bytes / 1024, "KiB/join",
+                        f"{broadcast_bytes / targeted_bytes:.0f}x less")
+
+    def bench_sfu_loopback(self, viewer_steps=(0, 2, 4), seconds=5):
+        """SFU relay loopback - server CPU per relayed viewer (publisher and viewers in-process)"""
+        print("\n📡 SFU relay loopback...")
+        from aiortc import RTCPeerConnection, RTCSessionDescription
+        from aiortc.mediastreams import MediaStreamError, VideoStreamTrack
+        from webrtc_relay import WebRTCRelayManager
+
+        async def run(viewers):
+            relay = WebRTCRelayManager(ice_servers=[])
+
+            publisher = RTCPeerConnection()
+            publisher.addTrack(VideoStreamTrack())
+            await publisher.setLocalDescription(await publisher.createOffer())
+            answer = await relay.publish("bench", publisher.localDescription.sdp, publisher.localDescription.type)
+            await publisher.setRemoteDescription(RTCSessionDescription(**answer))
+
+            frames = 0
+            clients = []
+            for _ in range(viewers):
+                client = RTCPeerConnection()
+                client.addTransceiver("video", direction="recvonly")
+
+                @client.on("track")
+                def on_track(track):
+                    async def consume():
+                        nonlocal frames
+                        try:
+                            while True:
+                                await track.recv()
+                                frames += 1
+                        except MediaStreamError:
+                            pass
+                    asyncio.ensure_future(consume())
+
+                await client.setLocalDescription(await client.createOffer())
+                answer = await relay.subscribe("bench", client.localDescription.sdp, client.localDescription.type)
+                await client.setRemoteDescription(RTCSessionDescription(sdp=answer["sdp"], type=answer["type"]))
+                clients.append(client)
+
+            await asyncio.sleep(2)  # ICE + first keyframes
+            frames = 0
+            cpu_start = time.process_time()
+            await asyncio.sleep(seconds)
+            cpu = time.process_time() - cpu_start
+            received = frames
+
+            for client in clients:
+                await client.close()
+            await publisher.close()
+            await relay.close_session("bench")
+            return cpu / seconds, received / seconds
+
+        baseline = None
+        for viewers in viewer_steps:
+            cpu, fps = asyncio.run(run(viewers))
+            if baseline is None:
+                baseline = cpu
+                self.log_result("Publisher only", cpu * 100, "% CPU")
+                continue
+            self.log_result(f"{viewers} relayed viewers", (cpu - baseline) / viewers * 100, "% CPU/viewer",
+                            f"{fps / viewers:.0f} fps each, includes in-process viewer decoding")
+
+    def bench_join_admission(self, joins=20000, ips=2000, retry_share=0.25):
+        """Viewer join admission - flash crowd with reconnect storms from a few clients"""
+        print("\n🚦 Viewer join admission...")
+        import random
+        from admission import AdmissionController
+
+        controller = AdmissionController()
+        client_ips = [f"10.0.{i // 256}.{i % 256}" for i in range(ips)]
+        # A quarter of the attempts are tight reconnect loops from the same 20 clients
+        attempts = [random.choice(client_ips[:20]) if random.random() < retry_share else random.choice(client_ips)
+                    for _ in range(joins)]
+
+        start = time.perf_counter()
+        for ip in attempts:
+            controller.admit(ip, "bench")
+        elapsed = time.perf_counter() - start
+
+        metrics = controller.metrics()
+        self.log_result("Admission decisions", joins / elapsed, "decisions/s")
+        self.log_result("Shed ratio", metrics["shed_ratio"] * 100, "%",
+                        f"{metrics['shed']['ip_rate']} ip_rate, {metrics['shed']['queue_full']} queue_full, "
+                        f"{metrics['queued']} queued")
+
+    def bench_connection_registry(self, connections=10000):
+        """/ws connection registry - 10k connects followed by a mass disconnect"""
+        print("\n🔌 WebSocket connection registry...")
+        import random
+        from server import ConnectionManager
+
+        class IdleSocket:
+            pass
+
+        sockets = [IdleSocket() for _ in range(connections)]
+        leave_order = random.sample(sockets, len(sockets))
+
+        # Previous list-backed registry: append + `in`/remove
+        start = time.perf_counter()
+        registry = []
+        for ws in sockets:
+            registry.append(ws)
+        for ws in leave_order:
+            if ws in registry:
+                registry.remove(ws)
+        list_time = time.perf_counter() - start
+
+        manager = ConnectionManager()
+        start = time.perf_counter()
+        for ws in sockets:
+            manager.register(ws, customer_number="10001", language="de")
+        for ws in leave_order:
+            manager.disconnect(ws)
+        dict_time = time.perf_counter() - start
+
+        self.log_result(f"List registry ({connections} connects + disconnects)", list_time * 1000, "ms")
+        self.log_result(f"Dict registry ({connections} connects + disconnects)", dict_time * 1000, "ms",
+                        f"{list_time / dict_time:.0f}x faster")
+
+    def bench_topic_broadcast(self, customers=2000, admins=3, orders=200):
+        """/ws egress during an order burst - global firehose vs. topic-scoped counter updates"""
+        print("\n📣 Topic-scoped broadcasts...")
+        from fastapi.websockets import WebSocketState
+        from server import ConnectionManager, GLOBAL_TOPIC
+
+        class CountingSocket:
+            client_state = WebSocketState.CONNECTED
+            bytes_sent = 0
+
+            async def send_text(self, text):
+                CountingSocket.bytes_sent += len(text.encode("utf-8"))
+
+        manager = ConnectionManager()
+        for i in range(customers):
+            manager.register(CountingSocket(), customer_number=f"{10000 + i}", language="de")
+        for _ in range(admins):
+            manager.register(CountingSocket(), role="admin")
+
+        notification = {"type": "order_notification", "data": {
+            "message": "**Bestellung** 1234 I 2x I 25,80 I XL", "customer_id": "10001234",
+            "product_name": "Sommerkleid", "size": "XL", "quantity": 2, "price": 25.8, "unit_price": 12.9}}
+        counter = {"type": "order_counter_update", "data": {"session_orders": 42, "total_orders": 4242}}
+
+        async def burst(counter_topic):
+            CountingSocket.bytes_sent = 0
+            for _ in range(orders):
+                await manager.broadcast(notification)
+                await manager.broadcast(counter, counter_topic)
+            return CountingSocket.bytes_sent
+
+        firehose = asyncio.run(burst(GLOBAL_TOPIC))
+        scoped = asyncio.run(burst("role:admin"))
+        self.log_result(f"Firehose ({customers + admins} clients, {orders} orders)", firehose / 1024 / 1024, "MiB")
+        self.log_result("Counter updates to role:admin only", scoped / 1024 / 1024, "MiB",
+                        f"{(1 - scoped / firehose) * 100:.0f}% less egress")
+
+    def _show_trace(self, minutes=60, seed=34):
+        """Broadcasts of a one hour show as a customer sees them (viewer churn, chat, orders, ticker, pings)"""
+        import random
+        from datetime import datetime, timezone
+
+        rng = random.Random(seed)
+        viewers = 40
+        trace = []
+        for second in range(minutes * 60):
+            if rng.random() < 0.8:
+                viewers = max(1, viewers + rng.choice((-1, 1, 1)))
+                trace.append({"type": "viewer_count", "count": viewers})
+            if rng.random() < 0.4:
+                trace.append({"type": "chat_message", "data": {
+                    "id": f"{rng.getrandbits(128):032x}", "username": f"Kunde{rng.randint(1000, 9999)}",
+                    "message": rng.choice(["Habt ihr das in XL?", "Gibt es die Farbe noch?", "Super Preis 😍"]),
+                    "timestamp": datetime.now(timezone.utc), "emoji": "", "room": None}})
+            if rng.random() < 0.25:
+                trace.append({"type": "order_notification", "data": {
+                    "message": f"**Bestellung** {rng.randint(1000, 9999)} I 2x I 25,80 I XL",
+                    "customer_id": f"{rng.randint(10000000, 99999999)}", "product_name": "Sommerkleid",
+                    "size": "XL", "quantity": 2, "price": 25.8, "unit_price": 12.9}})
+            if second % 600 == 0:
+                trace.append({"type": "ticker_update", "data": {
+                    "text": "Nur für Händler | Ab 10 € - Heute 18:00 - Frische Ware", "enabled": True}})
+            if second % 20 == 0:
+                trace.append({"type": "ping"})
+        return trace
+
+    def bench_ws_protocols(self, minutes=60):
+        """/ws egress per viewer per minute - JSON vs. compact protocols, with and without permessage-deflate"""
+        print("\n🗜️  WebSocket protocols on a show trace...")
+        import zlib
+        from fastapi.websockets import WebSocketState
+        from server import ConnectionManager
+        from ws_protocol import MSGPACK_AVAILABLE, PROTOCOL_COMPACT, PROTOCOL_JSON, PROTOCOL_MSGPACK
+
+        class CountingSocket:
+            client_state = WebSocketState.CONNECTED
+
+            def __init__(self):
+                self.raw = 0
+                self.deflated = 0
+                # permessage-deflate with context takeover (RFC 7692: sync flush, trailer stripped)
+                self.compressor = zlib.compressobj(wbits=-15)
+
+            async def send_text(self, text):
+                await self.send_bytes(text.encode("utf-8"))
+
+            async def send_bytes(self, data):
+                self.raw += len(data)
+                self.deflated += len(self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+
+        trace = self._show_trace(minutes)
+        protocols = [PROTOCOL_JSON, PROTOCOL_COMPACT] + ([PROTOCOL_MSGPACK] if MSGPACK_AVAILABLE else [])
+        manager = ConnectionManager()
+        sockets = {protocol: CountingSocket() for protocol in protocols}
+        for protocol, ws in sockets.items():
+            manager.register(ws, language="de", protocol=protocol)
+
+        async def replay():
+            for message in trace:
+                await manager.broadcast(message)
+
+        asyncio.run(replay())
+        baseline = sockets[PROTOCOL_JSON].raw
+        for protocol, ws in sockets.items():
+            self.log_result(f"{protocol}", ws.raw / minutes / 1024, "KiB/viewer/min",
+                            f"{(1 - ws.raw / baseline) * 100:.0f}% less than json")
+            self.log_result(f"{protocol} + deflate", ws.deflated / minutes / 1024, "KiB/viewer/min",
+                            f"{(1 - ws.deflated / baseline) * 100:.0f}% less than json")
+
+    def bench_live_snapshot(self, joins=5000, chat_every=100):
+        """/api/live/snapshot during a join wave - full responses and If-None-Match revalidations"""
+        print("\n📸 Live snapshot endpoint...")
+        from datetime import datetime, timezone
+        from starlette.requests import Request
+        import server
+        from live_snapshot import LiveSnapshotCache
+
+        async def chat_tail(limit):
+            return [server.ChatMessage(username=f"Kunde{i}", message="Habt ihr das in XL?").dict() for i in range(limit)]
+
+        async def events():
+            now = datetime.now(timezone.utc)
+            return [{"id": str(i), "date": "2026-10-19", "time": "18:00", "title": f"Show {i}", "description": "",
+                     "created_at": now, "updated_at": now} for i in range(10)]
+
+        # In-memory loaders instead of Mongo - this measures the endpoint, not the first load
+        server.live_snapshot = LiveSnapshotCache(chat_tail, events)
+        server.manager.topic_index.clear()
+
+        def request(etag=None):
+            headers = [(b"if-none-match", etag.encode())] if etag else []
+            return Request({"type": "http", "method": "GET", "path": "/api/live/snapshot", "headers": headers})
+
+        async def wave():
+            etag = None
+            not_modified = 0
+            for i in range(joins):
+                if i % chat_every == 0:
+                    message = server.ChatMessage(username="Kunde", message="Noch da?")
+                    server.live_snapshot.add_chat_message(message.dict())
+                    await server.manager.broadcast({"type": "chat_message", "data": message.dict()})
+                response = await server.get_live_snapshot(request())
+                etag = response.headers["etag"]
+                revalidated = await server.get_live_snapshot(request(etag))
+                not_modified += revalidated.status_code == 304
+            return not_modified
+
+        start = time.perf_counter()
+        not_modified = asyncio.run(wave())
+        elapsed = time.perf_counter() - start
+
+        stats = server.live_snapshot.stats()
+        self.log_result(f"{joins} joins (snapshot + revalidation)", elapsed, "s",
+                        f"{joins * 2 / elapsed:,.0f} req/s, {stats['renders']} renders, {not_modified} x 304, "
+                        f"{stats['body_bytes']} bytes")
+
+    def bench_sales_dashboard(self, admins=5, refresh=2.0, show_minutes=60, scan_ms=40):
+        """Aggregations run for a live show's dashboard - every refresh vs. the per-window cache"""
+        print("\n📈 Sales dashboard during a live show...")
+        from datetime import datetime, timedelta, timezone
+        from types import SimpleNamespace
+        import sales_analytics
+        from sales_analytics import AnalyticsCache, REPORTS
+
+        end = datetime.now(timezone.utc) + timedelta(hours=1)
+        refreshes = int(show_minutes * 60 / refresh)
+        aggregations = 0
+
+        async def aggregate():
+            nonlocal aggregations
+            aggregations += 1
+            await asyncio.sleep(scan_ms / 1000)
+            return []
+
+        async def show():
+            cache = AnalyticsCache()
+            clock = time.monotonic()
+            original = sales_analytics.time
+            # Simulated show clock, one tick per dashboard refresh
+            sales_analytics.time = SimpleNamespace(monotonic=lambda: clock)
+            try:
+                for _ in range(refreshes):
+                    await asyncio.gather(*[
+                        cache.get_or_compute((report, None, end, 100), end, aggregate)
+                        for report in REPORTS for _ in range(admins)
+                    ])
+                    clock += refresh
+            finally:
+                sales_analytics.time = original
+
+        asyncio.run(show())
+        uncached = refreshes * admins * len(REPORTS)
+        self.log_result(f"{show_minutes} min show, {admins} admins", aggregations, " aggregations",
+                        f"vs {uncached} without cache, ~{aggregations * scan_ms / 1000:.0f}s "
+                        f"instead of ~{uncached * scan_ms / 1000:.0f}s of order scans")
+
+    def bench_sales_aggregator(self, orders=100000, products=50):
+        """Live sales KPIs - cost per recorded order and per pushed snapshot"""
+        print("\n💶 Incremental sales aggregator...")
+        from sales_analytics import SalesAggregator
+
+        aggregator = SalesAggregator()
+        sizes = ["S", "M", "L", "XL", "XXL"]
+        now = time.time()
+
+        start = time.perf_counter()
+        for i in range(orders):
+            # One show hour, orders spread evenly
+            aggregator.record(str(i % products), sizes[i % len(sizes)], 1 + i % 3, 12.9, at=now - 3600 + i * 3600 / orders)
+        recorded = time.perf_counter() - start
+        self.log_result("record()", recorded / orders * 1e6, "µs/order", f"{orders / recorded:,.0f} orders/s")
+
+        rounds = 100
+        start = time.perf_counter()
+        for _ in range(rounds):
+            aggregator.snapshot()
+        snapshot = time.perf_counter() - start
+        self.log_result("snapshot()", snapshot / rounds * 1000, "ms/tick",
+                        f"{products} products, {products * len(sizes)} sizes, 0 DB queries")
+
+    def bench_chat_moderation(self, rate=1000, seconds=60, senders=3000, spam_share=0.1):
+        """Chat moderation at 1k msgs/s - customers mixed with burst, copy-paste and blocklist spam"""
+        print("\n🛡️ Chat moderation...")
+        import random
+        from types import SimpleNamespace
+        import admission
+        from chat_moderation import ChatModerator
+
+        blocklist = [f"spamterm{i}" for i in range(500)] + ["casino", "gratis geld", "whatsapp gruppe"]
+        moderator = ChatModerator(blocklist=blocklist)
+        # Free-form customer chat: short sentences from a small vocabulary
+        words = ("habt ihr das shirt bluse noch in blau rot schwarz weiss größer kleiner wie fällt aus gibt es "
+                 "die auch wann kommt nächste ware material baumwolle preis ab stück paket lieferung heute morgen "
+                 "super schön toll danke bitte nehme zwei drei größe passt gut lang kurz ärmel kragen").split()
+        spam = ["Besucht jetzt mein C a s i n o !!!", "Tritt unserer WhatsApp Gruppe bei", "Jetzt günstig kaufen auf meinem Shop"]
+
+        rng = random.Random(34)
+        messages = []
+        for i in range(rate * seconds):
+            now = i / rate
+            if rng.random() < spam_share:
+                spammer = rng.randrange(20)
+                messages.append((now, f"10.0.0.{spammer}", f"Spam{spammer}", f"Chat 9{spammer:03d} I {rng.choice(spam)}"))
+            else:
+                customer = rng.randrange(senders)
+                text = " ".join(rng.choice(words) for _ in range(rng.randint(3, 8)))
+                messages.append((now, f"192.168.{customer // 250}.{customer % 250}", "Kunde", f"Chat {customer} I {text}"))
+
+        clock = 0.0
+        customers_rejected = 0
+        original = admission.time
+        # Simulated clock for the token buckets, the show runs at exactly `rate`
+        admission.time = SimpleNamespace(monotonic=lambda: clock)
+        try:
+            start = time.perf_counter()
+            for now, address, sender, text in messages:
+                clock = now
+                if moderator.check(address, sender, text, now) and sender == "Kunde":
+                    customers_rejected += 1
+            elapsed = time.perf_counter() - start
+        finally:
+            admission.time = original
+
+        stats = moderator.stats()
+        self.log_result(f"{len(messages):,} messages ({rate}/s for {seconds}s)", len(messages) / elapsed, "msgs/s",
+                        f"{elapsed / len(messages) * 1e6:.1f} µs/msg, {elapsed / seconds * 100:.2f}% of one core at {rate}/s")
+        self.log_result("Rejected", stats["rejected_ratio"] * 100, "%",
+                        ", ".join(f"{reason} {count}" for reason, count in stats["rejected"].items()) +
+                        f"; {customers_rejected} of them customer messages")
+
+    def run_all_benchmarks(self, selected=None):
+        """Run all (or the selected) benchmarks"""
+        print("🚀 Starting Backend Benchmarks")
+        print("=" * 60)
+
+        benchmarks = [name for name in dir(self) if name.startswith("bench_")]
+        for name in benchmarks:
+            if selected and name.replace("bench_", "") not in selected:
+                continue
+            getattr(self, name)()
+
+        print("\n" + "=" * 60)
+        print(f"📊 {len(self.results)} measurements collected")
+        return True
+
+
+def main():
+    benchmark = BackendBenchmark()
+    success = benchmark.run_all_benchmarks(sys.argv[1:])
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -17,6 +17,7 @@ import SimpleVideoStreaming from './components/streaming/SimpleVideoStreaming';
 import MobileVideoPlayer from './components/streaming/MobileVideoPlayer';
 import LiveKitStreaming from './components/streaming/LiveKitStreaming';
 import livekitService from './services/livekitService';
+import { createCompactDecoder } from './services/compactProtocol';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -44,6 +45,7 @@ function App() {
     session_revenue: 0, 
     total_items: 0 
   });
+  const [salesLive, setSalesLive] = useState(null); // Live-KPIs der Session (sales_update)
   const [pinnedMessages, setPinnedMessages] = useState([]); // Für Chat-Pinnung
   const [showCustomerLogin, setShowCustomerLogin] = useState(false);
   const [customerLoginData, setCustomerLoginData] = useState({ customer_number: '' });
@@ -176,22 +178,58 @@ function App() {
   
   const chatRef = useRef(null);
   const wsRef = useRef(null);
+  // Last broadcast sequence seen, so a reconnect only receives the gap
+  const wsSyncRef = useRef({ epoch: null, seq: null });
 
 
 
   useEffect(() => {
     // Initialize WebSocket connection
     const connectWebSocket = () => {
-      const ws = new WebSocket(`${WS_URL}/ws`);
+      const wsParams = new URLSearchParams({ language: i18n.language || 'de', protocol: 'compact' });
+      // Admins additionally receive order_counter_update
+      if (localStorage.getItem('adminSession') === 'true') {
+        wsParams.set('role', 'admin');
+      }
+      const storedCustomerNumber = localStorage.getItem('customerNumber');
+      if (storedCustomerNumber) {
+        wsParams.set('customer_number', storedCustomerNumber);
+      }
+      if (wsSyncRef.current.epoch && wsSyncRef.current.seq !== null) {
+        wsParams.set('epoch', wsSyncRef.current.epoch);
+        wsParams.set('last_seq', wsSyncRef.current.seq);
+      }
+      const ws = new WebSocket(`${WS_URL}/ws?${wsParams}`);
+      const decodeFrame = createCompactDecoder();
       
       ws.onopen = () => {
         console.log('WebSocket connected');
       };
       
       ws.onmessage = (event) => {
-        const data = JSON.parse(event.data);
+        const data = decodeFrame(JSON.parse(event.data));
+        
+        if (data.type === 'sync') {
+          // Sent after the replay - everything up to data.seq has been applied by now
+          const sameEpoch = wsSyncRef.current.epoch === data.epoch;
+          wsSyncRef.current = {
+            epoch: data.epoch,
+            seq: sameEpoch ? Math.max(wsSyncRef.current.seq ?? 0, data.seq) : data.seq
+          };
+          return;
+        }
+        if (data.seq !== undefined) {
+          wsSyncRef.current.seq = Math.max(wsSyncRef.current.seq ?? 0, data.seq);
+        }
         
-        if (data.type === 'chat_message') {
+        if (data.type === 'resync_required') {
+          // Missed more than the server still has buffered - reload from the snapshot once
+          axios.get(`${API}/live/snapshot`)
+            .then(response => setChatMessages(response.data.chat))
+            .catch(error => console.error('Error reloading chat:', error));
+        } else if (data.type === 'ping') {
+          ws.send(JSON.stringify({ type: 'pong' }));
+        } else if (data.type === 'chat_message') {
           setChatMessages(prev => [...prev, data.data]);
         } else if (data.type === 'viewer_count') {
           setViewerCount(data.count);
@@ -211,6 +249,8 @@ function App() {
             session_orders: data.data.session_orders,
             total_orders: data.data.total_orders
           }));
+        } else if (data.type === 'sales_update') {
+          setSalesLive(data.data);
         } else if (data.type === 'ticker_update') {
           setTickerSettings(data.data);
         }
@@ -243,6 +283,8 @@ function App() {
       setIsAdminView(true);
       setIsAuthenticated(true);
       localStorage.setItem('adminSession', 'true');
+      // Reconnect the WebSocket with the admin role
+      wsRef.current?.close();
     }
     
     // Check for stored customer authentication (only if not admin)
@@ -279,8 +321,9 @@ function App() {
   }, [currentCustomer?.customer_number, isAuthenticated, isAdminView]);
 
   useEffect(() => {
-    // Load events on component mount
-    loadEvents();
+    // Keep the calendar/countdown current - unchanged lists are answered with 304
+    const eventsInterval = setInterval(() => loadEvents(false), 60000);
+    return () => clearInterval(eventsInterval);
   }, []);
 
   // Update live statistics when chat messages change
@@ -308,6 +351,9 @@ function App() {
       const statsResponse = await axios.get(`${API}/admin/stats`);
       setAdminStats(statsResponse.data);
       
+      const salesResponse = await axios.get(`${API}/admin/sales/live`);
+      setSalesLive(salesResponse.data);
+      
       const tickerResponse = await axios.get(`${API}/admin/ticker`);
       setTickerSettings(tickerResponse.data);
       setNewTickerText(tickerResponse.data.text);
@@ -366,24 +412,20 @@ function App() {
     }
   };
 
+  // Absolute start time from the server (UTC), local date/time for older events
+  const eventStart = (event) => new Date(event.starts_at || (event.date + 'T' + event.time));
+
   // Get next upcoming event for countdown
   const getNextEvent = () => {
     if (events.length === 0) return null;
     
     const now = new Date();
-    const upcomingEvents = events.filter(event => {
-      const eventDateTime = new Date(event.date + 'T' + event.time);
-      return eventDateTime > now;
-    });
+    const upcomingEvents = events.filter(event => eventStart(event) > now);
     
     if (upcomingEvents.length === 0) return null;
     
     // Sort by date/time and return the next one
-    upcomingEvents.sort((a, b) => {
-      const dateTimeA = new Date(a.date + 'T' + a.time);
-      const dateTimeB = new Date(b.date + 'T' + b.time);
-      return dateTimeA - dateTimeB;
-    });
+    upcomingEvents.sort((a, b) => eventStart(a) - eventStart(b));
     
     return upcomingEvents[0];
   };
@@ -549,6 +591,7 @@ function App() {
       setAdminPin('');
       setAdminLoginError('');
       localStorage.setItem('adminSession', 'true');
+      wsRef.current?.close();
     } else {
       setAdminLoginError('Ungültige PIN. Bitte versuchen Sie es erneut.');
     }
@@ -560,6 +603,7 @@ function App() {
     setIsAuthenticated(false);
     localStorage.removeItem('adminSession');
     localStorage.removeItem('customerNumber');
+    wsRef.current?.close();
     setCurrentCustomer(null);
     setCustomerStatus(null);
   };
@@ -568,10 +612,9 @@ function App() {
     // Send logout message to chat
     if (currentCustomer?.customer_number) {
       try {
-        await axios.post(`${API}/chat`, {
-          username: 'System',
-          message: `${currentCustomer.customer_number} hat sich abgemeldet`,
-          emoji: ''
+        await axios.post(`${API}/chat/presence`, {
+          customer_number: currentCustomer.customer_number,
+          action: 'logout'
         });
       } catch (error) {
         console.error('Error sending logout message:', error);
@@ -614,10 +657,9 @@ function App() {
 
   const sendLoginMessage = async (customerNumber) => {
     try {
-      await axios.post(`${API}/chat`, {
-        username: 'System',
-        message: `${customerNumber} hat sich angemeldet`,
-        emoji: ''
+      await axios.post(`${API}/chat/presence`, {
+        customer_number: customerNumber,
+        action: 'login'
       });
     } catch (error) {
       console.error('Error sending login message:', error);
@@ -727,6 +769,19 @@ function App() {
     }
   };
 
+  const activateAllPending = async () => {
+    try {
+      // One bulk request instead of one per customer; the response is an NDJSON summary
+      await axios.post(`${API}/admin/customers/bulk-status`, {
+        activation_status: 'active',
+        current_status: 'pending'
+      });
+      loadCustomers(); // Refresh the list
+    } catch (error) {
+      console.error('Error activating pending customers:', error);
+    }
+  };
+
   const deleteCustomer = async (customerId) => {
     try {
       await axios.delete(`${API}/admin/customers/${customerId}`);
@@ -914,28 +969,31 @@ function App() {
   };
 
   // Live Shopping Calendar Functions
-  const loadEvents = async () => {
+  const showUpcomingEvents = (allEvents) => {
+    // Filter events: only show future events (from today onwards)
+    const today = new Date();
+    today.setHours(0, 0, 0, 0); // Set to start of today
+    
+    const futureEvents = allEvents.filter(event => {
+      const eventDate = new Date(event.date + 'T00:00:00');
+      return eventDate >= today;
+    });
+    
+    // Sort by date and time
+    futureEvents.sort((a, b) => {
+      const dateA = new Date(a.date + 'T' + a.time);
+      const dateB = new Date(b.date + 'T' + b.time);
+      return dateA - dateB;
+    });
+    
+    setEvents(futureEvents);
+  };
+
+  const loadEvents = async (showLoading = true) => {
     try {
-      setLoadingEvents(true);
+      if (showLoading) setLoadingEvents(true);
       const response = await axios.get(`${API}/events`);
-      
-      // Filter events: only show future events (from today onwards)
-      const today = new Date();
-      today.setHours(0, 0, 0, 0); // Set to start of today
-      
-      const futureEvents = response.data.filter(event => {
-        const eventDate = new Date(event.date + 'T00:00:00');
-        return eventDate >= today;
-      });
-      
-      // Sort by date and time
-      futureEvents.sort((a, b) => {
-        const dateA = new Date(a.date + 'T' + a.time);
-        const dateB = new Date(b.date + 'T' + b.time);
-        return dateA - dateB;
-      });
-      
-      setEvents(futureEvents);
+      showUpcomingEvents(response.data);
     } catch (error) {
       console.error('Error loading events:', error);
     } finally {
@@ -1020,17 +1078,22 @@ function App() {
 
   const loadInitialData = async () => {
     try {
-      // Load chat messages
-      const chatResponse = await axios.get(`${API}/chat`);
-      setChatMessages(chatResponse.data);
-
-      // Load products
-      const productsResponse = await axios.get(`${API}/products`);
-      setProducts(productsResponse.data);
-      if (productsResponse.data.length > 0) {
-        setSelectedProduct(productsResponse.data[0]);
-        setSelectedSize(productsResponse.data[0].sizes[0]);
-        setSelectedPrice(productsResponse.data[0].price);
+      // Chat, products, ticker and events in one request
+      const snapshotResponse = await axios.get(`${API}/live/snapshot`);
+      const snapshot = snapshotResponse.data;
+      if (wsSyncRef.current.epoch === null) {
+        // Socket not synced yet - have it replay whatever was broadcast after this snapshot
+        wsSyncRef.current = { epoch: snapshot.ws.epoch, seq: snapshot.ws.seq };
+      }
+      setChatMessages(snapshot.chat);
+      setTickerSettings(snapshot.ticker);
+      showUpcomingEvents(snapshot.events);
+
+      setProducts(snapshot.products);
+      if (snapshot.products.length > 0) {
+        setSelectedProduct(snapshot.products[0]);
+        setSelectedSize(snapshot.products[0].sizes[0]);
+        setSelectedPrice(snapshot.products[0].price);
       }
 
       // Load admin stats if in admin view
@@ -1847,7 +1910,7 @@ function App() {
                   {/* Session Umsatz */}
                   <div className="bg-gradient-to-br from-yellow-400/30 to-orange-500/30 rounded-lg p-4 text-center border border-yellow-300/30">
                     <div className="text-3xl font-bold text-yellow-200">
-                      {(adminStats.session_revenue || 0).toLocaleString('de-DE')} €
+                      {(salesLive ? salesLive.session_revenue : adminStats.session_revenue || 0).toLocaleString('de-DE')} €
                     </div>
                     <div className="text-sm opacity-90 font-medium">🔥 Session Umsatz</div>
                     <div className="text-xs opacity-70 mt-1">Aktuelle Session</div>
@@ -1863,6 +1926,24 @@ function App() {
                   </div>
                 </div>
 
+                {/* Live-KPIs der Session, vom Server im Sekundentakt */}
+                {salesLive && (
+                  <div className="grid grid-cols-2 md:grid-cols-4 gap-4 mb-6 text-center">
+                    {['1m', '5m', '15m'].map(window => (
+                      <div key={window} className="bg-white/10 rounded-lg p-3">
+                        <div className="text-2xl font-bold">{salesLive.windows[window].orders_per_minute}</div>
+                        <div className="text-xs opacity-80">Bestellungen/Min ({window})</div>
+                      </div>
+                    ))}
+                    <div className="bg-white/10 rounded-lg p-3">
+                      <div className="text-lg font-bold truncate">{salesLive.products[0]?.product_name || '-'}</div>
+                      <div className="text-xs opacity-80">
+                        Topseller {salesLive.products[0] ? `(${salesLive.products[0].quantity} Stk.)` : ''}
+                      </div>
+                    </div>
+                  </div>
+                )}
+
                 {/* Ticker Settings */}
                 <div className="bg-white/10 rounded-lg p-4 mb-4">
                   <h3 className="text-lg font-semibold mb-3">⚙️ {t.tickerSettings}</h3>
@@ -1974,6 +2055,15 @@ function App() {
                     >
                       ⏳ Freigabe ({customers.filter(c => c.activation_status === 'pending').length})
                     </Button>
+                    {customerFilter === 'pending' && customers.some(c => c.activation_status === 'pending') && (
+                      <Button 
+                        onClick={activateAllPending}
+                        className="bg-green-500 hover:bg-green-600 text-white"
+                        size="sm"
+                      >
+                        ✅ Alle freischalten
+                      </Button>
+                    )}
                     <Button 
                       onClick={() => setCustomerFilter('blocked')}
                       className={customerFilter === 'blocked' ? "bg-red-500 hover:bg-red-600 text-white" : "bg-white/20 hover:bg-white/30 text-white"}
@@ -149,7 +149,8 @@ const LiveKitRoomManager = ({
                 { 
                     role: 'viewer', 
                     user_id: currentUser?.customer_number || 'guest'
-                }
+                },
+                currentUser?.customer_number || null
             );
 
             setToken(tokenResponse.token);
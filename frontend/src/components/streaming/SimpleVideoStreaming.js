@@ -185,11 +185,15 @@ const SimpleVideoStreaming = ({
             
             ws.onmessage = async (event) => {
                 const message = JSON.parse(event.data);
+                if (message.type === 'ping') {
+                    ws.send(JSON.stringify({ type: 'pong' }));
+                    return;
+                }
                 console.log('📨 Streamer received signaling message:', message);
                 
                 if (message.type === 'viewer-joined') {
                     // Create offer for new viewer
-                    await createOfferForViewer(mediaStream, ws);
+                    await createOfferForViewer(mediaStream, ws, message.viewer_id);
                 }
             };
             
@@ -205,7 +209,7 @@ const SimpleVideoStreaming = ({
     };
 
     // Create offer for viewer
-    const createOfferForViewer = async (mediaStream, ws) => {
+    const createOfferForViewer = async (mediaStream, ws, viewerId) => {
         try {
             const pc = new RTCPeerConnection(rtcConfiguration);
             
@@ -219,7 +223,8 @@ const SimpleVideoStreaming = ({
                 if (event.candidate && ws.readyState === WebSocket.OPEN) {
                     ws.send(JSON.stringify({
                         type: 'ice-candidate',
-                        candidate: event.candidate
+                        candidate: event.candidate,
+                        to: viewerId
                     }));
                 }
             };
@@ -230,7 +235,8 @@ const SimpleVideoStreaming = ({
             
             ws.send(JSON.stringify({
                 type: 'offer',
-                offer: offer
+                offer: offer,
+                to: viewerId
             }));
             
             console.log('✅ Offer sent to viewer');
@@ -164,8 +164,8 @@ const StreamingInterface = ({
     if (!currentStreamId) return;
 
     const wsUrl = isStreamer 
-      ? `${getBackendUrl().replace('http', 'ws')}/ws/stream/${currentStreamId}/signaling`
-      : `${getBackendUrl().replace('http', 'ws')}/ws/stream/${currentStreamId}/viewer`;
+      ? `${getBackendUrl().replace('http', 'ws')}/ws/stream/${currentStreamId}/signaling?ice_batching=1`
+      : `${getBackendUrl().replace('http', 'ws')}/ws/stream/${currentStreamId}/viewer?ice_batching=1`;
 
     console.log('Connecting to WebSocket:', wsUrl);
 
@@ -182,12 +182,16 @@ const StreamingInterface = ({
       try {
         const message = JSON.parse(event.data);
         
-        if (message.type === 'signaling') {
+        if (message.type === 'ping') {
+          socket.send(JSON.stringify({ type: 'pong' }));
+        } else if (message.type === 'signaling') {
           await handleSignalingMessage(message.data);
         } else if (message.type === 'viewer_count_update') {
           setViewerCount(message.count);
         } else if (message.type === 'stream_ended') {
           handleStreamEnded();
+        } else if (message.type === 'join_queued') {
+          console.log(`Join queued at position ${message.position}, ~${message.estimated_wait}s`);
         }
       } catch (error) {
         console.error('Error processing WebSocket message:', error);
@@ -226,6 +230,11 @@ const StreamingInterface = ({
         await peerConnection.current.setRemoteDescription(new RTCSessionDescription(data));
       } else if (data.type === 'ice-candidate') {
         await peerConnection.current.addIceCandidate(new RTCIceCandidate(data.candidate));
+      } else if (data.type === 'ice-candidates') {
+        // Batched candidates aggregated by the signaling server
+        for (const candidate of data.candidates) {
+          await peerConnection.current.addIceCandidate(new RTCIceCandidate(candidate));
+        }
       }
     } catch (error) {
       console.error('Error handling signaling message:', error);
@@ -0,0 +1,61 @@
+/**
+ * Compact /ws Protocol
+ * Expands compact frames (?protocol=compact) back into the regular
+ * message shape, so the rest of the app handles both protocols alike
+ */
+
+const TYPE_NAMES = {
+    p: 'ping',
+    h: 'hello',
+    c: 'chat_message',
+    o: 'order_notification',
+    oc: 'order_counter_update',
+    v: 'viewer_count',
+    t: 'ticker_update',
+    y: 'sync',
+    r: 'resync_required',
+    su: 'sales_update',
+};
+
+// Types whose payload is the message's "data" object
+const DATA_TYPES = new Set(['chat_message', 'order_notification', 'ticker_update', 'sales_update']);
+
+export const createCompactDecoder = () => {
+    // Last absolute counter values, base for the server's deltas
+    const lastValues = {};
+
+    const resolveValues = (type, frame) => {
+        if (frame.v) {
+            lastValues[type] = frame.v;
+        } else if (frame.d) {
+            const base = lastValues[type] || frame.d.map(() => 0);
+            lastValues[type] = base.map((value, index) => value + frame.d[index]);
+        }
+        return lastValues[type];
+    };
+
+    const expand = (frame) => {
+        const type = TYPE_NAMES[frame.t] || frame.t;
+
+        if (type === 'viewer_count') {
+            const [count] = resolveValues(type, frame);
+            return { type, count };
+        }
+        if (type === 'order_counter_update') {
+            const [session_orders, total_orders] = resolveValues(type, frame);
+            return { type, data: { session_orders, total_orders } };
+        }
+        if (DATA_TYPES.has(type)) {
+            return { type, data: frame.p };
+        }
+        return { type, ...(frame.p || {}) };
+    };
+
+    return (frame) => {
+        const message = expand(frame);
+        if (frame.s !== undefined) {
+            message.seq = frame.s;
+        }
+        return message;
+    };
+};
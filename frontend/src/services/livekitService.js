@@ -60,13 +60,14 @@ class LiveKitService {
     /**
      * Generate LiveKit token for viewer (customer)
      */
-    async generateViewerToken(roomName, participantName = null, metadata = null) {
+    async generateViewerToken(roomName, participantName = null, metadata = null, customerNumber = null) {
         try {
             const response = await this.apiClient.post('/api/livekit/token', {
                 room_name: roomName,
                 participant_type: 'viewer',
                 participant_name: participantName,
-                metadata: metadata || { role: 'customer', viewing: true }
+                metadata: metadata || { role: 'customer', viewing: true },
+                customer_number: customerNumber
             });
 
             return {
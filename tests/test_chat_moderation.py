@@ -0,0 +1,37 @@
+from types import SimpleNamespace
+
+import pytest
+
+import admission
+import chat_moderation
+from chat_moderation import ChatModerator
+
+
+@pytest.fixture
+def frozen_clock(monkeypatch):
+    # Buckets don't refill while the test runs
+    monkeypatch.setattr(admission, "time", SimpleNamespace(monotonic=lambda: 1000.0))
+
+
+def test_rotating_names_from_one_address_are_throttled(frozen_clock):
+    moderator = ChatModerator(blocklist=[])
+    results = [
+        moderator.check("203.0.113.7", f"Kunde{i}", f"Hallo {i}", now=0.0)
+        for i in range(int(chat_moderation.CHAT_BURST_PER_IP) + 5)
+    ]
+
+    # Every name is new and the texts are too short for duplicate checks - only the address bucket can stop them
+    assert results[:int(chat_moderation.CHAT_BURST_PER_IP)] == [None] * int(chat_moderation.CHAT_BURST_PER_IP)
+    assert set(results[int(chat_moderation.CHAT_BURST_PER_IP):]) == {"rate_limited"}
+    # Other addresses are unaffected
+    assert moderator.check("198.51.100.1", "Kunde0", "Hallo zusammen", now=0.0) is None
+
+
+def test_one_name_is_limited_before_its_address(frozen_clock):
+    moderator = ChatModerator(blocklist=[])
+    results = [moderator.check("203.0.113.7", "Kunde", f"Frage {i}", now=0.0)
+               for i in range(int(chat_moderation.CHAT_BURST_PER_USER) + 1)]
+
+    assert results[-1] == "rate_limited"
+    # A second person behind the same address can still write
+    assert moderator.check("203.0.113.7", "Nachbarin", "Hallo", now=0.0) is None
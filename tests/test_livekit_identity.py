@@ -0,0 +1,44 @@
+import asyncio
+
+import server
+
+
+class FakeCustomers:
+    def __init__(self, customers):
+        self.customers = customers
+
+    async def find_one(self, selector, projection=None):
+        return self.customers.get(selector["customer_number"])
+
+
+class FakeDB:
+    def __init__(self, customers):
+        self.customers = FakeCustomers(customers)
+
+
+def identity(monkeypatch, customers, **request):
+    monkeypatch.setattr(server, "db", FakeDB(customers))
+    return asyncio.run(server.livekit_participant_identity(
+        server.LiveKitTokenRequest(room_name="show", **request), "user"
+    ))
+
+
+def test_guests_with_the_same_display_name_get_different_identities(monkeypatch):
+    first = identity(monkeypatch, {}, participant_name="Zuschauer")
+    second = identity(monkeypatch, {}, participant_name="Zuschauer")
+    assert first != second
+
+
+def test_active_customer_keeps_one_identity(monkeypatch):
+    customers = {"10299": {"activation_status": "active"}}
+    first = identity(monkeypatch, customers, participant_name="Anna", customer_number="10299")
+    second = identity(monkeypatch, customers, participant_name="Anna", customer_number="10299")
+    assert first == second == "customer-10299"
+
+
+def test_unknown_or_inactive_customer_number_is_not_trusted(monkeypatch):
+    customers = {"10299": {"activation_status": "blocked"}}
+    blocked = identity(monkeypatch, customers, participant_name="Anna", customer_number="10299")
+    unknown = identity(monkeypatch, customers, participant_name="Anna", customer_number="55555")
+    assert not blocked.startswith("customer-")
+    assert not unknown.startswith("customer-")